@@ -1,28 +1,53 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
-import csv
 import json
-import matplotlib.pyplot as plt
-from collections import Counter, defaultdict, deque
-from datetime import datetime
+import os
+import queue
+import threading
+import matplotlib.dates as mdates
 from tkinter.simpledialog import askstring
-import copy
+import numpy as np
 import pandas as pd
 
+from chart_panel import ChartPanel
+from data_grid import VirtualGrid
+from data_io import INPUT_EXTENSIONS, FileLoader, FileSaver, MultiFileLoader, expand_inputs
+from data_table import DataTable, diff_tables, format_value
+from filter_expr import FilterError, quote_column, quote_value
+from date_keys import DATE_KEYS, date_key, detect_format, parse_dates
+from mapped_csv import MappedCSV, MappedLoader
+from parallel_agg import PARALLEL_MIN_ROWS, get_pool, parallel_group_by, parallel_summary, shutdown, worker_count
+from query_plan import PlanError, Query, QueryLoader
+from table_groupby import AGGREGATIONS, sorted_groups
+from table_history import TableHistory
+from table_stats import format_summary
+from table_store import TableCache
+from table_view import TableSelection, TableView
+
 class DataViewerApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Simple data analysis - Pandas")
         self.root.geometry("1300x800")
 
-        self.original_data = []
-        self.current_data = []
+        self.original_data = DataTable()
+        self.current_data = DataTable()  # Bảng dạng cột, nguồn dữ liệu duy nhất cho mọi thao tác
+        self.shown_data = None  # Trạng thái bảng đang hiển thị, dùng để cập nhật theo phần thay đổi
+        self.shown_view = None  # state_key của bộ lọc / sắp xếp lúc hiển thị
+        self.view = TableView()  # Bộ lọc và thứ tự sắp xếp đang áp dụng: chỉ là vector id dòng trên current_data
+        self.loader = None  # Luồng nền đang đọc file (nếu có)
+        self.saver = None  # Luồng nền đang ghi file (nếu có)
+        self.loading_view = None
+        self.mapped = None  # File CSV lớn đang xem ở chế độ ánh xạ bộ nhớ (nếu có)
         self.extra_column = None
+        self.chart_panel = None  # Khung biểu đồ gắn trong cửa sổ, tạo khi vẽ lần đầu và dùng lại
         # self.deleted_columns = {} # Không còn cần thiết nữa
 
-        self.undo_stack = deque() # Stack để lưu trữ các trạng thái dữ liệu trước đó
-        self.redo_stack = deque() # Stack để lưu trữ các trạng thái dữ liệu đã undo
-        self.max_undo_levels = 50 # Giới hạn số lượng bước undo để tiết kiệm bộ nhớ
+        # Lịch sử undo/redo lưu delta của từng thao tác, giới hạn theo dung lượng (byte) thay vì số bước
+        self.max_undo_bytes = 256 * 1024 * 1024
+        self.history = TableHistory(max_bytes=self.max_undo_bytes)
+        self.cache = TableCache()  # Bảng đã đọc được lưu dạng cột nhị phân, mở lại file chưa đổi sẽ rất nhanh
+        self.workers = worker_count()  # Số tiến trình cho tính toán / gom nhóm trên bảng lớn (mặc định: số lõi CPU)
 
         self.create_widgets()
         self.root.bind('<Control-z>', lambda event: self.undo_last_action())
@@ -31,29 +56,24 @@ class DataViewerApp:
         self.root.bind("<Control-o>", lambda event: self.load_file())
         self.root.bind("<Control-s>", lambda event: self.save_file())
         self.root.bind('<Control-f>', lambda event: self.filter_data())
-
-    def _record_current_state_for_undo(self):
-        if len(self.undo_stack) >= self.max_undo_levels:
-            self.undo_stack.popleft()  # Xóa phần tử cũ nhất nếu stack đầy
-        # Lưu bản sao sâu (deep copy) của dữ liệu hiện tại
-        self.undo_stack.append(copy.deepcopy(self.current_data))
-        self.redo_stack.clear()  # Xóa redo stack khi có hành động mới
-        self._update_undo_redo_button_states()  # Cập nhật trạng thái nút
+        self.root.bind('<Escape>', lambda event: self.cancel_loading())
 
     def _update_undo_redo_button_states(self):
         if hasattr(self, 'undo_button'):  # Đảm bảo nút đã được tạo
-            if self.undo_stack:
+            if self.history.undo_stack:
                 self.undo_button.config(state=tk.NORMAL)
             else:
                 self.undo_button.config(state=tk.DISABLED)
 
         if hasattr(self, 'redo_button'):  # Đảm bảo nút đã được tạo
-            if self.redo_stack:
+            if self.history.redo_stack:
                 self.redo_button.config(state=tk.NORMAL)
             else:
                 self.redo_button.config(state=tk.DISABLED)
 
     def calculate_count(self):
+        if not self._require_in_memory():
+            return
         if not self.current_data:
             messagebox.showinfo("Info", "No data loaded.")
             return
@@ -63,15 +83,13 @@ class DataViewerApp:
             return
 
         # Kiểm tra xem cột có tồn tại trong dữ liệu hay không
-        if col_name not in self.current_data[0]:
+        if col_name not in self.current_data:
             messagebox.showwarning("Invalid Column", f"Column '{col_name}' not found.")
             return
 
         try:
-            self._record_current_state_for_undo()
             # Đếm số lần xuất hiện của mỗi giá trị trong cột
-            value_counts = Counter(row.get(col_name, None) for row in
-                                   self.current_data)  # Thay '' bằng None để dễ dàng nhận diện giá trị null
+            value_counts = self.current_data.index(col_name, 'hash').counts()
 
             # Nếu không có giá trị nào, hiển thị thông báo lỗi
             if not value_counts:
@@ -80,11 +98,12 @@ class DataViewerApp:
 
             # Thêm cột count vào dữ liệu (chỉ thêm vào dòng đầu tiên)
             self.extra_column = f"{col_name}_count"
-            first_row = self.current_data[0]
-            first_row[self.extra_column] = json.dumps(dict(value_counts))  # Lưu trữ dưới dạng chuỗi JSON
+            result = np.full(len(self.current_data), "", dtype=object)
+            result[0] = json.dumps(dict(value_counts))  # Lưu trữ dưới dạng chuỗi JSON
+            self.history.add_column(self.current_data, self.extra_column, result)
 
             # Cập nhật hiển thị dữ liệu
-            self.display_data(self.current_data)
+            self.update_view()
             messagebox.showinfo("Count Complete", f"Counted values in column '{col_name}'.")
 
         except Exception as e:
@@ -96,7 +115,13 @@ class DataViewerApp:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Open", command=self.load_file)
+        file_menu.add_command(label="Open Large CSV (memory-mapped)", command=lambda: self.load_file(mapped=True))
+        file_menu.add_command(label="Open Folder / Pattern...", command=self.load_files)
+        file_menu.add_command(label="Open with Filter / Columns...", command=self.load_query)
         file_menu.add_command(label="Save", command=self.save_file)
+        file_menu.add_command(label="Export Filtered File...", command=self.export_query)
+        file_menu.add_command(label="Cancel Loading", command=self.cancel_loading)
+        file_menu.add_command(label="Clear Cache", command=self.clear_cache)
         file_menu.add_separator()
         file_menu.add_command(label="Close", command=self.close_app)
 
@@ -104,7 +129,10 @@ class DataViewerApp:
         menubar.add_cascade(label="Edit", menu=edit_menu)
         edit_menu.add_command(label="Remove Column", command=self.clear_result_column)  # Đổi tên cho rõ ràng hơn
         edit_menu.add_command(label="Filter", command=self.filter_data)
+        edit_menu.add_command(label="Toggle Filter", command=self.toggle_filter)
+        edit_menu.add_command(label="Clear Filters", command=self.clear_filters)
         edit_menu.add_command(label="Add Column (MonthYear)", command=self.add_month_year_column)
+        edit_menu.add_command(label="Add Column (Date Key)", command=self.add_date_key_column)
         edit_menu.add_command(label="Rename Column", command=self.rename_column)  # Đổi tên cho rõ ràng hơn
         edit_menu.add_separator()
         edit_menu.add_command(label="Undo", command=self.undo_last_action)
@@ -117,11 +145,18 @@ class DataViewerApp:
         calculate_menu.add_command(label="Min", command=self.calculate_min)
         calculate_menu.add_command(label="Max", command=self.calculate_max)
         calculate_menu.add_command(label="Count", command=self.calculate_count)
+        calculate_menu.add_separator()
+        calculate_menu.add_command(label="Summary (all statistics)", command=self.show_summary)
+        calculate_menu.add_separator()
+        calculate_menu.add_command(label="Parallel Workers...", command=self.set_workers)
 
         sort_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Sort", menu=sort_menu)
         sort_menu.add_command(label="Sort A -> Z", command=lambda: self.sort_column(ascending=True))
         sort_menu.add_command(label="Sort Z -> A", command=lambda: self.sort_column(ascending=False))
+        sort_menu.add_command(label="Top N (largest)", command=lambda: self.top_rows(largest=True))
+        sort_menu.add_command(label="Top N (smallest)", command=lambda: self.top_rows(largest=False))
+        sort_menu.add_command(label="Original Order", command=self.clear_sort)
 
         chart_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Chart", menu=chart_menu)
@@ -130,8 +165,9 @@ class DataViewerApp:
         chart_menu.add_command(label="Bar Chart (Month/Year Aggregate)", command=self.create_month_year_bar_chart)
         chart_menu.add_command(label="Line Chart", command=self.create_line_chart)
 
-        self.tree = ttk.Treeview(self.root, show="headings")
-        self.tree.pack(expand=True, fill='both')
+        self.grid = VirtualGrid(self.root)  # Chỉ tạo item cho các dòng đang hiển thị
+        self.grid.pack(expand=True, fill='both')
+        self.tree = self.grid.tree
 
         self.status_var = tk.StringVar()
         self.status_var.set("Ready")  # Trạng thái ban đầu
@@ -143,188 +179,417 @@ class DataViewerApp:
         self.redo_button = tk.Button(self.root, text="Redo", command=self.redo_last_action)
         self.redo_button.pack(side="right", padx=5, pady=5)
 
-    def load_file(self):
+    def load_file(self, mapped=False):
         file_path = filedialog.askopenfilename(
             title="Select CSV or JSON file",
-            filetypes=[("CSV files", "*.csv"), ("JSON files", "*.json"), ("All files", "*.*")])
+            filetypes=[("CSV files", "*.csv"), ("JSON files", "*.json *.ndjson *.jsonl"),
+                       ("Compressed files", "*.gz *.bz2 *.xz *.zst"), ("Table files", "*.dltable"),
+                       ("All files", "*.*")])
         if not file_path:
             return
 
-        try:
-            def read_file_with_encoding(path, encoding):
-                with open(path, newline='', encoding=encoding) as f:
-                    if path.endswith('.csv'):
-                        return list(csv.DictReader(f))
-                    elif path.endswith('.json'):
-                        data = json.load(f)
-                        return [data] if isinstance(data, dict) else data
+        if self.loader is not None:
+            self.loader.cancel()
 
-            try:
-                data = read_file_with_encoding(file_path, 'utf-8')
-            except UnicodeDecodeError:
-                data = read_file_with_encoding(file_path, 'iso-8859-1')
-
-            if data:
-                self.original_data = data.copy()
-                self.current_data = data.copy()
-                self.display_data(data)
-                self._record_current_state_for_undo()  # Ghi lại trạng thái ban đầu sau khi load file
-                self.status_var.set(f"File loaded: {file_path}")
-            else:
-                messagebox.showinfo("No Data", "File loaded but contains no data.")
-                self.status_var.set("File loaded but no data.")
+        try:
+            # Đọc file ở luồng nền, giao diện nhận tiến độ qua hàng đợi
+            self.loader = MappedLoader(file_path) if mapped else FileLoader(file_path, cache=self.cache)
+            self.loader.start()
+            self.loading_view = None
+            self.status_var.set(f"Loading {file_path}... (Esc to cancel)")
+            self.root.after(50, self._poll_loader, self.loader, file_path)
         except Exception as e:
+            self.loader = None
             messagebox.showerror("Error", f"Failed to load file:\n{e}")
             self.status_var.set(f"Error loading file: {e}")
 
-    def display_data(self, data):
-        self.tree.delete(*self.tree.get_children())
-        self.tree["columns"] = []
-
-        if not data:
+    def load_files(self):
+        # Mở nhiều file (các shard CSV / JSON theo ngày...) thành một bảng: thư mục hoặc mẫu glob
+        pattern = simpledialog.askstring("Open Folder / Pattern",
+                                         "Folder or glob pattern of CSV / JSON files\n(e.g. data/ or data/2024-*.csv):")
+        if not pattern:
             return
-
-        all_columns = sorted(list(set(key for row in data for key in row.keys())))
-        self.tree["columns"] = all_columns
-        for col in all_columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100, anchor='w')
-
-        for row in data:
-            values = [row.get(col, "") for col in all_columns]
-            self.tree.insert("", "end", values=values)
-
-    def calculate_sum(self):
-        col_name = simpledialog.askstring("Select Column", "Enter the column name to calculate sum:")
-        if not col_name:
+        paths = [path for path in expand_inputs([pattern.strip()])
+                 if os.path.isfile(path) and path.endswith(INPUT_EXTENSIONS)]
+        if not paths:
+            messagebox.showwarning("No Files", f"No CSV or JSON files match '{pattern}'.")
+            return
+        source_column = simpledialog.askstring("Source Column",
+                                               f"{len(paths)} file(s) found. Name of a column recording each "
+                                               f"row's source file\n(leave empty for none):",
+                                               initialvalue="source_file")
+        if source_column is None:
             return
+
+        if self.loader is not None:
+            self.loader.cancel()
         try:
-            df = pd.DataFrame(self.current_data)
+            # Các file chưa có trong cache được đọc song song trên pool tiến trình, ghép theo thứ tự file
+            executor = get_pool(self.workers) if self.workers > 1 and len(paths) > 1 else None
+            self.loader = MultiFileLoader(paths, source_column.strip() or None, executor, cache=self.cache)
+            self.loader.start()
+            self.loading_view = None
+            label = f"{len(paths)} files from {pattern}"
+            self.status_var.set(f"Loading {label}... (Esc to cancel)")
+            self.root.after(50, self._poll_loader, self.loader, label)
+        except Exception as e:
+            self.loader = None
+            messagebox.showerror("Error", f"Failed to load files:\n{e}")
+            self.status_var.set(f"Error loading files: {e}")
 
-            if col_name not in df.columns:
-                raise KeyError(f"Column '{col_name}' does not exist.")
+    def load_query(self):
+        # Mở file với bộ lọc / danh sách cột được đưa xuống trình đọc (query_plan): chỉ các cột cần tới được
+        # chuyển đổi và các dòng không khớp bị bỏ ngay trong lượt đọc, không nạp cả file rồi mới lọc
+        file_path = filedialog.askopenfilename(
+            title="Select CSV or JSON file",
+            filetypes=[("CSV files", "*.csv"), ("JSON files", "*.json *.ndjson *.jsonl"),
+                       ("Compressed files", "*.gz *.bz2 *.xz *.zst"), ("Table files", "*.dltable"),
+                       ("All files", "*.*")])
+        if not file_path:
+            return
+        query = self._ask_query(file_path)
+        if query is None:
+            return
 
-            self._record_current_state_for_undo()
+        if self.loader is not None:
+            self.loader.cancel()
+        self.loader = QueryLoader(query)
+        self.loader.start()
+        self.loading_view = None
+        self.status_var.set(f"Loading {file_path} with filter / columns... (Esc to cancel)")
+        self.root.after(50, self._poll_loader, self.loader, file_path)
+
+    def export_query(self):
+        # Lọc / chọn cột từ file nguồn rồi ghi thẳng ra file mới; bảng đang mở không bị thay đổi
+        if self.saver is not None:
+            messagebox.showwarning("Saving", f"Still saving {self.saver.path} (Esc to cancel).")
+            return
+        file_path = filedialog.askopenfilename(
+            title="Select CSV or JSON file to export from",
+            filetypes=[("CSV files", "*.csv"), ("JSON files", "*.json *.ndjson *.jsonl"),
+                       ("Compressed files", "*.gz *.bz2 *.xz *.zst"), ("Table files", "*.dltable"),
+                       ("All files", "*.*")])
+        if not file_path:
+            return
+        query = self._ask_query(file_path)
+        if query is None:
+            return
+        output = filedialog.asksaveasfilename(
+            title="Export To",
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("CSV files (gzip)", "*.csv.gz"), ("JSON files", "*.json"),
+                       ("NDJSON files", "*.ndjson *.jsonl"), ("Table files (binary columns)", "*.dltable"),
+                       ("All files", "*.*")])
+        if not output:
+            return
 
-            # Chuyển đổi sang số, lỗi sẽ thành NaN
-            df[col_name] = pd.to_numeric(df[col_name], errors='coerce')
-            total = df[col_name].sum()
+        self.saver = QueryLoader(query, output)
+        self.saver.start()
+        self.status_var.set(f"Exporting {file_path} to {output}... (Esc to cancel)")
+        self.root.after(50, self._poll_saver, self.saver)
+
+    def _ask_query(self, file_path):
+        expression = simpledialog.askstring("Filter",
+                                            "Filter expression applied while reading (leave empty for all rows),\n"
+                                            "e.g. Region = 'North' AND Sales > 100:")
+        if expression is None:
+            return None
+        columns = simpledialog.askstring("Columns",
+                                         "Columns to load, separated by commas (leave empty for all columns):")
+        if columns is None:
+            return None
+        try:
+            query = Query(file_path, cache=self.cache)
+            if expression.strip():
+                query = query.filter(expression.strip())
+            names = [name.strip() for name in columns.split(',') if name.strip()]
+            if names:
+                query = query.select(*names)
+            query.optimize()  # báo lỗi kế hoạch (cột không còn sau khi chọn...) trước khi đọc file
+            return query
+        except (FilterError, PlanError) as e:
+            messagebox.showerror("Invalid Query", str(e))
+            self.status_var.set(f"Invalid query: {e}")
+            return None
+
+    def cancel_loading(self):
+        if self.loader is not None:
+            self.loader.cancel()
+            self.status_var.set("Cancelling load...")
+        elif self.saver is not None:
+            self.saver.cancel()
+            self.status_var.set("Cancelling save...")
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.status_var.set(f"Cache cleared: {self.cache.directory}")
+
+    def _poll_loader(self, loader, file_path):
+        if loader is not self.loader:
+            return  # đã bị thay bằng lần mở file khác
+        while True:
+            try:
+                message = loader.messages.get_nowait()
+            except queue.Empty:
+                self.root.after(50, self._poll_loader, loader, file_path)
+                return
 
-            if pd.isna(total):
-                raise ValueError("No valid numeric values to sum.")
+            kind = message[0]
+            if kind == 'progress':
+                _, builder, rows, bytes_read, total_bytes = message
+                self._show_loading_rows(builder)
+                self.status_var.set(f"Loading {file_path}: {rows:,} rows, "
+                                    f"{bytes_read / 1048576:,.1f} / {total_bytes / 1048576:,.1f} MB (Esc to cancel)")
+                continue
+
+            self.loader = None
+            if kind == 'done':
+                self._finish_loading(message[1], file_path)
+                if loader.cached:
+                    self.status_var.set(self.status_var.get() + " from cache")
+                if loader.malformed:
+                    # Dòng có nhiều trường hơn tiêu đề: các trường thừa đã bị bỏ khi đọc
+                    lines = ", ".join(f"{line:,}" for line in loader.malformed[:10])
+                    more = f" (+{len(loader.malformed) - 10:,} more)" if len(loader.malformed) > 10 else ""
+                    messagebox.showwarning("Malformed Rows",
+                                           f"{len(loader.malformed):,} row(s) have more fields than the header; "
+                                           f"the extra fields were dropped.\nLines: {lines}{more}")
+                    self.status_var.set(self.status_var.get() +
+                                        f" ({len(loader.malformed):,} malformed rows truncated)")
+            elif kind == 'cancelled':
+                self.display_data(self.mapped if self.mapped is not None else self.current_data)
+                self.status_var.set("Loading cancelled.")
+            else:
+                self.display_data(self.mapped if self.mapped is not None else self.current_data)
+                messagebox.showerror("Error", f"Failed to load file:\n{message[1]}")
+                self.status_var.set(f"Error loading file: {message[1]}")
+            return
 
-            self.extra_column = f"{col_name}_sum"
+    def _show_loading_rows(self, builder):
+        # Hiện ngay những dòng đầu, các khối sau chỉ cập nhật số dòng của lưới ảo
+        if self.loading_view is not builder or self.grid.fetch_rows is None:
+            self.display_data(builder)
+            self.loading_view = builder
+        elif self.shown_data is None and self.grid.fetch_rows == builder.rows:
+            self.grid.apply_changes(builder.columns, len(builder), {})
+
+    def _finish_loading(self, data, file_path):
+        self.loading_view = None
+        previous = self.mapped
+        if isinstance(data, MappedCSV):
+            # Chế độ ánh xạ bộ nhớ: không có bảng trong RAM, lưới đọc trực tiếp từ file
+            self.mapped = data
+            self.original_data = DataTable()
+            self.current_data = DataTable()
+            self.history.clear()
+            self.view.reset()
+            self.display_data(data)
+            self._update_undo_redo_button_states()
+            self.status_var.set(f"Memory-mapped: {file_path} ({len(data):,} rows, read-only)")
+        elif data:
+            self.mapped = None
+            self.original_data = data
+            self.current_data = data.copy()
+            self.history.clear()  # Lịch sử cũ không áp dụng cho file mới
+            self.view.reset()
+            self.display_data(self.current_data)
+            self._update_undo_redo_button_states()
+            self.status_var.set(f"File loaded: {file_path} ({len(data):,} rows)")
+        else:
+            self.display_data(self.mapped if self.mapped is not None else self.current_data)
+            messagebox.showinfo("No Data", "File loaded but contains no data.")
+            self.status_var.set("File loaded but no data.")
+        if previous is not None and previous is not self.mapped:
+            previous.close()  # lưới đã chuyển sang nguồn mới nên có thể đóng file cũ
+
+    def _require_in_memory(self):
+        # File ánh xạ bộ nhớ chỉ hỗ trợ xem và các phép tính đọc theo khối
+        if self.mapped is None:
+            return True
+        messagebox.showinfo("Memory-mapped File",
+                            "This action needs the data in memory. Open the file with File -> Open instead.")
+        return False
+
+    def _summarize_mapped(self, col_name, stat=None):
+        # Tính trên file ánh xạ ở luồng nền, kết quả chỉ hiện ra (không thêm cột vào file)
+        if col_name not in self.mapped:
+            messagebox.showerror("Error", f"Column '{col_name}' does not exist.")
+            return
+        mapped = self.mapped
+        results = queue.Queue()
 
-            # Chỉ gán giá trị vào dòng đầu tiên, các dòng khác rỗng
-            df[self.extra_column] = ""
-            df.at[0, self.extra_column] = total
+        def work():
+            try:
+                results.put(('done', mapped.summarize(col_name)))
+            except Exception as e:
+                results.put(('error', e))
 
-            self.current_data = df.to_dict(orient='records')
-            self.display_data(self.current_data)
-            self.status_var.set(f"Sum calculated for '{col_name}'.")
+        def poll():
+            try:
+                kind, value = results.get_nowait()
+            except queue.Empty:
+                self.root.after(50, poll)
+                return
+            if kind == 'error':
+                messagebox.showerror("Error", f"Cannot calculate {stat}: {value}")
+                self.status_var.set(f"Error calculating {stat}: {value}")
+            elif stat is None:
+                messagebox.showinfo(f"Summary of '{col_name}'", format_summary(value))
+                self.status_var.set(f"Summary calculated for '{col_name}'.")
+            elif pd.isna(value[stat]):
+                messagebox.showerror("Error", f"No valid numeric values found in '{col_name}'.")
+                self.status_var.set(f"Error calculating {stat}: no numeric values.")
+            else:
+                messagebox.showinfo(stat.capitalize(), f"{stat.capitalize()} of '{col_name}': {value[stat]}\n"
+                                                        f"({value['numeric']:,} numeric values)")
+                self.status_var.set(f"{stat.capitalize()} calculated for '{col_name}'.")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Cannot calculate sum: {e}")
-            self.status_var.set(f"Error calculating sum: {e}")
+        self.status_var.set(f"Scanning '{col_name}' in {mapped.path}...")
+        threading.Thread(target=work, daemon=True).start()
+        self.root.after(50, poll)
 
-    def calculate_mean(self):
-        col_name = simpledialog.askstring("Select Column", "Enter the column name to calculate mean:")
-        if not col_name:
+    def display_data(self, data):
+        self.shown_data = data.copy() if data is self.current_data else None
+        self.shown_view = None
+        if data is self.current_data:
+            self.shown_view = self.view.state_key(data)
+            data = self._current_source()
+        if not data:
+            self.grid.clear()
             return
-        try:
-            df = pd.DataFrame(self.current_data)
 
-            if col_name not in df.columns:
-                raise KeyError(f"Column '{col_name}' does not exist.")
+        # Các dòng được lấy từ bảng khi cuộn, không chèn toàn bộ vào Treeview
+        self.grid.set_source(data.columns, len(data), data.rows)
 
-            self._record_current_state_for_undo()
-
-            # Chuyển cột sang float, bỏ qua giá trị không hợp lệ
-            df[col_name] = pd.to_numeric(df[col_name], errors='coerce')
-            mean_value = df[col_name].mean()
+    def update_view(self):
+        # Chỉ cập nhật phần thay đổi so với lần hiển thị trước thay vì vẽ lại toàn bộ
+        if self.shown_data is None or not self.shown_data or not self.current_data:
+            self.display_data(self.current_data)
+            return
+        changes = diff_tables(self.shown_data, self.current_data)
+        source = self._current_source()
+        # Bộ lọc / sắp xếp hay cột mà chúng dùng đổi thì thứ tự dòng đổi: làm mới mọi dòng;
+        # sửa cột khác chỉ cập nhật cột đó
+        view_key = self.view.state_key(self.current_data)
+        changes['rows'] = changes['rows'] or view_key != self.shown_view
+        self.shown_data = self.current_data.copy()
+        self.shown_view = view_key
+        self.grid.fetch_rows = source.rows
+        self.grid.apply_changes(source.columns, len(source), changes)
+        self._update_undo_redo_button_states()  # Cập nhật trạng thái nút
 
-            if pd.isna(mean_value):
-                raise ValueError("No valid numeric values found.")
+    def _current_source(self):
+        # Có bộ lọc: lưới đọc bảng gốc qua vector id dòng, không tạo bảng mới
+        row_ids = self.view.row_ids(self.current_data)
+        return self.current_data if row_ids is None else TableSelection(self.current_data, row_ids)
+
+    def _report_skipped(self, message):
+        # Bộ lọc / sắp xếp dùng cột vừa bị đổi tên hoặc xóa không áp dụng được nữa: báo rõ để số dòng
+        # đang hiển thị khớp với các bộ lọc người dùng thấy (Undo đưa cột về thì bộ lọc lại có hiệu lực)
+        self.view.row_ids(self.current_data)
+        if not self.view.skipped:
+            self.status_var.set(message)
+            return
+        messagebox.showwarning("Filters Skipped",
+                               f"{message}\nThese no longer match a column and are skipped:\n"
+                               + "\n".join(self.view.skipped)
+                               + "\n\nUndo the change or clear the filters / sort to remove this warning.")
+        self.status_var.set(f"{message} {self._view_status()}")
+
+    def _view_status(self):
+        row_ids = self.view.row_ids(self.current_data)
+        applied = [text for text in self.view.active() if text not in self.view.skipped]
+        if row_ids is None or not (applied or self.view.limit is not None):
+            text = f"Showing all {len(self.current_data):,} rows."
+        elif not applied:
+            text = f"Showing the top {len(row_ids):,} of {len(self.current_data):,} rows."
+        else:
+            text = (f"Filtered: {len(row_ids):,} of {len(self.current_data):,} rows "
+                    f"({len(applied)} active filter(s)"
+                    + (f", top {self.view.limit:,}" if self.view.limit is not None else "") + ").")
+        if self.view.sort_keys:
+            text += " Sorted by " + ", ".join(f"'{name}'" + ("" if ascending else " desc")
+                                              for name, ascending in self.view.sort_keys) + "."
+        if self.view.skipped:
+            text += f" Skipped: {'; '.join(self.view.skipped)}"
+        return text
 
-            self.extra_column = f"{col_name}_mean"
+    def calculate_sum(self):
+        self._calculate_statistic('sum')
 
-            # Chỉ ghi giá trị vào dòng đầu tiên
-            df[self.extra_column] = ""
-            df.at[0, self.extra_column] = mean_value
+    def calculate_mean(self):
+        self._calculate_statistic('mean')
 
-            self.current_data = df.to_dict(orient='records')
-            self.display_data(self.current_data)
-            self.status_var.set(f"Mean calculated for '{col_name}'.")
+    def calculate_min(self):
+        self._calculate_statistic('min')
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Cannot calculate mean: {e}")
-            self.status_var.set(f"Error calculating mean: {e}")
+    def calculate_max(self):
+        self._calculate_statistic('max')
 
-    def calculate_min(self):
-        col_name = simpledialog.askstring("Select Column", "Enter the column name to calculate min:")
+    def _calculate_statistic(self, stat):
+        col_name = simpledialog.askstring("Select Column", f"Enter the column name to calculate {stat}:")
         if not col_name:
             return
+        if self.mapped is not None:
+            self._summarize_mapped(col_name, stat)
+            return
         try:
-            df = pd.DataFrame(self.current_data)
-
-            if col_name not in df.columns:
-                raise KeyError(f"Column '{col_name}' does not exist.")
-
-            self._record_current_state_for_undo()
-
-            # Chuyển cột thành dạng số, lỗi sẽ bị NaN
-            df[col_name] = pd.to_numeric(df[col_name], errors='coerce')
-            min_value = df[col_name].min()
-
-            if pd.isna(min_value):
+            value = self._column_summary(col_name)[stat]
+            if pd.isna(value):
                 raise ValueError("No valid numeric values found.")
 
-            self.extra_column = f"{col_name}_min"
+            self.extra_column = f"{col_name}_{stat}"
 
-            df[self.extra_column] = ""
-            df.at[0, self.extra_column] = min_value
-
-            self.current_data = df.to_dict(orient='records')
-            self.display_data(self.current_data)
-            self.status_var.set(f"Min calculated for '{col_name}'.")
+            # Chỉ ghi giá trị vào dòng đang hiển thị đầu tiên (theo bộ lọc / sắp xếp), các dòng khác rỗng
+            row_ids = self.view.row_ids(self.current_data)
+            result = np.full(len(self.current_data), np.nan)
+            result[0 if row_ids is None or len(row_ids) == 0 else row_ids[0]] = value
+            self.history.add_column(self.current_data, self.extra_column, result)
+            self.update_view()
+            self.status_var.set(f"{stat.capitalize()} calculated for '{col_name}'.")
 
         except Exception as e:
-            messagebox.showerror("Error", f"Cannot calculate min: {e}")
-            self.status_var.set(f"Error calculating min: {e}")
+            messagebox.showerror("Error", f"Cannot calculate {stat}: {e}")
+            self.status_var.set(f"Error calculating {stat}: {e}")
 
-    def calculate_max(self):
-        col_name = simpledialog.askstring("Select Column", "Enter the column name to calculate max:")
+    def show_summary(self):
+        col_name = simpledialog.askstring("Select Column", "Enter the column name to summarize:")
         if not col_name:
             return
+        if self.mapped is not None:
+            self._summarize_mapped(col_name)
+            return
         try:
-            df = pd.DataFrame(self.current_data)
-
-            if col_name not in df.columns:
-                raise KeyError(f"Column '{col_name}' does not exist.")
-
-            self._record_current_state_for_undo()
-
-            # Chuyển cột thành dạng số, lỗi sẽ bị NaN
-            df[col_name] = pd.to_numeric(df[col_name], errors='coerce')
-            max_value = df[col_name].max()
-
-            if pd.isna(max_value):
-                raise ValueError("No valid numeric values found.")
-
-            self.extra_column = f"{col_name}_max"
-
-            df[self.extra_column] = ""
-            df.at[0, self.extra_column] = max_value
-
-            self.current_data = df.to_dict(orient='records')
-            self.display_data(self.current_data)
-            self.status_var.set(f"Max calculated for '{col_name}'.")
-
+            summary = self._column_summary(col_name)
+            messagebox.showinfo(f"Summary of '{col_name}'", format_summary(summary))
+            self.status_var.set(f"Summary calculated for '{col_name}'.")
         except Exception as e:
-            messagebox.showerror("Error", f"Cannot calculate max: {e}")
-            self.status_var.set(f"Error calculating max: {e}")
+            messagebox.showerror("Error", f"Cannot summarize column: {e}")
+            self.status_var.set(f"Error summarizing column: {e}")
+
+    def _column_summary(self, col_name):
+        # count / nulls / sum / mean / min / max / variance / distinct trong một lượt quét
+        if col_name not in self.current_data:
+            raise KeyError(f"Column '{col_name}' does not exist.")
+        table = self.current_data
+        # Kết quả được nhớ theo phiên bản cột: hỏi lại trên cột chưa đổi thì trả về ngay
+        return table.cached(col_name, 'summary', lambda values: parallel_summary(
+            values, table.numeric(col_name), table.missing(col_name), self.workers))
+
+    def set_workers(self):
+        # Bảng từ PARALLEL_MIN_ROWS dòng trở lên được chia cho các tiến trình; 1 = tính tuần tự
+        workers = simpledialog.askinteger("Parallel Workers",
+                                          f"Number of worker processes for Calculate and charts\n"
+                                          f"(tables with {PARALLEL_MIN_ROWS:,}+ rows; 1 = no parallelism):",
+                                          initialvalue=self.workers, minvalue=1, maxvalue=256)
+        if workers is None:
+            return
+        self.workers = workers
+        self.status_var.set(f"Using {workers} worker process(es) for large aggregations.")
 
     def clear_result_column(self):
+        if not self._require_in_memory():
+            return
         col_name = simpledialog.askstring("Clear Column","Enter column name to remove (leave empty to remove the last result column):")
         if not col_name:
             col_name = self.extra_column
@@ -333,122 +598,199 @@ class DataViewerApp:
             return
 
         try:
-            df = pd.DataFrame(self.current_data)
-
-            if col_name not in df.columns:
+            if col_name not in self.current_data:
                 messagebox.showwarning("Not Found", f"Column '{col_name}' not found.")
                 return
 
-            self._record_current_state_for_undo()
-
-            df.drop(columns=[col_name], inplace=True)
+            self.history.drop_column(self.current_data, col_name)
 
             if col_name == self.extra_column:
                 self.extra_column = None
 
-            self.current_data = df.to_dict(orient='records')
-            self.display_data(self.current_data)
+            self.update_view()
 
             messagebox.showinfo("Removed", f"Column '{col_name}' has been removed.")
-            self.status_var.set(f"Column '{col_name}' removed.")
+            self._report_skipped(f"Column '{col_name}' removed.")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to remove column: {e}")
             self.status_var.set(f"Error removing column: {e}")
 
 
     def undo_last_action(self):
-        if not self.undo_stack:
+        if not self.history.undo_stack:
             messagebox.showinfo("Info", "No actions to undo.")
             return
 
-        self.redo_stack.append(copy.deepcopy(self.current_data))
-        self.current_data = self.undo_stack.pop()
-        self.display_data(self.current_data)
+        self.history.undo(self.current_data)
+        self.update_view()
         messagebox.showinfo("Undo", "Last action undone.")
         self.status_var.set("Last action undone.")
         self._update_undo_redo_button_states()  # Cập nhật trạng thái nút
 
     def redo_last_action(self):
-        if not self.redo_stack:
+        if not self.history.redo_stack:
             messagebox.showinfo("Info", "No actions to redo.")
             return
-        self.undo_stack.append(copy.deepcopy(self.current_data))
-        self.current_data = self.redo_stack.pop()
+        self.history.redo(self.current_data)
 
-        self.display_data(self.current_data)
+        self.update_view()
         messagebox.showinfo("Redo", "Last action redone.")
         self.status_var.set("Last action redone.")
         self._update_undo_redo_button_states()  # Cập nhật trạng thái nút
 
     def filter_data(self):
+        if not self._require_in_memory():
+            return
         if not self.current_data:
             messagebox.showinfo("Info", "No data loaded to filter.")
             return
 
-        col_name = simpledialog.askstring("Filter Column", "Enter the column name to filter:")
-        if not col_name:
+        expression = simpledialog.askstring(
+            "Filter",
+            "Enter a filter expression, e.g.\n"
+            "  Sales > 100 AND Region = 'North'\n"
+            "  NOT (Product IN ('A', 'B') OR Note IS NULL)\n"
+            "  [Order Date] BETWEEN '2024-01-01' AND '2024-03-31'\n"
+            "Or enter just a column name to filter by one value:")
+        if not expression:
             return
 
         try:
-            df = pd.DataFrame(self.current_data)
-
-            if col_name not in df.columns:
-                messagebox.showwarning("Not Found", f"Column '{col_name}' not found.")
+            col_name = expression.strip()
+            if col_name in self.current_data:
+                # Cách lọc cũ: tên cột rồi giá trị (so sánh bằng theo chuỗi hiển thị)
+                filter_value = simpledialog.askstring("Filter Value",
+                                                      f"Enter value to filter rows where '{col_name}' equals:")
+                if filter_value is None:
+                    return
+                expression = f"{quote_column(col_name)} = {quote_value(filter_value)}"
+
+            # Bộ lọc mới được xếp chồng lên các bộ lọc đang bật; kết quả chỉ là vector id dòng
+            before = self.view.state()
+            self.view.add_filter(expression)
+            row_ids = self.view.row_ids(self.current_data)
+            if expression in self.view.skipped:
+                self.view.restore(before)
+                raise FilterError(f"Cannot apply filter '{expression}'.")
+            if row_ids is not None and len(row_ids) == 0:
+                self.view.restore(before)
+                messagebox.showinfo("No Match", f"No rows match '{expression}'.")
+                self.status_var.set(f"No match for filter {expression}.")
                 return
 
-            filter_value = simpledialog.askstring("Filter Value",
-                                                  f"Enter value to filter rows where '{col_name}' equals:")
-            if filter_value is None:
-                return
-
-            # So sánh dưới dạng chuỗi
-            filtered_df = df[df[col_name].astype(str) == filter_value]
-
-            if filtered_df.empty:
-                messagebox.showinfo("No Match", f"No rows found where '{col_name}' equals '{filter_value}'.")
-                self.status_var.set(f"No match for filter '{col_name}' == '{filter_value}'.")
-                return
-
-            self.display_data(filtered_df.to_dict(orient='records'))
-            self.status_var.set(f"Filtered rows where {col_name} == {filter_value}")
+            self.history.set_view(self.view, before, self.view.state(), label=f"filter {expression}")
+            self.update_view()
+            self.status_var.set(self._view_status())
 
+        except FilterError as e:
+            messagebox.showerror("Invalid Filter", str(e))
+            self.status_var.set(f"Invalid filter: {e}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to filter data: {e}")
             self.status_var.set(f"Error filtering data: {e}")
 
+    def toggle_filter(self):
+        if not self.view.filters:
+            messagebox.showinfo("Info", "No filters to toggle.")
+            return
+        self.view.row_ids(self.current_data)
+        listing = "\n".join(f"{i + 1}. [{'on' if enabled else 'off'}] {text}"
+                            + (" (skipped: column not found)" if text in self.view.skipped else "")
+                            for i, (text, enabled) in enumerate(self.view.filters))
+        choice = simpledialog.askstring("Toggle Filter", f"{listing}\n\nEnter the number of the filter to turn on/off:")
+        if not choice:
+            return
+        try:
+            position = int(choice) - 1
+            if not 0 <= position < len(self.view.filters):
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Invalid Choice", f"'{choice}' is not a filter number.")
+            return
+
+        before = self.view.state()
+        self.view.toggle(position)
+        self.history.set_view(self.view, before, self.view.state(), label="toggle filter")
+        self.update_view()
+        self.status_var.set(self._view_status())
+
+    def clear_filters(self):
+        if not self.view.filters:
+            messagebox.showinfo("Info", "No filters to clear.")
+            return
+        before = self.view.state()
+        self.view.clear()
+        self.history.set_view(self.view, before, self.view.state(), label="clear filters")
+        self.update_view()
+        self.status_var.set(self._view_status())
+
     def save_file(self):
+        if not self._require_in_memory():
+            return
+        if self.saver is not None:
+            messagebox.showwarning("Saving", f"Still saving {self.saver.path} (Esc to cancel).")
+            return
         file_path = filedialog.asksaveasfilename(
             title="Save File",
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("CSV files", "*.csv"), ("CSV files (gzip)", "*.csv.gz"), ("CSV files (zstd)", "*.csv.zst"),
+                       ("JSON files", "*.json"), ("NDJSON files", "*.ndjson *.jsonl *.ndjson.gz"),
+                       ("Table files (binary columns)", "*.dltable"), ("All files", "*.*")]
         )
         if not file_path:
             return
 
         try:
-            if file_path.endswith('.csv'):
-                with open(file_path, mode='w', newline='', encoding='utf-8') as f:
-                    all_keys = set()
-                    for row in self.current_data:
-                        all_keys.update(row.keys())
-                    writer = csv.DictWriter(f, fieldnames=list(all_keys))
-                    writer.writeheader()
-                    writer.writerows(self.current_data)
-            elif file_path.endswith('.json'):
-                with open(file_path, mode='w', encoding='utf-8') as f:
-                    json.dump(self.current_data, f, ensure_ascii=False, indent=4)
-            messagebox.showinfo("Success", f"File saved successfully: {file_path}")
-            self.status_var.set(f"File saved: {file_path}")
+            # Lưu cả bảng (không áp bộ lọc) theo thứ tự đang sắp xếp. Ghi trong luồng nền trên một bản sao
+            # của bảng (dùng chung mảng cột, không sao chép dữ liệu); thứ tự dòng áp dụng theo từng khối khi ghi.
+            order = self.view.order(self.current_data)
+            self.saver = FileSaver(self.current_data.copy(), file_path, order)
+            self.saver.start()
+            self.status_var.set(f"Saving {file_path}... (Esc to cancel)")
+            self.root.after(50, self._poll_saver, self.saver)
         except Exception as e:
+            self.saver = None
             messagebox.showerror("Error", f"Failed to save file:\n{e}")
             self.status_var.set(f"Error saving file: {e}")
 
+    def _poll_saver(self, saver):
+        while True:
+            try:
+                message = saver.messages.get_nowait()
+            except queue.Empty:
+                self.root.after(100, self._poll_saver, saver)
+                return
+
+            kind = message[0]
+            if kind == 'progress':
+                _, done, total = message
+                self.status_var.set(f"Saving {saver.path}: {done:,} / {total:,} rows (Esc to cancel)")
+                continue
+
+            self.saver = None
+            if kind == 'done':
+                messagebox.showinfo("Success", f"File saved successfully: {saver.path}")
+                self.status_var.set(f"File saved: {saver.path}")
+            elif kind == 'cancelled':
+                self.status_var.set("Saving cancelled; the file was not changed.")
+            else:
+                messagebox.showerror("Error", f"Failed to save file:\n{message[1]}")
+                self.status_var.set(f"Error saving file: {message[1]}")
+            return
+
     def close_app(self):
         if messagebox.askyesno("Exit", "Do you want to exit?"):
+            shutdown()
+            if self.chart_panel is not None:
+                self.chart_panel.close()
+                self.chart_panel = None
             self.root.quit()
 
     def sort_column(self, ascending=True):
-        col_name = simpledialog.askstring("Sort Column", "Enter the column name to sort:")
+        if not self._require_in_memory():
+            return
+        col_name = simpledialog.askstring("Sort Column", "Enter the column name to sort\n"
+                                                         "(or several columns, e.g. Region, Sales desc):")
         if not col_name:
             return
         if not self.current_data:
@@ -456,30 +798,88 @@ class DataViewerApp:
             return
 
         try:
-            df = pd.DataFrame(self.current_data)
-
-            if col_name not in df.columns:
-                messagebox.showwarning("Not Found", f"Column '{col_name}' not found.")
+            keys = self._parse_sort_keys(col_name, ascending)
+            if keys is None:
                 return
 
-            self._record_current_state_for_undo()
-
-            # Thử chuyển sang số, nếu thất bại thì giữ nguyên chuỗi
-            df[col_name] = pd.to_numeric(df[col_name], errors='ignore')
-
-            # Sắp xếp
-            df = df.sort_values(by=col_name, ascending=ascending, na_position='last')
+            # Thứ tự chỉ là một hoán vị trên bảng gốc (nhớ theo phiên bản cột), dữ liệu không bị đổi chỗ
+            before = self.view.state()
+            self.view.set_sort(keys)
+            label = ", ".join(f"'{name}'" for name, _ in keys)
+            self.history.set_view(self.view, before, self.view.state(), label=f"sort by {label}")
+            self.update_view()
 
-            self.current_data = df.to_dict(orient='records')
-            self.display_data(self.current_data)
-
-            messagebox.showinfo("Sort", f"Data sorted by '{col_name}' {'ascending' if ascending else 'descending'}.")
-            self.status_var.set(f"Data sorted by '{col_name}'.")
+            messagebox.showinfo("Sort", f"Data sorted by {label} {'ascending' if ascending else 'descending'}.")
+            self.status_var.set(f"Data sorted by {label}.")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to sort data: {e}")
             self.status_var.set(f"Error sorting data: {e}")
 
+    def _parse_sort_keys(self, text, ascending):
+        # "Region, Sales desc" -> [('Region', ascending), ('Sales', False)]; tên cột đúng nguyên văn được ưu tiên
+        if text.strip() in self.current_data:
+            return [(text.strip(), ascending)]
+        keys = []
+        for part in text.split(','):
+            name, direction = part.strip(), ascending
+            words = name.rsplit(None, 1)
+            if name not in self.current_data and len(words) == 2 and words[1].lower() in ('asc', 'desc'):
+                name, direction = words[0], words[1].lower() == 'asc'
+            if name not in self.current_data:
+                messagebox.showwarning("Not Found", f"Column '{name}' not found.")
+                return None
+            keys.append((name, direction))
+        return keys
+
+    def top_rows(self, largest=True):
+        # Chỉ cần vài trang đầu: chọn N dòng lớn / nhỏ nhất (O(n)) thay vì sắp xếp cả bảng
+        if not self._require_in_memory():
+            return
+        if not self.current_data:
+            messagebox.showwarning("No Data", "No data loaded to sort.")
+            return
+        col_name = simpledialog.askstring("Top N", "Enter the column name:")
+        if not col_name:
+            return
+        if col_name not in self.current_data:
+            messagebox.showwarning("Not Found", f"Column '{col_name}' not found.")
+            return
+        count = simpledialog.askstring("Top N", f"How many rows with the {'largest' if largest else 'smallest'} "
+                                                f"'{col_name}' to show?", initialvalue="1000")
+        if not count:
+            return
+        try:
+            limit = int(count.replace(',', ''))
+            if limit <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Invalid Number", f"'{count}' is not a positive whole number.")
+            return
+
+        try:
+            before = self.view.state()
+            self.view.set_sort([(col_name, not largest)], limit=limit)
+            kind = 'largest' if largest else 'smallest'
+            self.history.set_view(self.view, before, self.view.state(), label=f"top {limit} by '{col_name}'")
+            self.update_view()
+            self.status_var.set(f"{self._view_status()} ({kind} '{col_name}', empty cells skipped)")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to select top rows: {e}")
+            self.status_var.set(f"Error selecting top rows: {e}")
+
+    def clear_sort(self):
+        if not self.view.sort_keys:
+            messagebox.showinfo("Info", "Data is already in its original order.")
+            return
+        before = self.view.state()
+        self.view.set_sort([])
+        self.history.set_view(self.view, before, self.view.state(), label="original order")
+        self.update_view()
+        self.status_var.set(self._view_status())
+
     def create_pie_chart(self):
+        if not self._require_in_memory():
+            return
         if not self.current_data:
             messagebox.showinfo("Info", "No data loaded to create a chart.")
             return
@@ -489,14 +889,17 @@ class DataViewerApp:
             return
 
         try:
-            df = pd.DataFrame(self.current_data)
-
-            if col_name not in df.columns:
+            if col_name not in self.current_data:
                 messagebox.showwarning("Column Not Found", f"Column '{col_name}' not found in the data.")
                 return
 
+            key = self._chart_key('pie', col_name)
+            if self._reshow_chart(key):
+                self.status_var.set(f"Pie chart for '{col_name}' is up to date.")
+                return
+
             # Lọc bỏ giá trị null, rỗng
-            series = df[col_name].dropna().astype(str).str.strip()
+            series = pd.Series(self.current_data.formatted(col_name)).str.strip()
             series = series[series != ""]
 
             if series.empty:
@@ -505,11 +908,8 @@ class DataViewerApp:
 
             value_counts = series.value_counts()
 
-            plt.figure(figsize=(8, 8))
-            plt.pie(value_counts, labels=value_counts.index, autopct='%1.1f%%', startangle=90)
-            plt.title(f"Pie Chart of {col_name}")
-            plt.axis('equal')  # Giữ tỷ lệ tròn
-            plt.show()
+            self._show_chart_panel().show_pie(value_counts.index, value_counts.to_numpy(),
+                                              f"Pie Chart of {col_name}", key=key)
 
             self.status_var.set(f"Pie chart created for '{col_name}'.")
         except Exception as e:
@@ -517,6 +917,8 @@ class DataViewerApp:
             self.status_var.set(f"Error creating pie chart: {e}")
 
     def create_custom_bar_chart(self):
+        if not self._require_in_memory():
+            return
         if not self.current_data:
             messagebox.showinfo("Info", "No data loaded to create a chart.")
             return
@@ -526,7 +928,7 @@ class DataViewerApp:
         if not x_col_name:
             return
 
-        if not self.current_data or x_col_name not in self.current_data[0]:
+        if not self.current_data or x_col_name not in self.current_data:
             messagebox.showwarning("Column Not Found", f"Category column '{x_col_name}' not found in the data.")
             return
 
@@ -535,75 +937,51 @@ class DataViewerApp:
         if not y_col_name:
             return
 
-        if not self.current_data or y_col_name not in self.current_data[0]:
+        if not self.current_data or y_col_name not in self.current_data:
             messagebox.showwarning("Column Not Found", f"Value column '{y_col_name}' not found in the data.")
             return
 
         aggregation_method = simpledialog.askstring("Aggregation Method",
-                                                    "Enter aggregation method (sum, mean, count). Default is sum:")
+                                                    "Enter aggregation method (sum, mean, count, min, max, median). Default is sum:")
         if not aggregation_method:
             aggregation_method = "sum"
         aggregation_method = aggregation_method.lower()
 
-        if aggregation_method not in ["sum", "mean", "count"]:
+        if aggregation_method not in AGGREGATIONS:
             messagebox.showwarning("Invalid Method", "Invalid aggregation method. Using 'sum' by default.")
             aggregation_method = "sum"
 
-        aggregated_data = defaultdict(lambda: {'values': [], 'count': 0})
-
-        for row in self.current_data:
-            category = row.get(x_col_name)
-            value = row.get(y_col_name)
+        key = self._chart_key('bar', x_col_name, y_col_name, aggregation_method)
+        if self._reshow_chart(key):
+            self.status_var.set(f"Bar chart for {y_col_name} by {x_col_name} is up to date.")
+            return
 
-            if category is not None and str(category).strip() != '':
-                category_key = str(category)
-                try:
-                    numeric_val = float(value)
-                    aggregated_data[category_key]['values'].append(numeric_val)
-                    aggregated_data[category_key]['count'] += 1
-                except (ValueError, TypeError):
-                    continue
+        # Gom nhóm vectorized trên cột có kiểu, bỏ qua nhãn rỗng và giá trị không phải số
+        table = self.current_data
+        labels, values = parallel_group_by(table.column(x_col_name), table.numeric(y_col_name), aggregation_method,
+                                           valid=~table.missing(x_col_name), workers=self.workers)
+        keep = [i for i, label in enumerate(labels) if format_value(label).strip() != '']
 
-        if not aggregated_data:
+        if not keep:
             messagebox.showinfo("No Data",
                                 "No valid data found for charting after aggregation. Check your column selections and data types.")
             return
 
-        final_categories = []
-        final_values = []
+        final_categories, final_values = sorted_groups([format_value(labels[i]) for i in keep], values[keep])
 
-        try:
-            sorted_keys = sorted(aggregated_data.keys(), key=lambda x: float(x))
-        except ValueError:
-            sorted_keys = sorted(aggregated_data.keys())
-
-        for cat_key in sorted_keys:
-            final_categories.append(cat_key)
-            if aggregation_method == "sum":
-                final_values.append(sum(aggregated_data[cat_key]['values']))
-            elif aggregation_method == "mean":
-                if aggregated_data[cat_key]['count'] > 0:
-                    final_values.append(sum(aggregated_data[cat_key]['values']) / aggregated_data[cat_key]['count'])
-                else:
-                    final_values.append(0)
-            elif aggregation_method == "count":
-                final_values.append(aggregated_data[cat_key]['count'])
-
-        if not final_categories or not final_values:
+        if not final_categories or not len(final_values):
             messagebox.showinfo("No Data", "No valid data to plot after aggregation.")
             return
 
-        plt.figure(figsize=(12, 7))
-        bars = plt.bar(final_categories, final_values, color='teal')
-        plt.xlabel(x_col_name)
-        plt.ylabel(f"{aggregation_method.capitalize()} of {y_col_name}")
-        plt.title(f"{aggregation_method.capitalize()} of {y_col_name} by {x_col_name}")
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        plt.show()
+        self._show_chart_panel().show_bars(final_categories, final_values,
+                                           f"{aggregation_method.capitalize()} of {y_col_name} by {x_col_name}",
+                                           x_col_name, f"{aggregation_method.capitalize()} of {y_col_name}",
+                                           color='teal', rotation=45, key=key)
         self.status_var.set(f"Bar chart created for {y_col_name} by {x_col_name}.")
 
     def add_month_year_column(self):
+        if not self._require_in_memory():
+            return
         if not self.current_data:
             messagebox.showinfo("Info", "No data loaded to add 'MonthYear' column.")
             return
@@ -613,79 +991,74 @@ class DataViewerApp:
         if not date_col_name:
             return
 
-        if date_col_name not in self.current_data[0]:
+        if date_col_name not in self.current_data:
             messagebox.showwarning("Column Not Found", f"Date column '{date_col_name}' not found in the data.")
             return
 
-        if "MonthYear" in self.current_data[0]:
+        if "MonthYear" in self.current_data:
             if not messagebox.askyesno("Overwrite Column",
                                        "'MonthYear' column already exists. Do you want to overwrite it?"):
                 return
 
-        self._record_current_state_for_undo()  # Ghi lại trạng thái trước khi thêm cột
-
-        new_data_with_monthyear = []
-        parsed_count = 0
-        for row in self.current_data:
-            new_row = row.copy()
-            date_str = row.get(date_col_name)
-            month_year_value = ""
-
-            if date_str is not None and str(date_str).strip() != '':
-                try:
-                    date_obj = None
-                    if 'T' in date_str:
-                        date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                    elif '-' in date_str and len(date_str) >= 10:
-                        try:
-                            date_obj = datetime.strptime(date_str[:10], '%Y-%m-%d')
-                        except ValueError:
-                            date_obj = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-                    elif '/' in date_str:
-                        try:
-                            date_obj = datetime.strptime(date_str, '%m/%d/%Y')
-                        except ValueError:
-                            try:
-                                date_obj = datetime.strptime(date_str, '%d/%m/%Y')
-                            except ValueError:
-                                pass
-                    elif len(date_str) == 7 and date_str[4] == '-':
-                        try:
-                            date_obj = datetime.strptime(date_str, '%Y-%m')
-                        except ValueError:
-                            pass
-                    elif len(date_str) == 6 and date_str.isdigit():
-                        try:
-                            date_obj = datetime.strptime(date_str, '%Y%m')
-                        except ValueError:
-                            pass
-
-                    if date_obj:
-                        month_year_value = date_obj.year * 100 + date_obj.month
-                        parsed_count += 1
-                except (ValueError, TypeError):
-                    pass
-
-            new_row["MonthYear"] = month_year_value
-            new_data_with_monthyear.append(new_row)
+        self._add_date_key_column(date_col_name, 'month')
+
+    def add_date_key_column(self):
+        if not self._require_in_memory():
+            return
+        if not self.current_data:
+            messagebox.showinfo("Info", "No data loaded to add a date column.")
+            return
+
+        date_col_name = simpledialog.askstring("Add Date Key Column",
+                                               "Enter the column name containing date information (e.g., 'Date', 'TransactionDate'):")
+        if not date_col_name:
+            return
+
+        if date_col_name not in self.current_data:
+            messagebox.showwarning("Column Not Found", f"Date column '{date_col_name}' not found in the data.")
+            return
+
+        key = simpledialog.askstring("Add Date Key Column", f"Enter the key to derive ({', '.join(DATE_KEYS)}):")
+        if not key:
+            return
+        key = key.strip().lower()
+        if key not in DATE_KEYS:
+            messagebox.showwarning("Invalid Key", f"Unknown date key '{key}'.")
+            return
+
+        if DATE_KEYS[key] in self.current_data:
+            if not messagebox.askyesno("Overwrite Column",
+                                       f"'{DATE_KEYS[key]}' column already exists. Do you want to overwrite it?"):
+                return
+
+        self._add_date_key_column(date_col_name, key)
+
+    def _add_date_key_column(self, date_col_name, key):
+        name = DATE_KEYS[key]
+        table = self.current_data
+        # Định dạng ngày được dò một lần từ mẫu, cả cột được đọc theo lô và nhớ theo phiên bản cột
+        dates = table.cached(date_col_name, 'dates', lambda values: parse_dates(table.formatted(date_col_name))[0])
+        parsed_count = int((~np.isnat(dates)).sum())
 
         if parsed_count == 0:
             messagebox.showwarning("No Dates Parsed",
-                                   "Could not parse any dates from the specified column into MonthYear format. Check your date column format.")
+                                   f"Could not parse any dates from the specified column into {name} format. Check your date column format.")
             return
 
-        self.current_data = new_data_with_monthyear
-        self.display_data(self.current_data)
-        messagebox.showinfo("Success", f"'MonthYear' column added successfully. ({parsed_count} dates parsed)")
-        self.status_var.set(f"'MonthYear' column added. {parsed_count} dates parsed.")
+        self.history.add_column(table, name, date_key(dates, key))
+        self.update_view()
+        messagebox.showinfo("Success", f"'{name}' column added successfully. ({parsed_count} dates parsed)")
+        self.status_var.set(f"'{name}' column added. {parsed_count} dates parsed.")
 
 
     def create_month_year_bar_chart(self):
+        if not self._require_in_memory():
+            return
         if not self.current_data:
             messagebox.showinfo("Info", "No data loaded to create a chart.")
             return
 
-        if "MonthYear" not in self.current_data[0]:
+        if "MonthYear" not in self.current_data:
             messagebox.showwarning("Missing Column", "Please add the 'MonthYear' column first using 'Edit -> Add Column (MonthYear)'.")
             return
 
@@ -693,72 +1066,59 @@ class DataViewerApp:
         if not numeric_col_name:
             return
 
-        if numeric_col_name not in self.current_data[0]:
+        if numeric_col_name not in self.current_data:
             messagebox.showwarning("Column Not Found", f"Numeric column '{numeric_col_name}' not found in the data.")
             return
 
-        aggregation_method = simpledialog.askstring("Aggregation Method", "Enter aggregation method (sum, mean, count). Default is sum:")
+        aggregation_method = simpledialog.askstring("Aggregation Method", "Enter aggregation method (sum, mean, count, min, max, median). Default is sum:")
         if not aggregation_method:
             aggregation_method = "sum"
         aggregation_method = aggregation_method.lower()
 
-        if aggregation_method not in ["sum", "mean", "count"]:
+        if aggregation_method not in AGGREGATIONS:
             messagebox.showwarning("Invalid Method", "Invalid aggregation method. Using 'sum' by default.")
             aggregation_method = "sum"
 
+        key = self._chart_key('month_year', "MonthYear", numeric_col_name, aggregation_method)
+        if self._reshow_chart(key):
+            self.status_var.set(f"Month/Year bar chart for {numeric_col_name} is up to date.")
+            return
 
-        month_year_aggregation = defaultdict(lambda: {'values': [], 'count': 0})
-
-        for row in self.current_data:
-            month_year_key = row.get("MonthYear")
-            numeric_value = row.get(numeric_col_name)
-
-            if month_year_key is not None and str(month_year_key).strip() != '' and numeric_value is not None and str(numeric_value).strip() != '':
-                try:
-                    my_key_str = str(month_year_key) # Ensure key is string
-                    value = float(numeric_value)
+        table = self.current_data
+        labels, values = parallel_group_by(table.column("MonthYear"), table.numeric(numeric_col_name),
+                                           aggregation_method, valid=~table.missing("MonthYear"),
+                                           workers=self.workers)
 
-                    month_year_aggregation[my_key_str]['values'].append(value)
-                    month_year_aggregation[my_key_str]['count'] += 1
-                except (ValueError, TypeError):
-                    continue
+        # Chỉ giữ các nhóm MonthYear là số nguyên (YYYYMM); kiểm tra theo nhóm chứ không theo từng dòng
+        month_year_labels = []
+        keep = []
+        for i, label in enumerate(labels):
+            try:
+                month_year_labels.append(str(int(format_value(label))))
+                keep.append(i)
+            except ValueError:
+                continue
 
-        if not month_year_aggregation:
+        if not keep:
             messagebox.showinfo("No Data", "No valid 'MonthYear' or numeric data found for charting.")
             return
 
-        sorted_month_year_keys_int = sorted([int(k) for k in month_year_aggregation.keys()])
-        sorted_month_year_labels = [str(k) for k in sorted_month_year_keys_int]
-
-        final_values = []
-        for k in sorted_month_year_keys_int:
-            cat_key = str(k) # Convert back to string for dictionary lookup
-            if aggregation_method == "sum":
-                final_values.append(sum(month_year_aggregation[cat_key]['values']))
-            elif aggregation_method == "mean":
-                if month_year_aggregation[cat_key]['count'] > 0:
-                    final_values.append(sum(month_year_aggregation[cat_key]['values']) / month_year_aggregation[cat_key]['count'])
-                else:
-                    final_values.append(0)
-            elif aggregation_method == "count":
-                final_values.append(month_year_aggregation[cat_key]['count'])
+        sorted_month_year_labels, final_values = sorted_groups(month_year_labels, values[keep])
 
-        if not sorted_month_year_labels or not final_values:
+        if not sorted_month_year_labels or not len(final_values):
             messagebox.showinfo("No Data", "No valid data to plot after aggregation.")
             return
 
-        plt.figure(figsize=(12, 7))
-        bars = plt.bar(sorted_month_year_labels, final_values, color='skyblue')
-
-        plt.xlabel(f"Month-Year (YYYYMM)")
-        plt.ylabel(f"{aggregation_method.capitalize()} of {numeric_col_name}")
-        plt.title(f"{aggregation_method.capitalize()} of {numeric_col_name} by Month and Year")
-        plt.xticks(rotation=70, ha='right')
-        plt.tight_layout()
-        plt.show()
+        self._show_chart_panel().show_bars(sorted_month_year_labels, final_values,
+                                           f"{aggregation_method.capitalize()} of {numeric_col_name} by Month and Year",
+                                           "Month-Year (YYYYMM)",
+                                           f"{aggregation_method.capitalize()} of {numeric_col_name}",
+                                           color='skyblue', rotation=70, key=key)
         self.status_var.set(f"Month/Year bar chart created for {numeric_col_name}.")
 
     def rename_column(self):
+        if not self._require_in_memory():
+            return
         if not self.current_data:
             messagebox.showinfo("Info", "No data loaded to rename a column.")
             return
@@ -768,9 +1128,7 @@ class DataViewerApp:
             return
 
         try:
-            df = pd.DataFrame(self.current_data)
-
-            if old_col not in df.columns:
+            if old_col not in self.current_data:
                 messagebox.showwarning("Invalid Column", f"Column '{old_col}' not found.")
                 return
 
@@ -779,24 +1137,23 @@ class DataViewerApp:
                 messagebox.showinfo("Cancelled", "Renaming cancelled.")
                 return
 
-            self._record_current_state_for_undo()
-
-            df.rename(columns={old_col: new_col}, inplace=True)
+            self.history.rename_column(self.current_data, old_col, new_col)
 
             if self.extra_column == old_col:
                 self.extra_column = new_col
 
-            self.current_data = df.to_dict(orient='records')
-            self.display_data(self.current_data)
+            self.update_view()
 
             messagebox.showinfo("Renamed", f"Column '{old_col}' has been renamed to '{new_col}'.")
-            self.status_var.set(f"Column '{old_col}' renamed to '{new_col}'.")
+            self._report_skipped(f"Column '{old_col}' renamed to '{new_col}'.")
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to rename column: {e}")
             self.status_var.set(f"Error renaming column: {e}")
 
     def create_line_chart(self):
+        if not self._require_in_memory():
+            return
         if not self.current_data:
             messagebox.showinfo("Info", "No data loaded to create a line chart.")
             return
@@ -807,49 +1164,92 @@ class DataViewerApp:
         if not x_col or not y_col:
             return
 
-        if x_col not in self.current_data[0] or y_col not in self.current_data[0]:
+        if x_col not in self.current_data or y_col not in self.current_data:
             messagebox.showwarning("Column Not Found", "One or both columns not found.")
             return
 
-        try:
-            x_vals = []
-            y_vals = []
-
-            for row in self.current_data:
-                x_val = row.get(x_col)
-                y_val = row.get(y_col)
-
-                if x_val is None or y_val is None:
-                    continue
-
-                try:
-                    y_val_float = float(y_val)
-                    x_vals.append(str(x_val))  # Convert x to string for consistent labels
-                    y_vals.append(y_val_float)
-                except ValueError:
-                    continue  # skip if y cannot be converted to float
+        key = self._chart_key('line', x_col, y_col)
+        if self._reshow_chart(key):
+            self.status_var.set(f"Line chart for {y_col} over {x_col} is up to date.")
+            return
 
-            if not x_vals or not y_vals:
+        try:
+            x, x_kind, labels = self._line_x(x_col)
+            y = self.current_data.numeric(y_col)
+            rows = np.flatnonzero(~np.isnan(x) & ~np.isnan(y))  # bỏ các dòng y không phải số hoặc x rỗng
+            if not len(rows):
                 messagebox.showinfo("No Data", "No valid numeric data found for plotting.")
                 return
+            x, y = x[rows], y[rows]
+            if np.any(x[1:] < x[:-1]):
+                order = np.argsort(x, kind='stable')  # đường nối các điểm theo thứ tự X
+                x, y = x[order], y[order]
 
-            plt.figure(figsize=(12, 6))
-            plt.plot(x_vals, y_vals, marker='o', linestyle='-', color='blue')
-            plt.title(f"{y_col} over {x_col}")
-            plt.xlabel(x_col)
-            plt.ylabel(y_col)
-            plt.xticks(rotation=45)
-            plt.grid(True)
-            plt.tight_layout()
-            plt.show()
-            self.status_var.set(f"Line chart created for {y_col} over {x_col}.")
-
+            # Vẽ trong khung biểu đồ của cửa sổ; chỉ vài nghìn điểm (min / max mỗi pixel) được vẽ mỗi lần
+            panel = self._show_chart_panel()
+            panel.show_line(x, y, f"{y_col} over {x_col}", x_col, y_col, x_kind, labels, key=key)
+            self.status_var.set(f"Line chart created for {y_col} over {x_col} ({len(x):,} points, "
+                                f"{panel.series.shown:,} drawn; zoom / pan to see detail).")
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to plot line chart:\n{e}")
             self.status_var.set(f"Error creating line chart: {e}")
 
 
+    def _line_x(self, x_col):
+        # Trục X của biểu đồ đường: cột số giữ giá trị số, cột ngày đọc thành ngày,
+        # cột chữ khác dùng vị trí dòng (nhãn lấy theo vị trí khi vẽ vạch chia)
+        table = self.current_data
+        if table.column(x_col).dtype.kind in 'iuf':
+            return table.numeric(x_col), 'number', None
+        present = ~table.missing(x_col)
+        texts = table.formatted(x_col)
+        # Thử định dạng ngày trên một mẫu trước: cột chữ thường không phải đọc thử cả cột
+        if detect_format(texts[::max(len(texts) // 1000, 1)]) is not None:
+            dates = table.cached(x_col, 'dates', lambda values: parse_dates(texts)[0])
+            parsed = ~np.isnat(dates)
+        else:
+            parsed = np.zeros(len(texts), dtype=bool)
+        if parsed.any() and parsed.sum() >= 0.9 * present.sum():
+            x = np.full(len(dates), np.nan)
+            x[parsed] = mdates.date2num(dates[parsed])
+            return x, 'date', None
+        # Vị trí dòng theo thứ tự đang hiển thị (sắp xếp của view), như trên lưới
+        order = self.view.order(table)
+        x = np.empty(len(table), dtype=np.float64)
+        if order is None:
+            x[:] = np.arange(len(table))
+        else:
+            x[order] = np.arange(len(order))
+            texts = texts[order]
+        x[~present] = np.nan
+        return x, 'label', texts
+
+    def _chart_key(self, kind, *columns_and_options):
+        # Khóa dữ liệu của một biểu đồ: bảng, phiên bản các cột dùng tới (đổi khi sửa / hoàn tác), tùy chọn và
+        # thứ tự sắp xếp của view. Sắp xếp không đổi phiên bản cột (chỉ là hoán vị id dòng) nhưng trục X dạng nhãn
+        # của biểu đồ đường đi theo thứ tự đang hiển thị
+        table = self.current_data
+        order = tuple((name, ascending, table.column_version(name) if name in table else None)
+                      for name, ascending in self.view.sort_keys)
+        return (kind, id(table), order) + tuple((item, table.column_version(item)) if item in table else item
+                                                for item in columns_and_options)
+
+    def _reshow_chart(self, key):
+        # Biểu đồ với đúng dữ liệu này đang có trong khung: chỉ hiện lại khung, không tính / vẽ lại
+        if self.chart_panel is None or not self.chart_panel.showing(key):
+            return False
+        self._show_chart_panel()
+        return True
+
+    def _show_chart_panel(self):
+        if self.chart_panel is None:
+            self.chart_panel = ChartPanel(self.root)
+        if not self.chart_panel.frame.winfo_manager():
+            self.chart_panel.frame.pack(side='bottom', fill='both', before=self.undo_button)
+        return self.chart_panel
+
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = DataViewerApp(root)
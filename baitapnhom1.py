@@ -3,6 +3,8 @@ from tkinter import ttk, filedialog, messagebox, simpledialog
 import csv
 import json
 
+from data_grid import VirtualGrid
+
 class DataViewerApp:
     def __init__(self, root):
         self.root = root
@@ -47,8 +49,9 @@ class DataViewerApp:
         sort_menu.add_command(label="Sort A -> Z", command=lambda: self.sort_column(ascending=True))
         sort_menu.add_command(label="Sort Z -> A", command=lambda: self.sort_column(ascending=False))
 
-        self.tree = ttk.Treeview(self.root, show="headings")
-        self.tree.pack(expand=True, fill='both')
+        self.grid = VirtualGrid(self.root)
+        self.grid.pack(expand=True, fill='both')
+        self.tree = self.grid.tree
 
         self.status_var = tk.StringVar()
         self.status_var.set("Baby IT")
@@ -89,21 +92,16 @@ class DataViewerApp:
             messagebox.showerror("Error", f"Failed to load file:\n{e}")
 
     def display_data(self, data):
-        self.tree.delete(*self.tree.get_children())
-        self.tree["columns"] = []
-
         if not data:
+            self.grid.clear()
             return
 
         columns = list(data[0].keys())
-        self.tree["columns"] = columns
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100, anchor='w')
-
-        for row in data:
-            values = [row.get(col, "") for col in columns]
-            self.tree.insert("", "end", values=values)
+
+        def fetch_rows(start, stop, names):
+            return [[row.get(col, "") for col in names] for row in data[start:stop]]
+
+        self.grid.set_source(columns, len(data), fetch_rows)
 
     def calculate_sum(self):
         col_name = simpledialog.askstring("Select Column", "Enter the column name to calculate sum:")
@@ -0,0 +1,295 @@
+import argparse
+import bz2
+import csv
+import gzip
+import lzma
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from data_io import MultiFileLoader, iter_table_chunks, read_csv_table
+from data_table import DataTable
+from parallel_agg import get_pool, parallel_group_by, parallel_summary, pipeline_states, shutdown
+from pipeline import Pipeline
+from table_groupby import AGGREGATIONS, group_by
+from table_store import TableCache
+
+
+def make_sample_csv(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'Region', 'Product', 'Quantity', 'Sales', 'Zip'])
+        for i in range(rows):
+            writer.writerow([f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                             rng.choice(['North', 'South', 'East', 'West']),
+                             f"P{rng.randint(1, 500)}", rng.randint(1, 50),
+                             round(rng.random() * 1000, 2), f"0{rng.randint(1000, 9999)}"])
+
+
+def timed(label, fn, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<32} {best:8.3f} s")
+    return best, result
+
+
+def sample_file(args, tmp_dir):
+    if args.path:
+        return args.path
+    path = os.path.join(tmp_dir, 'sample.csv')
+    make_sample_csv(path, args.rows)
+    return path
+
+
+def bench_ingest(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = sample_file(args, tmp_dir)
+        print(f"CSV ingestion: {path} ({os.path.getsize(path) / 1048576:.1f} MB)")
+
+        def dict_reader():
+            with open(path, newline='', encoding='utf-8') as f:
+                return list(csv.DictReader(f))
+
+        def reader_to_table():
+            with open(path, newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                return DataTable.from_rows(next(reader), list(reader))
+
+        old, rows = timed("csv.DictReader (list of dicts)", dict_reader, args.repeat)
+        timed("csv.reader + DataTable.from_rows", reader_to_table, args.repeat)
+        new, table = timed("read_csv_table (typed columns)", lambda: read_csv_table(path), args.repeat)
+        assert len(rows) == len(table)
+        print(f"  speedup: {old / new:.1f}x for {len(table):,} rows")
+
+
+def bench_cache(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = sample_file(args, tmp_dir)
+        cache = TableCache(os.path.join(tmp_dir, 'cache'))
+        print(f"Reopen from parsed-data cache: {path} ({os.path.getsize(path) / 1048576:.1f} MB)")
+        parse, table = timed("read_csv_table (parse)", lambda: read_csv_table(path), args.repeat)
+        store, _ = timed("TableCache.store (write)", lambda: cache.store(path, table), 1)
+        hit, cached = timed("TableCache.load (mmap)", lambda: cache.load(path), args.repeat)
+        assert cached.columns == table.columns and len(cached) == len(table)
+        print(f"  speedup: {parse / hit:.1f}x for {len(table):,} rows")
+
+
+def bench_groupby(args):
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 500, args.rows)
+    labels = np.array([f"P{i}" for i in range(500)], dtype=object)[keys]
+    values = rng.random(args.rows) * 1000
+    print(f"Group-by over {args.rows:,} rows, 500 groups")
+
+    def dict_of_lists():
+        groups = {}
+        for key, value in zip(labels, values):
+            groups.setdefault(key, []).append(value)
+        return {key: sum(vals) for key, vals in groups.items()}
+
+    if args.rows <= 2000000:
+        timed("defaultdict of lists + sum()", dict_of_lists, 1)
+    for how in AGGREGATIONS:
+        timed(f"group_by {how} (object keys)", lambda: group_by(labels, values, how), args.repeat)
+    timed("group_by sum (int keys)", lambda: group_by(keys, values, 'sum'), args.repeat)
+
+
+def bench_index(args):
+    rng = np.random.default_rng(0)
+    table = DataTable({
+        'Product': np.array([f"P{i}" for i in range(5000)], dtype=object)[rng.integers(0, 5000, args.rows)],
+        'Sales': rng.random(args.rows) * 1000,
+    })
+    print(f"Indexed filtering over {args.rows:,} rows")
+    timed("scan: formatted == value", lambda: np.flatnonzero(table.formatted('Product') == "P42"), args.repeat)
+    timed("hash index build (first query)", lambda: table.index('Product', 'hash'), 1)
+    timed("hash index lookup", lambda: table.index('Product', 'hash').lookup("P42"), args.repeat)
+    sales = table.column('Sales')
+    timed("scan: 10 <= Sales <= 11", lambda: np.flatnonzero((sales >= 10) & (sales <= 11)), args.repeat)
+    timed("sorted index build (first query)", lambda: table.index('Sales', 'sorted'), 1)
+    timed("sorted index range", lambda: table.index('Sales', 'sorted').range(10, 11), args.repeat)
+    timed("text index prefix 'P42'", lambda: table.index('Product', 'text').prefix("P42"), args.repeat)
+
+
+def bench_topk(args):
+    rng = np.random.default_rng(0)
+    sales = rng.random(args.rows) * 1000
+    sales[rng.random(args.rows) < 0.01] = np.nan
+    k = args.k
+    print(f"Largest {k:,} of {args.rows:,} rows by Sales")
+
+    def peak_mb(fn):
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak / 1048576
+
+    # Bảng mới mỗi lần để không dùng lại thứ tự đã nhớ của lần trước
+    full_sort = lambda: DataTable({'Sales': sales}).sort_order('Sales', ascending=False)[:k]
+    partial = lambda: DataTable({'Sales': sales}).top_k('Sales', k)
+    full, expected = timed("full sort (sort_column path)", full_sort, args.repeat)
+    top, result = timed("top_k (partial selection)", partial, args.repeat)
+    assert np.array_equal(result, expected)
+    print(f"  extra memory: full sort {peak_mb(full_sort):.1f} MB, top_k {peak_mb(partial):.1f} MB")
+    print(f"  speedup: {full / top:.1f}x")
+
+
+def bench_parallel(args):
+    counts = [int(n) for n in args.workers.split(',')] if args.workers else \
+        sorted({1 << i for i in range((os.cpu_count() or 1).bit_length())} | {os.cpu_count() or 1})
+    rng = np.random.default_rng(0)
+    labels = np.array([f"P{i}" for i in range(500)], dtype=object)[rng.integers(0, 500, args.rows)]
+    values = rng.random(args.rows) * 1000
+    print(f"Parallel aggregation over {args.rows:,} rows, workers {counts} ({os.cpu_count()} CPU core(s))")
+
+    def run_file(path, workers):
+        pipeline = Pipeline(group_by='Product', aggregations=[('Sales', 'sum'), ('Quantity', 'max')])
+        states = list(pipeline_states(pipeline, [path], workers))
+        return pipeline.finish(states[0][1])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = sample_file(args, tmp_dir)
+        cases = [("group_by sum (in memory)", lambda n: parallel_group_by(labels, values, 'sum', workers=n)),
+                 ("summary (in memory)", lambda n: parallel_summary(values, workers=n)),
+                 (f"CSV pipeline group-by ({os.path.getsize(path) / 1048576:.0f} MB)", lambda n: run_file(path, n))]
+        for label, fn in cases:
+            base = None
+            for n in counts:
+                fn(n)  # khởi động pool trước khi đo
+                spent, _ = timed(f"{label}, {n} worker(s)", lambda: fn(n), args.repeat)
+                base = base or spent
+                print(f"    speedup vs 1 worker: {base / spent:.2f}x")
+    shutdown()
+
+
+def bench_shards(args):
+    workers = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [os.path.join(tmp_dir, f"day{i:03d}.csv") for i in range(args.files)]
+        for i, path in enumerate(paths):
+            make_sample_csv(path, args.rows // args.files, seed=i)
+        size = sum(os.path.getsize(path) for path in paths) / 1048576
+        print(f"Open {args.files} shards ({size:.1f} MB, {args.rows:,} rows) as one table, {workers} worker(s)")
+
+        def load(executor):
+            loader = MultiFileLoader(paths, 'source_file', executor)
+            loader.run()  # chạy ngay trong luồng hiện tại
+            while True:
+                message = loader.messages.get()
+                if message[0] != 'progress':
+                    return message[1]
+
+        serial, table = timed("one file after another", lambda: load(None), args.repeat)
+        get_pool(workers)
+        pooled, _ = timed(f"process pool ({workers} workers)", lambda: load(get_pool(workers)), args.repeat)
+        assert len(table) == args.files * (args.rows // args.files)
+        print(f"  speedup: {serial / pooled:.2f}x")
+    shutdown()
+
+
+def bench_compressed(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = sample_file(args, tmp_dir)
+        size = os.path.getsize(path) / 1048576
+        print(f"Load throughput, uncompressed vs compressed: {path} ({size:.1f} MB uncompressed)")
+        files = [('plain', path)]
+        for label, module in (('gzip', gzip), ('bz2', bz2), ('xz', lzma)):
+            target = os.path.join(tmp_dir, f"sample.csv.{label}")
+            with open(path, 'rb') as src, module.open(target, 'wb') as dst:
+                while True:
+                    block = src.read(1 << 20)
+                    if not block:
+                        break
+                    dst.write(block)
+            files.append((label, target))
+
+        def peak_mb(target):
+            # Đọc theo khối, không giữ các khối: bộ nhớ đỉnh chỉ phụ thuộc kích thước khối
+            tracemalloc.start()
+            for _ in iter_table_chunks(target, 100000):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak / 1048576
+
+        for label, target in files:
+            spent, table = timed(f"read_csv_table ({label})", lambda: read_csv_table(target), args.repeat)
+            print(f"    {os.path.getsize(target) / 1048576:7.1f} MB on disk, {size / spent:6.1f} MB/s of CSV, "
+                  f"{len(table):,} rows, streaming peak {peak_mb(target):.1f} MB")
+
+
+def bench_linechart(args):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from chart_panel import DownsampledLine
+
+    rng = np.random.default_rng(0)
+    x = np.arange(args.rows, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=args.rows))
+    print(f"Line chart redraw with {args.rows:,} points (Agg, 1000 px wide)")
+
+    def figure():
+        fig = Figure(figsize=(10, 3.5), dpi=100)
+        FigureCanvasAgg(fig)
+        return fig, fig.add_subplot()
+
+    fig, axes = figure()
+    axes.plot(x, y, linewidth=1)
+    full, _ = timed("draw every point", fig.canvas.draw, args.repeat)
+    fig, axes = figure()
+    series = DownsampledLine(axes, x, y, linewidth=1)
+    sampled, _ = timed("draw min/max per pixel", fig.canvas.draw, args.repeat)
+    print(f"    {series.shown:,} points drawn, speedup {full / sampled:.1f}x")
+
+    def zoom():
+        low = rng.uniform(0, args.rows * 0.9)
+        axes.set_xlim(low, low + args.rows * 0.05)  # lấy mẫu lại trong khoảng mới
+        fig.canvas.draw()
+
+    timed("zoom to 5% + resample + draw", zoom, args.repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the data viewer engine")
+    parser.add_argument('--rows', type=int, default=1000000, help="rows in the generated sample file")
+    parser.add_argument('--path', help="use an existing CSV file instead of a generated one")
+    parser.add_argument('--repeat', type=int, default=3)
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+    sub.add_parser('ingest', help="csv.DictReader vs single-pass typed CSV ingestion").set_defaults(func=bench_ingest)
+    sub.add_parser('cache', help="parsing a CSV vs reopening it from the table cache").set_defaults(func=bench_cache)
+    sub.add_parser('groupby', help="per-row Python grouping vs the vectorized group-by engine").set_defaults(
+        func=bench_groupby)
+    sub.add_parser('index', help="full-column scans vs lazily built hash / sorted indexes").set_defaults(
+        func=bench_index)
+    topk = sub.add_parser('topk', help="full sort vs partial top-k selection")
+    topk.add_argument('-k', type=int, default=1000, help="number of rows to keep")
+    topk.set_defaults(func=bench_topk)
+    parallel = sub.add_parser('parallel', help="chunked aggregation on 1, 2, 4, ... worker processes")
+    parallel.add_argument('--workers', help="comma-separated worker counts (default: powers of two up to the "
+                                            "number of CPU cores)")
+    parallel.set_defaults(func=bench_parallel)
+    sub.add_parser('compressed', help="loading plain vs gzip / bz2 / xz compressed CSV").set_defaults(
+        func=bench_compressed)
+    sub.add_parser('linechart', help="drawing every point vs min/max-per-pixel downsampling").set_defaults(
+        func=bench_linechart)
+    shards = sub.add_parser('shards', help="opening many CSV shards one by one vs on a process pool")
+    shards.add_argument('--files', type=int, default=50)
+    shards.set_defaults(func=bench_shards)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+from tkinter import ttk
+
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+import numpy as np
+
+from downsample import minmax_indices, visible_range
+
+
+class DownsampledLine:
+    # Đường x -> y (x tăng dần, không có NaN) vẽ từ dữ liệu đã rút gọn theo số pixel của trục X.
+    # Khi khoảng trục X đổi (phóng to, kéo, về ban đầu) hoặc khung đổi kích thước, điểm được lấy lại từ dữ liệu gốc
+    # trong khoảng đang nhìn thấy: càng phóng to càng thấy chi tiết mà số điểm phải vẽ không đổi.
+    def __init__(self, axes, x, y, **style):
+        self.axes = axes
+        self.x = x
+        self.y = y
+        self.shown = 0  # số điểm đang vẽ
+        (self.line,) = axes.plot([], [], **style)
+        self._callback = axes.callbacks.connect('xlim_changed', lambda ax: self.resample())
+        if x[0] == x[-1]:
+            axes.set_xlim(x[0] - 0.5, x[-1] + 0.5)
+        else:
+            axes.set_xlim(x[0], x[-1])
+        low, high = float(y.min()), float(y.max())
+        margin = (high - low) * 0.05 or 0.5
+        axes.set_ylim(low - margin, high + margin)
+
+    def resample(self):
+        low, high = sorted(self.axes.get_xlim())
+        start, stop = visible_range(self.x, low, high)
+        pixels = max(int(self.axes.bbox.width), 100)
+        rows = start + minmax_indices(self.x[start:stop], self.y[start:stop], pixels)
+        self.line.set_data(self.x[rows], self.y[rows])
+        self.shown = len(rows)
+
+    def remove(self):
+        self.axes.callbacks.disconnect(self._callback)
+        self.line.remove()
+
+
+class ChartPanel:
+    # Khung biểu đồ gắn trong cửa sổ chính: một Figure và một canvas Tk dùng lại cho mọi lần vẽ, không mở cửa sổ mới.
+    # Figure được tạo trực tiếp (không qua pyplot) nên pyplot không giữ lại các hình cũ; close() giải phóng khi thoát.
+    # Mỗi biểu đồ đi kèm một khóa (loại biểu đồ, cột, phiên bản cột, cách gom nhóm): vẽ lại cùng khóa thì không
+    # tính / vẽ lại gì; biểu đồ cột cùng số cột chỉ cập nhật chiều cao và nhãn của các cột đã có.
+    def __init__(self, parent):
+        self.frame = ttk.Frame(parent)
+        self.figure = Figure(figsize=(10, 3.5), dpi=100)
+        self.axes = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.frame)
+        bar = ttk.Frame(self.frame)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, bar, pack_toolbar=False)
+        self.toolbar.pack(side='left', fill='x')
+        ttk.Button(bar, text="Hide Chart", command=self.hide).pack(side='right')
+        bar.pack(side='bottom', fill='x')
+        self.canvas.get_tk_widget().pack(side='top', fill='both', expand=True)
+        self.series = None
+        self.bars = None
+        self.kind = None  # 'line', 'bar' hoặc 'pie'
+        self.key = None  # khóa dữ liệu của biểu đồ đang vẽ
+        self.canvas.mpl_connect('resize_event', lambda event: self.series is not None and self.series.resample())
+
+    def showing(self, key):
+        # Biểu đồ đang vẽ đúng là dữ liệu này (bảng, cột và cách gom nhóm chưa đổi)
+        return key is not None and key == self.key
+
+    def show_line(self, x, y, title, x_label, y_label, x_kind='number', labels=None, key=None):
+        # x_kind: 'number', 'date' (x là số ngày của matplotlib) hoặc 'label' (x là vị trí dòng, nhãn lấy từ labels)
+        self.clear()
+        self.kind, self.key = 'line', key
+        if x_kind == 'date':
+            self.axes.xaxis_date()
+            locator = mdates.AutoDateLocator()
+            self.axes.xaxis.set_major_locator(locator)
+            self.axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        elif x_kind == 'label':
+            # Chỉ vài nhãn theo vị trí thay vì một nhãn cho mỗi điểm
+            self.axes.xaxis.set_major_locator(MaxNLocator(nbins=10, integer=True))
+            self.axes.xaxis.set_major_formatter(FuncFormatter(
+                lambda value, pos: labels[int(value)] if 0 <= value < len(labels) else ""))
+        self.series = DownsampledLine(self.axes, x, y, color='blue', linewidth=1)
+        self.axes.set_title(title)
+        self.axes.set_xlabel(x_label)
+        self.axes.set_ylabel(y_label)
+        self.axes.grid(True)
+        self._redraw()
+
+    def show_bars(self, categories, values, title, x_label, y_label, color='teal', rotation=45, key=None):
+        if self.kind == 'bar' and len(self.bars) == len(values):
+            # Cùng số cột: giữ các hình chữ nhật, chỉ đổi chiều cao / màu / nhãn
+            for bar, value in zip(self.bars, values):
+                bar.set_height(value)
+                bar.set_color(color)
+            self.axes.relim()
+            self.axes.autoscale_view()
+        else:
+            self.clear()
+            self.bars = self.axes.bar(np.arange(len(values)), values, color=color)
+        self.kind, self.key = 'bar', key
+        self.axes.set_xticks(np.arange(len(categories)), categories, rotation=rotation, ha='right')
+        self.axes.set_title(title)
+        self.axes.set_xlabel(x_label)
+        self.axes.set_ylabel(y_label)
+        self._redraw()
+
+    def show_pie(self, labels, counts, title, key=None):
+        self.clear()
+        self.kind, self.key = 'pie', key
+        self.axes.pie(counts, labels=labels, autopct='%1.1f%%', startangle=90)
+        self.axes.set_title(title)
+        self.axes.set_aspect('equal')  # Giữ tỷ lệ tròn
+        self._redraw()
+
+    def _redraw(self):
+        self.toolbar.update()  # nút Home của thanh công cụ trở về khung nhìn của biểu đồ mới
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
+
+    def clear(self):
+        if self.series is not None:
+            self.series.remove()
+            self.series = None
+        self.bars = None
+        self.kind = self.key = None
+        self.axes.clear()
+        self.axes.set_aspect('auto')
+
+    def hide(self):
+        self.frame.pack_forget()
+
+    def close(self):
+        # Giải phóng hình và widget ngay (không chờ bộ thu gom rác)
+        self.clear()
+        self.figure.clear()
+        self.canvas.get_tk_widget().destroy()
+        self.frame.destroy()
@@ -0,0 +1,181 @@
+from tkinter import ttk
+
+
+class VirtualGrid:
+    # Treeview "ảo": chỉ tạo item cho các dòng đang nhìn thấy (+ một ít dòng đệm),
+    # khi cuộn thì đổ lại giá trị từ bảng dữ liệu thay vì chèn toàn bộ dòng.
+    def __init__(self, master, buffer_rows=5, row_height=20):
+        self.buffer_rows = buffer_rows
+        self.row_height = row_height
+        self.columns = []
+        self.total_rows = 0
+        self.offset = 0
+        self.visible_rows = 30  # cập nhật lại khi widget có kích thước thật (<Configure>)
+        self.fetch_rows = None
+        self.items = []
+
+        # Mỗi cột có một id cố định trong Treeview, tên hiển thị chỉ là heading.
+        # Cột bị xóa chỉ bị ẩn khỏi displaycolumns nên không phải ghi lại các dòng.
+        self._ids = []
+        self._id_of = {}
+        self._next_id = 0
+
+        self.frame = ttk.Frame(master)
+        self.tree = ttk.Treeview(self.frame, show="headings")
+        self.scrollbar = ttk.Scrollbar(self.frame, orient='vertical', command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(3))
+        self.tree.bind('<Prior>', lambda event: self.scroll(-self.visible_rows))
+        self.tree.bind('<Next>', lambda event: self.scroll(self.visible_rows))
+        self.tree.bind('<Control-Home>', lambda event: self.scroll_to(0))
+        self.tree.bind('<Control-End>', lambda event: self.scroll_to(self.total_rows))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_source(self, columns, total_rows, fetch_rows):
+        # fetch_rows(start, stop, names) -> danh sách các dòng (list giá trị theo thứ tự names)
+        self.columns = list(columns)
+        self.total_rows = total_rows
+        self.fetch_rows = fetch_rows
+        self.offset = 0
+
+        self.tree.delete(*self.tree.get_children())
+        self.items = []
+        self._ids = []
+        self._id_of = {}
+        for col in self.columns:
+            self._new_column_id(col)
+        self._configure_columns({})
+        self.refresh()
+
+    def clear(self):
+        self.set_source([], 0, None)
+
+    def refresh(self):
+        # Đổ lại toàn bộ giá trị của các item đang hiển thị
+        self._ensure_items()
+        rows = self._fetch(self.columns)
+        positions = [self._ids.index(self._id_of[col]) for col in self.columns]
+        for idx, iid in enumerate(self.items):
+            values = [""] * len(self._ids)
+            if idx < len(rows):
+                for pos, value in zip(positions, rows[idx]):
+                    values[pos] = value
+            self.tree.item(iid, values=values)
+        self.tree.yview_moveto(0)
+        self._update_scrollbar()
+
+    def apply_changes(self, columns, total_rows, changes):
+        # Cập nhật theo phần thay đổi: đổi tên chỉ sửa heading, xóa cột chỉ ẩn cột,
+        # cột mới / cột bị thay chỉ ghi các ô của cột đó trên những dòng đang hiển thị.
+        for old, new in changes.get('renamed', {}).items():
+            cid = self._id_of.pop(old)
+            self._id_of[new] = cid
+            self.tree.heading(cid, text=new)
+        for name in changes.get('removed', []):
+            self._id_of.pop(name, None)
+
+        added = [name for name in columns if name not in self._id_of]
+        widths = {cid: self.tree.column(cid, 'width') for cid in self._ids} if added else {}
+        for name in added:
+            self._new_column_id(name)
+        self.columns = list(columns)
+        if added:
+            self._configure_columns(widths)
+        else:
+            self.tree["displaycolumns"] = [self._id_of[col] for col in self.columns] or ""
+
+        if total_rows != self.total_rows or changes.get('rows'):
+            self.total_rows = total_rows
+            self.offset = min(self.offset, max(total_rows - self.visible_rows, 0))
+            self.refresh()
+            return
+        self.update_cells(added + list(changes.get('changed', [])))
+
+    def update_cells(self, names, rows=None):
+        # Ghi lại các ô của những cột (và dòng, nếu có) đã đổi, chỉ trong cửa sổ đang hiển thị
+        names = [name for name in names if name in self._id_of]
+        if not names or not self.items:
+            return
+        data = self._fetch(names)
+        for idx, iid in enumerate(self.items[:len(data)]):
+            if rows is not None and self.offset + idx not in rows:
+                continue
+            for name, value in zip(names, data[idx]):
+                self.tree.set(iid, self._id_of[name], value)
+
+    def scroll(self, delta):
+        self.scroll_to(self.offset + delta)
+
+    def scroll_to(self, offset):
+        max_offset = max(self.total_rows - self.visible_rows, 0)
+        offset = min(max(int(offset), 0), max_offset)
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+        return "break"
+
+    def _fetch(self, names):
+        if not self.items or self.fetch_rows is None:
+            return []
+        return self.fetch_rows(self.offset, self.offset + len(self.items), names)
+
+    def _new_column_id(self, name):
+        cid = f"c{self._next_id}"
+        self._next_id += 1
+        self._ids.append(cid)
+        self._id_of[name] = cid
+
+    def _configure_columns(self, widths):
+        # Đổi "columns" làm Treeview khởi tạo lại cột nên phải đặt lại heading / độ rộng
+        name_of = {cid: name for name, cid in self._id_of.items()}
+        self.tree["columns"] = self._ids
+        for cid in self._ids:
+            self.tree.heading(cid, text=name_of.get(cid, ""))
+            self.tree.column(cid, width=widths.get(cid, 100), anchor='w')
+        self.tree["displaycolumns"] = [self._id_of[col] for col in self.columns] or ""
+
+    def _ensure_items(self):
+        # Số item = số dòng nhìn thấy + dòng đệm, không phụ thuộc kích thước dữ liệu
+        wanted = min(self.visible_rows + self.buffer_rows, self.total_rows)
+        while len(self.items) < wanted:
+            self.items.append(self.tree.insert("", "end", values=()))
+        while len(self.items) > wanted:
+            self.tree.delete(self.items.pop())
+
+    def _update_scrollbar(self):
+        if self.total_rows <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        first = self.offset / self.total_rows
+        last = min((self.offset + max(self.visible_rows, 1)) / self.total_rows, 1.0)
+        self.scrollbar.set(first, last)
+
+    def _on_resize(self, event):
+        visible = max(int(event.height) // self.row_height - 1, 1)
+        if visible != self.visible_rows:
+            self.visible_rows = visible
+            if self.fetch_rows is not None:
+                self.refresh()
+
+    def _on_mousewheel(self, event):
+        step = -1 if event.delta > 0 else 1
+        if abs(event.delta) >= 120:
+            step *= abs(event.delta) // 120
+        self.scroll(step * 3)
+        return "break"
+
+    def _on_scrollbar(self, action, *args):
+        if action == 'moveto':
+            self.scroll_to(float(args[0]) * self.total_rows)
+        elif action == 'scroll':
+            amount, unit = int(args[0]), args[1]
+            self.scroll(amount * (self.visible_rows if unit == 'pages' else 1))
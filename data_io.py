@@ -0,0 +1,730 @@
+import bz2
+import codecs
+import concurrent.futures
+import contextlib
+import csv
+import glob
+import gzip
+import io
+import json
+import lzma
+import math
+import os
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_table import DataTable, TableBuilder
+from table_store import read_table, write_table
+
+
+JSON_EXTENSIONS = ('.json', '.ndjson', '.jsonl')
+TABLE_EXTENSION = '.dltable'  # bảng dạng cột nhị phân (định dạng của table_store), mở lại không cần phân tích
+COMPRESSIONS = ('.gz', '.bz2', '.xz', '.zst')
+QUOTE_WINDOW = 4096  # số dấu " kiểm tra mỗi lần trong quote_toggles
+INPUT_EXTENSIONS = tuple(ext + suffix for ext in ('.csv',) + JSON_EXTENSIONS
+                         for suffix in ('',) + COMPRESSIONS) + (TABLE_EXTENSION,)
+# File nén được nhận biết theo các byte đầu (magic bytes), không theo phần mở rộng
+COMPRESSION_MAGIC = [(b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'xz'), (b'\x28\xb5\x2f\xfd', 'zstd')]
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+class SaveCancelled(Exception):
+    pass
+
+
+class DecodedStream:
+    # Giải mã byte -> str theo từng khối. Nếu gặp byte không hợp lệ với encoding đã dò
+    # thì phần còn lại của file được giải mã bằng ISO-8859-1, không phải đọc lại từ đầu.
+    def __init__(self, raw, encoding, fallback='iso-8859-1'):
+        self.raw = raw
+        self.encoding = encoding
+        self.fallback = fallback
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size if size and size > 0 else -1)
+        self.bytes_read += len(data)
+        pending = self.decoder.getstate()[0]
+        try:
+            return self.decoder.decode(data, final=not data)
+        except UnicodeDecodeError as e:
+            buffered = pending + data
+            self.encoding = self.fallback
+            self.decoder = codecs.getincrementaldecoder(self.fallback)()
+            return buffered[:e.start].decode(e.encoding) + self.decoder.decode(buffered[e.start:], final=not data)
+
+
+def quote_toggles(codes, delimiter, inside=False, before=10):
+    # Vị trí các dấu " mở / đóng trường trong ngoặc kép của mảng byte `codes` theo ngữ pháp CSV (như parser C
+    # của pandas và csv.reader): dấu " chỉ mở trường khi là ký tự đầu của trường, dấu " giữa trường không ngoặc
+    # (vd. 12" pizza) là ký tự thường, "" trong trường là dấu " thoát. Ký tự nằm trong ngoặc kép khi số vị trí
+    # trả về đứng trước nó (cộng `inside`) là lẻ.
+    # inside: đang ở trong trường ngoặc kép tại codes[0]; before: byte ngay trước codes[0] (10 = đầu file,
+    # 0 = dấu " thường). Quét từng cửa sổ bằng numpy, chỉ quét lại từ sau mỗi dấu " thường.
+    pos = np.flatnonzero(codes == 34)
+    if not len(pos):
+        return pos
+    prev = codes[np.maximum(pos - 1, 0)]
+    if pos[0] == 0:
+        prev[0] = before
+    at_start = (prev == delimiter) | (prev == 10) | (prev == 13)
+    after_quote = prev == 34  # dấu " thứ hai của cặp "" (hoặc mở lại ngay sau dấu đóng)
+    keep = np.ones(len(pos), dtype=bool)
+    parity = int(inside)
+    i = 0
+    while i < len(pos):
+        stop = min(i + QUOTE_WINDOW, len(pos))
+        opening = (np.arange(stop - i) + parity) % 2 == 0
+        stray = np.flatnonzero(opening & ~at_start[i:stop] & ~after_quote[i:stop])
+        if not len(stray):
+            parity = (parity + stop - i) % 2
+            i = stop
+            continue
+        k = i + int(stray[0])
+        keep[k] = False  # ngoài ngoặc kép và không ở đầu trường: ký tự thường
+        if k + 1 < len(pos) and pos[k + 1] == pos[k] + 1:
+            after_quote[k + 1] = False
+        parity = 0
+        i = k + 1
+    return pos[keep]
+
+
+class RowTooLong(ValueError):
+    pass
+
+
+class RowGuard:
+    # Đặt giữa file và parser C của pandas: dòng có nhiều trường hơn dòng tiêu đề (width) bị cắt bớt các trường
+    # thừa ngay trong luồng byte và số dòng trong file được ghi vào `malformed`. Parser C đọc theo khối xử lý
+    # các dòng này không nhất quán (báo lỗi, hoặc âm thầm cắt / bỏ dòng tùy vị trí của dòng trong khối).
+    # Dấu phân cách / xuống dòng nằm trong trường ngoặc kép không được tính (xem quote_toggles).
+    # Phần dòng chưa trọn chỉ được quét phần mới đọc thêm; quá max_carry byte vẫn chưa hết dòng thì báo RowTooLong.
+    def __init__(self, raw, delimiter, width=None, malformed=None, max_carry=1 << 26):
+        self.raw = raw
+        self.delimiter = ord(delimiter)
+        self.width = width  # None = đếm từ dòng đầu tiên (tiêu đề)
+        self.malformed = malformed
+        self.max_carry = max_carry
+        self.carry = b''  # phần dòng chưa trọn của lần đọc trước (luôn bắt đầu ở đầu một dòng)
+        self.scanned = 0  # số byte đầu của carry đã quét: không có dấu xuống dòng ngoài ngoặc kép
+        self.toggles = []  # các mảng vị trí dấu " mở / đóng trong phần đã quét
+        self.inside = False  # cuối phần đã quét nằm trong trường ngoặc kép
+        self.line = 1  # số dòng trong file của byte đầu tiên trong carry
+
+    def read(self, size=-1):
+        while True:
+            data = self.raw.read(size if size and size > 0 else -1)
+            buf = self.carry + data
+            out = self._check(buf, final=not data)
+            if out or not data:
+                return out
+            if len(self.carry) > self.max_carry:
+                raise RowTooLong(f"No line break outside quotes in {len(self.carry):,} bytes "
+                                 f"after line {self.line} (unclosed quote?).")
+
+    def _check(self, buf, final):
+        codes = np.frombuffer(buf, dtype=np.uint8)
+        start = self.scanned
+        before = codes[start - 1] if start else 10
+        if before == 34 and not any(len(t) and t[-1] == start - 1 for t in self.toggles[-1:]):
+            before = 0  # dấu " thường ngay trước phần mới
+        added = start + quote_toggles(codes[start:], self.delimiter, self.inside, before)
+        newlines = start + np.flatnonzero(codes[start:] == 10)
+        breaks = newlines[(np.searchsorted(added, newlines) + self.inside) % 2 == 0]
+        if not len(breaks) and not final:
+            # chưa có dòng trọn vẹn: đọc thêm, lần sau chỉ quét phần mới
+            self.carry, self.scanned = buf, len(buf)
+            self.toggles.append(added)
+            self.inside = bool((len(added) + self.inside) % 2)
+            return b''
+        toggles = np.concatenate(self.toggles + [added])
+        self.scanned, self.toggles, self.inside = 0, [], False
+        if start:
+            newlines = np.flatnonzero(codes == 10)  # phần đã quét không có dấu xuống dòng ngoài ngoặc kép
+        delims = np.flatnonzero(codes == self.delimiter)
+        if len(toggles):
+            delims = delims[np.searchsorted(toggles, delims) % 2 == 0]
+        ends = breaks
+        if final and len(buf) and (not len(breaks) or breaks[-1] != len(buf) - 1):
+            ends = np.append(breaks, len(buf))  # dòng cuối không có ký tự xuống dòng
+        if not len(ends):
+            self.carry = buf
+            return b''
+        done = min(int(ends[-1]) + 1, len(buf))
+        self.carry = buf[done:]
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        fields = np.searchsorted(delims, ends) - np.searchsorted(delims, starts) + 1
+        if self.width is None:
+            self.width = int(fields[0])
+        bad = np.flatnonzero(fields > self.width)
+        if len(bad):
+            pieces, pos = [], 0
+            for row in bad:
+                cut = int(delims[np.searchsorted(delims, starts[row]) + self.width - 1])
+                end = int(ends[row])
+                if end > cut and buf[end - 1:end] == b'\r':
+                    end -= 1  # giữ \r\n cuối dòng
+                pieces.append(buf[pos:cut] + (b'""' if cut == starts[row] else b''))  # dòng không thành dòng trống
+                pos = end
+            pieces.append(buf[pos:done])
+            if self.malformed is not None:
+                self.malformed.extend((self.line + np.searchsorted(newlines, starts[bad])).tolist())
+            out = b''.join(pieces)
+        else:
+            out = buf[:done]
+        self.line += int(np.searchsorted(newlines, done))
+        return out
+
+
+def detect_compression(path):
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    return next((codec for magic, codec in COMPRESSION_MAGIC if head.startswith(magic)), None)
+
+
+def _zstd_reader(raw):
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("Reading .zst files needs the 'zstandard' package (pip install zstandard).") from None
+    return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+
+
+DECOMPRESSORS = {'gzip': lambda raw: gzip.GzipFile(fileobj=raw, mode='rb'), 'bz2': bz2.BZ2File, 'xz': lzma.LZMAFile, 'zstd': _zstd_reader}
+
+
+@contextlib.contextmanager
+def open_input(path):
+    # Mở file đầu vào dạng byte; file nén được giải nén theo luồng (từng khối, không ghi file tạm).
+    # Trả về (luồng dữ liệu đã giải nén, file gốc): vị trí trong file gốc dùng để báo tiến độ theo kích thước file.
+    with open(path, 'rb') as raw:
+        codec = next((codec for magic, codec in COMPRESSION_MAGIC if raw.peek(6)[:6].startswith(magic)), None)
+        if codec is None:
+            yield raw, raw
+            return
+        with DECOMPRESSORS[codec](raw) as stream:
+            yield stream, raw
+
+
+def input_kind(path):
+    # 'csv' / 'json' / 'table' theo phần mở rộng (bỏ đuôi nén); phần mở rộng lạ thì xem ký tự đầu của dữ liệu
+    name = os.path.splitext(path)[0] if path.endswith(COMPRESSIONS) else path
+    if name.endswith(TABLE_EXTENSION):
+        return 'table'
+    if name.endswith(JSON_EXTENSIONS):
+        return 'json'
+    if name.endswith('.csv'):
+        return 'csv'
+    with open_input(path) as (stream, _):
+        head = stream.read(256).lstrip(codecs.BOM_UTF8 + b' \t\r\n')
+    return 'json' if head[:1] in (b'[', b'{') else 'csv'
+
+
+def sniff_csv(path, sample_bytes=65536):
+    # Dò encoding và ký tự phân cách từ phần đầu file
+    with open_input(path) as (f, _):
+        prefix = f.read(sample_bytes)
+        while len(prefix) < sample_bytes:  # luồng giải nén có thể trả về ít hơn số byte yêu cầu
+            more = f.read(sample_bytes - len(prefix))
+            if not more:
+                break
+            prefix += more
+
+    if prefix.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    else:
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(prefix, final=len(prefix) < sample_bytes)
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            encoding = 'iso-8859-1'
+
+    text = prefix.decode(encoding, errors='replace')
+    if len(prefix) == sample_bytes and '\n' in text:
+        text = text[:text.rfind('\n') + 1]  # bỏ dòng cuối bị cắt dở
+
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=',;\t|').delimiter
+    except csv.Error:
+        delimiter = ','
+
+    return {'encoding': encoding, 'delimiter': delimiter}
+
+
+def read_csv_chunks(path, chunk_rows=100000, first_chunk_rows=1000, fmt=None, columns=None, malformed=None):
+    # Đọc CSV một lượt bằng parser C của pandas, trả về (khối DataFrame chuỗi, ô trống = "", số byte đã đọc).
+    # Kiểu của cột được suy ra từ chuỗi gốc khi ghép khối (TableBuilder.append_frame) nên mã có số 0 ở đầu
+    # xuất hiện ở bất kỳ đâu trong file vẫn được giữ nguyên.
+    # columns: chỉ chuyển đổi các cột này, các cột khác bị bỏ qua ngay trong parser
+    # malformed: list nhận số dòng (trong file) của các dòng có trường thừa (đã bị cắt bớt, xem RowGuard)
+    fmt = fmt or sniff_csv(path)
+    usecols = None if columns is None else (lambda name: name in columns)
+    with open_input(path) as (data, raw):
+        stream = DecodedStream(RowGuard(data, fmt['delimiter'], malformed=malformed), fmt['encoding'])
+        try:
+            reader = pd.read_csv(stream, sep=fmt['delimiter'], dtype=object, na_filter=False,
+                                 chunksize=chunk_rows, engine='c', usecols=usecols)
+        except pd.errors.EmptyDataError:
+            return
+        with reader:
+            size = first_chunk_rows
+            while True:
+                try:
+                    frame = reader.get_chunk(size)
+                except StopIteration:
+                    return
+                yield frame, raw.tell()
+                size = chunk_rows
+
+
+def read_csv_table(path):
+    builder = None
+    for frame, _ in read_csv_chunks(path):
+        if builder is None:
+            builder = TableBuilder(list(frame.columns))
+        builder.append_frame(frame)
+    return builder.build() if builder is not None else DataTable()
+
+
+def flatten_record(record, prefix=""):
+    # {"a": {"b": 1}} -> {"a.b": 1}; giá trị không phải object được đặt vào cột "value"
+    if not isinstance(record, dict):
+        return {prefix.rstrip('.') or 'value': record}
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flat.update(flatten_record(value, name + "."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def iter_json_values(stream, chunk_chars=1 << 20):
+    # Đọc dần các giá trị JSON: từng phần tử của mảng ở cấp ngoài cùng, hoặc từng object
+    # của NDJSON / JSON nối tiếp. Bộ đệm chỉ giữ khối đang đọc chứ không giữ cả file.
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    in_array = False
+    while True:
+        skip = ' \t\r\n,' if in_array else ' \t\r\n'
+        while pos < len(buf) and buf[pos] in skip:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                return
+            buf, pos = stream.read(chunk_chars), 0
+            eof = not buf
+            continue
+
+        if buf[pos] == '[' and not in_array:
+            in_array = True
+            pos += 1
+            continue
+        if buf[pos] == ']' and in_array:
+            in_array = False
+            pos += 1
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = None
+        if end is None or (not eof and (end == len(buf) or buf[end] in '.eE')):
+            # Giá trị có thể còn tiếp ở khối sau (vd. số bị cắt đôi "2." / "2.5e"): đọc thêm rồi giải mã lại.
+            # Đọc thêm ít nhất bằng phần đang dở nên bộ đệm tăng gấp đôi mỗi lần: một giá trị lớn hơn nhiều
+            # khối (vd. {"data": [...]}) chỉ bị giải mã lại O(log n) lần thay vì một lần cho mỗi khối.
+            need = max(chunk_chars, len(buf) - pos)
+            parts = [buf[pos:]]
+            while need > 0:
+                data = stream.read(need)
+                if not data:
+                    eof = True
+                    break
+                parts.append(data)
+                need -= len(data)
+            buf, pos = "".join(parts), 0
+            continue
+        pos = end
+        yield value
+
+
+def iter_table_chunks(path, chunk_rows=100000, columns=None, cache=None):
+    # Đọc file thành từng khối DataTable (CSV / JSON) cho các xử lý theo luồng không cần giữ cả bảng.
+    # Các khối JSON có thể khác cột nhau (bản ghi thiếu khóa).
+    # columns: chỉ dựng các cột này; cache: TableCache, nếu file đã có trong cache thì chỉ đọc các cột cần
+    if cache is not None:
+        table = cache.load(path, columns)
+        if table is not None:
+            yield table
+            return
+    kind = input_kind(path)
+    if kind == 'table':
+        yield read_table(path, columns)
+        return
+    if kind == 'json':
+        with open_input(path) as (data, _):
+            records = []
+            for value in iter_json_values(DecodedStream(data, 'utf-8-sig')):
+                record = flatten_record(value)
+                if columns is not None:
+                    record = {key: value for key, value in record.items() if key in columns}
+                records.append(record)
+                if len(records) >= chunk_rows:
+                    yield _records_table(records)
+                    records = []
+            if records:
+                yield _records_table(records)
+        return
+
+    for frame, _ in read_csv_chunks(path, chunk_rows, chunk_rows, columns=columns):
+        builder = TableBuilder(list(frame.columns))
+        builder.append_frame(frame)
+        yield builder.build()
+
+
+def _records_table(records):
+    builder = TableBuilder([])
+    builder.append_records(records)
+    return builder.build()
+
+
+def expand_inputs(patterns):
+    # Đường dẫn file, thư mục (mọi file CSV / JSON bên trong) hoặc mẫu glob
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(os.path.join(pattern, name) for name in os.listdir(pattern)
+                                if name.endswith(INPUT_EXTENSIONS)))
+        else:
+            paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return list(dict.fromkeys(paths))
+
+
+def read_file(path, chunk_rows=100000):
+    # Đọc cả một file thành DataTable, không báo tiến độ (vd. trong tiến trình con khi mở nhiều file)
+    return FileLoader(path, chunk_rows, chunk_rows).read()
+
+
+def _open_output(path, compression):
+    if compression == '.gz':
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == '.bz2':
+        return bz2.open(path, 'wb')
+    if compression == '.xz':
+        return lzma.open(path, 'wb')
+    if compression == '.zst':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Saving .zst files needs the 'zstandard' package (pip install zstandard).") from None
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'), closefd=True)
+    return open(path, 'wb')
+
+
+def save_table(table, path, rows=None, chunk_rows=50000, progress=None, cancel_event=None):
+    # Ghi bảng theo phần mở rộng: .csv, .json (mảng bản ghi), .ndjson / .jsonl (mỗi dòng một bản ghi),
+    # .dltable (dạng cột nhị phân); thêm .gz / .bz2 / .xz / .zst để nén, vd. out.csv.gz. Cột theo đúng thứ tự của bảng.
+    # rows: vector id dòng cần ghi theo thứ tự (None = cả bảng); dữ liệu được ghi theo từng khối chunk_rows dòng.
+    # Ghi ra file tạm rồi đổi tên: lỗi hay hủy giữa chừng không để lại file dở và không làm hỏng file cũ.
+    base, compression = path, None
+    if path.endswith(COMPRESSIONS):
+        base, compression = os.path.splitext(path)
+    total = table.num_rows if rows is None else len(rows)
+    if base.endswith(TABLE_EXTENSION):
+        if compression:
+            raise ValueError(f"{TABLE_EXTENSION} files are read directly from disk and cannot be compressed.")
+        write_table(table, path, rows)  # write_table tự ghi file tạm + đổi tên
+        if progress is not None:
+            progress(total, total)
+        return
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with _open_output(tmp, compression) as raw, \
+                io.TextIOWrapper(raw, encoding='utf-8', newline='', write_through=True) as f:
+            if base.endswith(JSON_EXTENSIONS):
+                _write_json(f, table, rows, total, chunk_rows, lines=not base.endswith('.json'),
+                            progress=progress, cancel_event=cancel_event)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(table.columns)
+                for start in range(0, total, chunk_rows):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise SaveCancelled()
+                    stop = min(start + chunk_rows, total)
+                    writer.writerows(zip(*table.export_columns(start, stop, rows)))
+                    if progress is not None:
+                        progress(stop, total)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _write_json(f, table, rows, total, chunk_rows, lines, progress, cancel_event):
+    # JSON không thụt lề; mỗi khối bản ghi được mã hóa một lần bằng bộ mã hóa C của json.
+    # JSON chuẩn không có NaN / Infinity: số thực không hữu hạn được ghi thành null.
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    names = table.columns
+    checked = [table.column(name).dtype.kind in 'fO' for name in names]
+    if not lines:
+        f.write("[")
+    for start in range(0, total, chunk_rows):
+        if cancel_event is not None and cancel_event.is_set():
+            raise SaveCancelled()
+        stop = min(start + chunk_rows, total)
+        cols = [_finite(values) if check else values
+                for values, check in zip(table.export_columns(start, stop, rows), checked)]
+        records = [dict(zip(names, values)) for values in zip(*cols)]
+        if lines:
+            f.write("\n".join(map(encode, records)) + "\n")
+        else:
+            f.write((", " if start else "") + encode(records)[1:-1])
+        if progress is not None:
+            progress(stop, total)
+    if not lines:
+        f.write("]")
+
+
+def _finite(values):
+    return [None if type(v) is float and not math.isfinite(v) else v for v in values]
+
+
+class FileSaver(threading.Thread):
+    # Ghi bảng ra file trong luồng nền (save_table); giao tiếp với giao diện qua self.messages:
+    #   ('progress', rows_written, total_rows) / ('done', path) / ('error', exception) / ('cancelled',)
+    def __init__(self, table, path, rows=None, chunk_rows=50000):
+        super().__init__(daemon=True)
+        self.table = table  # bản sao của bảng: giao diện vẫn sửa bảng được trong lúc ghi
+        self.path = path
+        self.rows = rows
+        self.chunk_rows = chunk_rows
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            save_table(self.table, self.path, self.rows, self.chunk_rows,
+                       progress=lambda done, total: self.messages.put(('progress', done, total)),
+                       cancel_event=self.cancel_event)
+            self.messages.put(('done', self.path))
+        except SaveCancelled:
+            self.messages.put(('cancelled',))
+        except Exception as e:
+            self.messages.put(('error', e))
+
+
+class FileLoader(threading.Thread):
+    # Đọc file trong luồng nền theo từng khối; giao tiếp với giao diện qua self.messages:
+    #   ('progress', builder, rows, bytes_read, total_bytes)
+    #   ('done', table) / ('error', exception) / ('cancelled',)
+    def __init__(self, path, chunk_rows=100000, first_chunk_rows=1000, cache=None):
+        super().__init__(daemon=True)
+        self.path = path
+        self.cache = cache  # TableCache (tùy chọn): mở lại file chưa đổi sẽ đọc từ cache
+        self.cached = False
+        self.chunk_rows = chunk_rows
+        self.first_chunk_rows = first_chunk_rows
+        self.total_bytes = os.path.getsize(path)
+        self.malformed = []  # số dòng (trong file CSV) của các dòng có trường thừa đã bị cắt bớt
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            key = None
+            if self.cache is not None:
+                key = self.cache.key(self.path)  # kích thước + mtime lấy trước khi đọc
+                table = self.cache.load(self.path, key=key)
+                if table is not None:
+                    self.cached = True
+                    self.messages.put(('done', table))
+                    return
+            table = self.read()
+            snapshot = table.copy() if table else None  # giao diện có thể sửa bảng ngay sau khi nhận
+            self.messages.put(('done', table))
+        except LoadCancelled:
+            self.messages.put(('cancelled',))
+            return
+        except Exception as e:
+            self.messages.put(('error', e))
+            return
+
+        if snapshot is not None and self.cache is not None and not self.path.endswith(TABLE_EXTENSION):
+            try:
+                self.cache.store(self.path, snapshot, key)  # ghi cache sau khi giao diện đã nhận bảng
+            except OSError:
+                pass  # không ghi được cache (hết dung lượng, quyền...) thì lần sau đọc lại bình thường
+
+    def read(self):
+        kind = input_kind(self.path)
+        if kind == 'table':
+            return read_table(self.path)
+        return self._read_json() if kind == 'json' else self._read_csv()
+
+    def _read_csv(self):
+        try:
+            return self._read_csv_frames()
+        except RowTooLong:
+            # Không thấy cuối dòng (vd. dấu " mở trường không bao giờ đóng): đọc lại bằng csv.reader, giới hạn
+            # kích thước trường của csv báo lỗi rõ ràng thay vì giữ cả phần còn lại của file trong bộ nhớ
+            self.malformed.clear()
+            return self._read_csv_rows()
+
+    def _read_csv_frames(self):
+        builder = None
+        for frame, bytes_read in read_csv_chunks(self.path, self.chunk_rows, self.first_chunk_rows,
+                                                 malformed=self.malformed):
+            self._check_cancelled()
+            if builder is None:
+                builder = TableBuilder(list(frame.columns))
+            builder.append_frame(frame)
+            self.messages.put(('progress', builder, builder.num_rows, bytes_read, self.total_bytes))
+        return builder.build() if builder is not None else DataTable()
+
+    def _read_csv_rows(self):
+        fmt = sniff_csv(self.path)
+        with open_input(self.path) as (data, raw):
+            f = io.TextIOWrapper(data, encoding=fmt['encoding'], errors='replace', newline='')
+            reader = csv.reader(f, delimiter=fmt['delimiter'])
+            builder = TableBuilder(next(reader, []))
+            width = len(builder.columns)
+            rows = []
+            limit = self.first_chunk_rows  # khối đầu nhỏ để giao diện hiện dữ liệu ngay
+            line = reader.line_num + 1
+            for row in reader:
+                if len(row) > width:
+                    self.malformed.append(line)
+                if row and len(row) != width:
+                    row = (row + [""] * width)[:width]
+                line = reader.line_num + 1
+                if not row:
+                    continue  # dòng trống, như parser C
+                rows.append(row)
+                if len(rows) >= limit:
+                    self._check_cancelled()
+                    builder.append_frame(pd.DataFrame(rows, columns=builder.columns, dtype=object))
+                    self.messages.put(('progress', builder, builder.num_rows, raw.tell(), self.total_bytes))
+                    rows = []
+                    limit = self.chunk_rows
+            self._check_cancelled()
+            if rows:
+                builder.append_frame(pd.DataFrame(rows, columns=builder.columns, dtype=object))
+            self.messages.put(('progress', builder, builder.num_rows, self.total_bytes, self.total_bytes))
+            return builder.build()
+
+    def _read_json(self):
+        # Mảng JSON, NDJSON hay một object đều được đọc theo luồng, mỗi khối bản ghi
+        # được làm phẳng và chuyển thành cột ngay nên bộ nhớ chỉ phụ thuộc kích thước khối
+        with open_input(self.path) as (data, raw):
+            stream = DecodedStream(data, 'utf-8-sig')
+            builder = TableBuilder([])
+            records = []
+            limit = self.first_chunk_rows
+            for value in iter_json_values(stream):
+                records.append(flatten_record(value))
+                if len(records) >= limit:
+                    self._check_cancelled()
+                    builder.append_records(records)
+                    self.messages.put(('progress', builder, builder.num_rows, raw.tell(), self.total_bytes))
+                    records = []
+                    limit = self.chunk_rows
+            self._check_cancelled()
+            builder.append_records(records)
+            return builder.build()
+
+    def _check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise LoadCancelled()
+
+
+class MultiFileLoader(FileLoader):
+    # Mở nhiều file (thư mục, mẫu glob) thành một bảng. File có trong cache được đọc từ cache, các file còn lại
+    # được đọc song song trên executor (vd. pool tiến trình của parallel_agg) rồi ghép theo thứ tự file; cột khác
+    # nhau giữa các file được hợp theo tên (ô thiếu để trống). source_column: tên cột ghi file nguồn của từng dòng.
+    def __init__(self, paths, source_column=None, executor=None, chunk_rows=100000, cache=None):
+        super().__init__(paths[0], chunk_rows, chunk_rows, cache)
+        self.paths = list(paths)
+        self.source_column = source_column
+        self.executor = executor  # None = đọc lần lượt trong luồng này
+        self.sizes = [os.path.getsize(path) for path in self.paths]
+        self.total_bytes = sum(self.sizes)
+
+    def run(self):
+        futures = {}
+        parsed = []  # (file, bảng) vừa đọc, ghi vào cache sau khi giao diện đã nhận kết quả
+        try:
+            keys = [self.cache.key(path) if self.cache is not None else None for path in self.paths]
+            tables = [self.cache.load(path, key=key) if key else None for path, key in zip(self.paths, keys)]
+            self.cached = all(table is not None for table in tables)
+            if self.executor is not None:
+                futures = {i: self.executor.submit(read_file, path, self.chunk_rows)
+                           for i, path in enumerate(self.paths) if tables[i] is None}
+
+            builder = TableBuilder([])
+            done_bytes = 0
+            root = os.path.dirname(self.paths[0]) if len(self.paths) == 1 else os.path.commonpath(self.paths)
+            for i, path in enumerate(self.paths):
+                self._check_cancelled()
+                table = tables[i]
+                tables[i] = None  # bảng đã ghép vào builder: không giữ thêm một bản
+                if table is None:
+                    try:
+                        table = self._wait(futures.pop(i)) if i in futures else read_file(path, self.chunk_rows)
+                    except LoadCancelled:
+                        raise
+                    except Exception as e:
+                        raise ValueError(f"{path}: {e}") from e
+                    if table is None:
+                        raise ValueError(f"{path}: unsupported file type.")
+                    if self.cache is not None:
+                        parsed.append((path, table, keys[i]))  # build() sao chép dữ liệu nên bảng này không bị sửa
+                if self.source_column:
+                    if self.source_column in table:
+                        raise ValueError(f"{path} already has a column named '{self.source_column}'.")
+                    table = table.copy()
+                    table.add_column(self.source_column, np.full(len(table), os.path.relpath(path, root), dtype=object))
+                builder.append_table(table)
+                done_bytes += self.sizes[i]
+                self.messages.put(('progress', builder, builder.num_rows, done_bytes, self.total_bytes))
+            self.messages.put(('done', builder.build()))
+        except LoadCancelled:
+            self.messages.put(('cancelled',))
+            return
+        except Exception as e:
+            self.messages.put(('error', e))
+            return
+        finally:
+            for future in futures.values():
+                future.cancel()
+
+        for path, table, key in parsed:
+            try:
+                self.cache.store(path, table, key)
+            except OSError:
+                pass
+
+    def _wait(self, future):
+        # Chờ kết quả của tiến trình con nhưng vẫn phản hồi lệnh hủy (Esc)
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except concurrent.futures.TimeoutError:
+                self._check_cancelled()
@@ -0,0 +1,535 @@
+import bisect
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from table_index import HashIndex, SortedIndex, group_order
+
+
+def make_column(values):
+    # Chuyển danh sách giá trị thành mảng có kiểu: int64 / float64 nếu toàn số, ngược lại giữ object
+    if isinstance(values, np.ndarray):
+        return values
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return infer_column(arr)
+
+
+def infer_column(arr, missing=None):
+    # Suy ra kiểu cho mảng object (vd. chuỗi đọc từ CSV); missing: mặt nạ ô trống nếu đã biết
+    if len(arr) == 0:
+        return arr
+
+    if missing is None:
+        missing = pd.isna(arr) | (arr == "")
+    present = arr[~missing]
+    if len(present) == 0:
+        return arr
+    if any(isinstance(v, (bool, dict, list)) for v in present[:100]):
+        return arr
+
+    try:
+        nums = present.astype(np.float64)
+    except (ValueError, TypeError, OverflowError):
+        return arr
+    if np.isnan(nums).any():
+        return arr
+
+    # Giữ dạng chuỗi cho mã có số 0 ở đầu (vd. mã bưu điện "00123"). Không phụ thuộc các giá trị khác của mảng
+    # nên khi đọc theo khối, khối chứa mã nào thì khối đó (và cả cột khi ghép) là chuỗi.
+    if has_leading_zero(present):
+        return arr
+    integral = np.isfinite(nums).all() and (nums == np.floor(nums)).all()
+    if integral and np.abs(nums).max() >= 2 ** 53:
+        # float64 không giữ đúng số nguyên từ 2**53 (vd. cột mã / ID dài): đọc chính xác thành int64 nếu vừa,
+        # không thì (quá int64, có ô trống, dạng "1e20"...) giữ nguyên chuỗi như lúc đọc
+        if missing.any():
+            return arr
+        try:
+            return present.astype(np.int64)
+        except (ValueError, TypeError, OverflowError):
+            return arr
+    if integral and not missing.any():
+        return nums.astype(np.int64)
+    out = np.full(len(arr), np.nan)
+    out[~missing] = nums
+    return out
+
+
+def missing_mask(values):
+    if values.dtype.kind == 'f':
+        return np.isnan(values)
+    if values.dtype.kind in 'iu':
+        return np.zeros(len(values), dtype=bool)
+    return pd.isna(values) | (values == "")
+
+
+def numeric_values(values):
+    # float64, giá trị không phải số -> NaN
+    if values.dtype.kind in 'iuf':
+        return values.astype(np.float64, copy=False)
+    return pd.to_numeric(values, errors='coerce').astype(np.float64)
+
+
+def has_leading_zero(values):
+    # Lọc nhanh theo 3 ký tự đầu (bỏ dấu +/-): chỉ kiểm tra kỹ các giá trị "0<chữ số>..." hoặc có khoảng trắng /
+    # dấu lạ ở đầu (thường rất ít)
+    chars = values.astype('U3').view('U1').reshape(len(values), 3)
+    signed = (chars[:, 0] == '+') | (chars[:, 0] == '-')
+    lead = np.where(signed, chars[:, 1], chars[:, 0])
+    after = np.where(signed, chars[:, 2], chars[:, 1])
+    digit = lambda c: (c >= '0') & (c <= '9')
+    odd = (chars[:, 0] == ' ') | (signed & ~digit(lead))
+    values = values[((lead == '0') & digit(after)) | odd]
+    return any(isinstance(v, str) and v.lstrip(' +-')[:1] == '0' and v.lstrip(' +-')[1:2].isdigit()
+               for v in values)
+
+
+def format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (float, np.floating)):
+        if value != value:
+            return ""
+        if float(value).is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return repr(float(value))
+    return str(value)
+
+
+def format_column(values):
+    # Chuỗi hiển thị cho cả cột (dùng cho Treeview, lọc, đếm, biểu đồ)
+    if values.dtype.kind in 'iu':
+        return values.astype(str).astype(object)
+    out = np.empty(len(values), dtype=object)
+    out[:] = [format_value(v) for v in values]
+    return out
+
+
+def sort_ranks(values):
+    # Hạng của từng dòng (giá trị bằng nhau cùng hạng, giá trị rỗng cùng nhận hạng lớn nhất)
+    # và thứ tự tăng dần ổn định tương ứng (rỗng luôn nằm cuối)
+    if values.dtype.kind in 'iuf':
+        order = np.argsort(values, kind='stable')  # NaN nằm cuối
+        ordered = values[order]
+        new = np.ones(len(order), dtype=bool)
+        new[1:] = ordered[1:] != ordered[:-1]
+        if values.dtype.kind == 'f':
+            new[1:] &= ~np.isnan(ordered[:-1])  # NaN != NaN: gom tất cả NaN vào một hạng
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.cumsum(new) - 1
+    else:
+        codes, uniques = pd.factorize(values)
+        ranked = sorted(range(len(uniques)), key=lambda i: str(uniques[i]))
+        rank = np.empty(len(uniques) + 1, dtype=np.int64)
+        rank[ranked] = np.arange(len(uniques))
+        rank[-1] = len(uniques)  # code -1 (None/NaN) -> cuối cùng
+        ranks = rank[codes]
+        ranks[missing_mask(values)] = len(uniques)  # chuỗi rỗng cũng là ô trống
+        order = group_order(ranks)
+    ranks.flags.writeable = False
+    order.flags.writeable = False
+    return ranks, order
+
+
+def reverse_order(order, ranks, tail=0):
+    # Đổi thứ tự tăng dần thành giảm dần mà vẫn ổn định: các nhóm giá trị bằng nhau đổi chỗ cho nhau,
+    # dòng trong cùng nhóm giữ thứ tự cũ, `tail` dòng rỗng ở cuối vẫn ở cuối. O(n), không sắp xếp lại.
+    n = len(order) - tail
+    head = order[:n]
+    group = ranks[head]
+    counts = np.bincount(group)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    out = order.copy()
+    out[(n - ends)[group] + np.arange(n) - starts[group]] = head
+    return out
+
+
+def top_k(keys, k, largest=True, exclude=None, chunk_rows=1 << 20):
+    # k dòng đầu của phép sắp xếp ổn định theo keys (NaN / dòng bị loại không tính), không sắp cả cột:
+    # mỗi khối chỉ chọn phần tử (argpartition, O(n)) rồi giữ lại k ứng viên, bộ nhớ thêm O(k + khối).
+    # Giá trị bằng nhau ở ranh giới lấy dòng đứng trước, nên kết quả giống hệt k dòng đầu của sắp xếp đầy đủ.
+    best_rows = np.empty(0, dtype=np.int64)
+    best_keys = np.empty(0, dtype=np.float64 if keys.dtype.kind == 'f' else keys.dtype)
+    if k <= 0:
+        return best_rows
+    for start in range(0, len(keys), chunk_rows):
+        part = keys[start:start + chunk_rows]
+        part = -part if largest else part
+        valid = None if part.dtype.kind != 'f' else ~np.isnan(part)
+        if exclude is not None:
+            keep = ~exclude[start:start + chunk_rows]
+            valid = keep if valid is None else valid & keep
+        rows = np.arange(start, start + len(part)) if valid is None else np.flatnonzero(valid) + start
+        part = part if valid is None else part[valid]
+
+        cand_keys = np.concatenate((best_keys, part))
+        cand_rows = np.concatenate((best_rows, rows))  # tăng dần: ứng viên cũ đã sắp theo dòng, khối mới đứng sau
+        if len(cand_keys) <= k:
+            best_keys, best_rows = cand_keys, cand_rows
+            continue
+        threshold = cand_keys[np.argpartition(cand_keys, k - 1)[k - 1]]
+        below = cand_keys < threshold
+        tied = np.flatnonzero(cand_keys == threshold)[:k - int(below.sum())]
+        chosen = np.flatnonzero(below)
+        chosen = np.sort(np.concatenate((chosen, tied)))
+        best_keys, best_rows = cand_keys[chosen], cand_rows[chosen]
+
+    return best_rows[np.lexsort((best_rows, best_keys))]
+
+
+_stamps = itertools.count(1)  # số phiên bản cho từng mảng cột, không bao giờ lặp lại
+
+
+class DataTable:
+    def __init__(self, columns=None):
+        self._names = []
+        self._data = {}
+        self._stamps = {}
+        self._derived = {}
+        self.version = 0
+        for name, values in (columns or {}).items():
+            self._names.append(name)
+            self._data[name] = make_column(values)
+
+    @classmethod
+    def from_records(cls, records):
+        names = {}
+        for row in records:
+            for key in row:
+                names.setdefault(key, None)
+        columns = {name: [row.get(name) for row in records] for name in names}
+        return cls(columns)
+
+    @classmethod
+    def from_rows(cls, header, rows):
+        width = len(header)
+        padded = [row if len(row) == width else (row + [""] * width)[:width] for row in rows]
+        columns = list(zip(*padded)) if padded else [() for _ in header]
+        return cls({name: list(values) for name, values in zip(header, columns)})
+
+    @property
+    def columns(self):
+        return list(self._names)
+
+    @property
+    def num_rows(self):
+        return len(self._data[self._names[0]]) if self._names else 0
+
+    def __len__(self):
+        return self.num_rows
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def column(self, name):
+        return self._data[name]
+
+    def column_version(self, name):
+        stamp = self._stamps.get(name)
+        if stamp is None:
+            stamp = self._stamps[name] = next(_stamps)
+        return stamp
+
+    def cached(self, name, key, compute):
+        # Kết quả suy ra từ một cột (mảng số, mặt nạ rỗng, thống kê...) được nhớ theo phiên bản của cột.
+        # Thao tác nào thay mảng cột cũng đổi phiên bản nên kết quả cũ tự mất hiệu lực.
+        stamp = self.column_version(name)
+        entry = self._derived.get(name)
+        if entry is None or entry[0] != stamp:
+            entry = self._derived[name] = (stamp, {})
+        if key not in entry[1]:
+            value = compute(self._data[name])
+            if isinstance(value, np.ndarray) and value is not self._data[name]:
+                value.flags.writeable = False  # dùng chung giữa các lần gọi nên không được sửa
+            entry[1][key] = value
+        return entry[1][key]
+
+    def numeric(self, name):
+        return self.cached(name, 'numeric', numeric_values)
+
+    def missing(self, name):
+        return self.cached(name, 'missing', missing_mask)
+
+    def formatted(self, name):
+        return self.cached(name, 'formatted', format_column)
+
+    def sort_order(self, name, ascending=True):
+        # Thứ tự sắp xếp ổn định của cột (rỗng luôn nằm cuối), nhớ theo phiên bản cột.
+        # Chiều giảm dần suy ra từ chiều tăng dần trong O(n) nên đổi chiều không phải sắp xếp lại.
+        ranks, order = self.cached(name, 'ranks', sort_ranks)
+        if ascending:
+            return order
+        return self.cached(name, ('order', False),
+                           lambda values: reverse_order(order, ranks, int(self.missing(name).sum())))
+
+    def order_by(self, keys):
+        # keys: [(tên cột, tăng dần), ...], cột đầu là khóa chính. Sắp ổn định: dòng bằng nhau trên mọi khóa giữ thứ tự.
+        # Một khóa dùng thẳng thứ tự đã nhớ; nhiều khóa thì một lần lexsort trên hạng đã nhớ của từng cột.
+        if len(keys) == 1:
+            return self.sort_order(*keys[0])
+        columns = []
+        for name, ascending in reversed(keys):
+            ranks = self.cached(name, 'ranks', sort_ranks)[0]
+            if not ascending and len(ranks):
+                top = ranks.max()
+                ranks = np.where(self.missing(name), top + 1, top - ranks)
+            columns.append(ranks)
+        return np.lexsort(columns)
+
+    def top_k(self, name, k, largest=True, exclude=None):
+        # Chỉ k dòng đầu theo một cột (vd. 1000 dòng Sales lớn nhất), ô trống bị bỏ qua; chuỗi so theo hạng đã nhớ
+        values = self.column(name)
+        if values.dtype.kind in 'iuf':
+            return top_k(values, k, largest, exclude)
+        missing = self.missing(name)
+        exclude = missing if exclude is None else exclude | missing
+        return top_k(self.cached(name, 'ranks', sort_ranks)[0], k, largest, exclude)
+
+    def index(self, name, kind='hash'):
+        # Chỉ mục của cột, dựng lần đầu khi cần và mất hiệu lực khi cột bị thay:
+        #   'hash'   - chuỗi hiển thị -> dòng (so sánh bằng, IN)
+        #   'sorted' - giá trị số (khoảng), 'text' - chuỗi hiển thị (khoảng, tiền tố)
+        if kind == 'hash':
+            build = lambda values: HashIndex(self.formatted(name))
+        elif kind == 'sorted':
+            build = lambda values: SortedIndex(values if values.dtype.kind in 'iuf' else self.numeric(name))
+        elif kind == 'text':
+            build = lambda values: SortedIndex(self.formatted(name))
+        else:
+            raise ValueError(f"Unknown index kind '{kind}'.")
+        return self.cached(name, ('index', kind), build)
+
+    def copy(self):
+        # Bản sao nông: các mảng cột không bao giờ bị sửa tại chỗ nên có thể dùng chung (cả cache của cột)
+        table = DataTable()
+        table._names = list(self._names)
+        table._data = dict(self._data)
+        table._stamps = dict(self._stamps)
+        table._derived = dict(self._derived)
+        table.version = self.version
+        return table
+
+    def _forget(self, name):
+        self._stamps.pop(name, None)
+        self._derived.pop(name, None)
+
+    def add_column(self, name, values, index=None):
+        values = make_column(values)
+        if self._names and len(values) != self.num_rows:
+            raise ValueError(f"Column '{name}' has {len(values)} values, table has {self.num_rows} rows.")
+        if name not in self._data:
+            if index is None:
+                self._names.append(name)
+            else:
+                self._names.insert(index, name)
+        self._data[name] = values
+        self._forget(name)
+        self.version += 1
+
+    def drop_column(self, name):
+        index = self._names.index(name)
+        self._names.pop(index)
+        values = self._data.pop(name)
+        self._forget(name)
+        self.version += 1
+        return index, values
+
+    def rename_column(self, old, new):
+        if new in self._data:
+            raise ValueError(f"Column '{new}' already exists.")
+        self._names[self._names.index(old)] = new
+        self._data[new] = self._data.pop(old)
+        if old in self._stamps:
+            self._stamps[new] = self._stamps.pop(old)
+        if old in self._derived:
+            self._derived[new] = self._derived.pop(old)
+        self.version += 1
+
+    def take(self, rows):
+        table = DataTable()
+        table._names = list(self._names)
+        table._data = {name: self._data[name][rows] for name in self._names}
+        return table
+
+    def rows(self, start=0, stop=None, names=None):
+        names = self._names if names is None else names
+        stop = self.num_rows if stop is None else min(stop, self.num_rows)
+        cols = [format_column(self._data[name][start:stop]) for name in names]
+        return [list(values) for values in zip(*cols)]
+
+    def iter_records(self, chunk_size=50000, rows=None):
+        # Trả về các bản ghi dict theo từng khối, giá trị rỗng ghi thành ""
+        total = self.num_rows if rows is None else len(rows)
+        for start in range(0, total, chunk_size):
+            cols = self.export_columns(start, min(start + chunk_size, total), rows)
+            for values in zip(*cols):
+                yield dict(zip(self._names, values))
+
+    def export_columns(self, start, stop, rows=None):
+        # Giá trị để ghi ra file của các dòng start..stop (vị trí trong vector id dòng `rows` nếu có), theo từng cột:
+        # số nguyên giữ kiểu int, số thực nguyên giá trị ghi thành int (như format_number), ô rỗng thành ""
+        ids = slice(start, stop) if rows is None else rows[start:stop]
+        cols = []
+        for name in self._names:
+            values = self._data[name][ids]
+            if values.dtype.kind == 'f':
+                out = values.astype(object)
+                whole = (np.floor(values) == values) & (np.abs(values) < 1e15)
+                out[whole] = values[whole].astype(np.int64).astype(object)
+                out[np.isnan(values)] = ""
+                values = out.tolist()
+            elif values.dtype.kind in 'iu':
+                values = values.tolist()
+            else:
+                values = ["" if v is None else v for v in values]
+            cols.append(values)
+        return cols
+
+
+def concat_columns(parts):
+    # Ghép các khối của một cột; khối toàn rỗng không làm mất kiểu số của cả cột
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return np.empty(0, dtype=object)
+    numeric = []
+    for part in parts:
+        if part.dtype.kind in 'iuf':
+            numeric.append(part)
+        elif (pd.isna(part) | (part == "")).all():
+            numeric.append(np.full(len(part), np.nan))
+        else:
+            return np.concatenate([p if p.dtype == object else format_column(p) for p in parts])
+    mixed = any(p.dtype.kind == 'f' for p in numeric)
+    if mixed and any(p.dtype.kind in 'iu' and (p.max() >= 2 ** 53 or p.min() <= -2 ** 53) for p in numeric):
+        # khối int64 có số lớn không ép được sang float64 mà không sai: cả cột thành chuỗi
+        return np.concatenate([p if p.dtype == object else format_column(p) for p in parts])
+    return np.concatenate(numeric)
+
+
+def unique_names(header):
+    seen = {}
+    names = []
+    for name in header:
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+class TableBuilder:
+    # Gom dữ liệu theo từng khối (dùng khi đọc file nền). Có thể đọc các dòng đã có
+    # trong lúc vẫn đang nạp, sau đó build() ghép thành DataTable.
+    def __init__(self, header):
+        self.columns = unique_names(header)
+        self.chunks = []
+        self.starts = []
+        self.num_rows = 0
+
+    def __len__(self):
+        return self.num_rows
+
+    def append_frame(self, frame):
+        # Khối DataFrame do pandas đọc dạng chuỗi (ô trống là ""). Kiểu được suy ra từ chuỗi gốc của khối nên
+        # mã có số 0 ở đầu vẫn là chuỗi; khối nào của cột còn là chuỗi thì cả cột thành chuỗi khi build()
+        columns = {}
+        for name in self.columns:
+            values = frame[name].to_numpy()
+            if values.dtype == object:
+                values = infer_column(values, values == "")
+            columns[name] = values
+        self.append_columns(columns, len(frame))
+
+    def append_records(self, records):
+        # Bản ghi JSON (dict đã làm phẳng). Khóa mới xuất hiện giữa chừng thành cột mới,
+        # các khối đã đọc trước đó được điền giá trị trống cho cột này.
+        known = set(self.columns)
+        added = []
+        for record in records:
+            for key in record:
+                if key not in known:
+                    known.add(key)
+                    added.append(key)
+        self._add_columns(added)
+        columns = {name: [record.get(name) for record in records] for name in self.columns}
+        self.append_columns(columns, len(records))
+
+    def append_table(self, table):
+        # Bảng của một file khác (mở nhiều file): hợp các cột theo tên, cột mới làm các khối trước để trống,
+        # cột mà bảng này không có được để trống; kiểu của cột được thống nhất khi build() (concat_columns)
+        known = set(self.columns)
+        self._add_columns([name for name in table.columns if name not in known])
+        columns = {name: table.column(name) if name in table else np.full(len(table), np.nan)
+                   for name in self.columns}
+        self.append_columns(columns, len(table))
+
+    def _add_columns(self, added):
+        ends = self.starts[1:] + [self.num_rows]
+        for chunk, start, end in zip(self.chunks, self.starts, ends):
+            for name in added:
+                chunk[name] = np.full(end - start, np.nan)
+        self.columns = self.columns + added  # thay list mới để luồng giao diện không thấy trạng thái dở dang
+
+    def append_columns(self, columns, count):
+        chunk = {name: make_column(columns[name]) for name in self.columns}
+        self.starts.append(self.num_rows)
+        self.chunks.append(chunk)
+        self.num_rows += count
+
+    def rows(self, start=0, stop=None, names=None):
+        names = self.columns if names is None else names
+        stop = self.num_rows if stop is None else min(stop, self.num_rows)
+        chunks, starts = list(self.chunks), list(self.starts)
+        result = []
+        idx = max(bisect.bisect_right(starts, start) - 1, 0)
+        while start < stop and idx < len(chunks):
+            chunk, base = chunks[idx], starts[idx]
+            end = min(stop, base + len(chunk[self.columns[0]]))
+            cols = [format_column(chunk[name][start - base:end - base]) for name in names]
+            result.extend(list(values) for values in zip(*cols))
+            start, idx = end, idx + 1
+        return result
+
+    def build(self):
+        table = DataTable()
+        table._names = list(self.columns)
+        table._data = {name: concat_columns([chunk[name] for chunk in self.chunks]) for name in self.columns}
+        return table
+
+
+def concat_tables(tables):
+    # Ghép theo tên cột; cột không có trong một phần được điền giá trị trống
+    builder = TableBuilder([])
+    for table in tables:
+        builder.append_table(table)
+    return builder.build()
+
+
+def diff_tables(old, new):
+    # So sánh hai trạng thái bảng theo định danh mảng cột (cột dùng chung = không đổi)
+    old_arrays = {name: old.column(name) for name in old.columns}
+    added = [name for name in new.columns if name not in old_arrays]
+    removed = [name for name in old.columns if name not in new]
+    changed = [name for name in new.columns
+               if name in old_arrays and old_arrays[name] is not new.column(name)]
+
+    renamed = {}
+    for old_name in list(removed):
+        for new_name in added:
+            if old_arrays[old_name] is new.column(new_name):
+                renamed[old_name] = new_name
+                removed.remove(old_name)
+                added.remove(new_name)
+                break
+
+    return {'added': added, 'removed': removed, 'renamed': renamed, 'changed': changed,
+            'rows': old.num_rows != new.num_rows}
+
+
+def format_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() and abs(value) < 1e15 else value
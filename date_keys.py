@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# Các định dạng thử theo thứ tự; 'ISO8601' gồm cả "2024-03-19", "2024-03-19 10:00:00", "2024-03-19T10:00:00Z"
+DATE_FORMATS = ['ISO8601', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%m/%d/%Y %H:%M',
+                '%d/%m/%Y %H:%M', '%Y/%m/%d', '%d-%m-%Y', '%d.%m.%Y', '%Y-%m', '%Y%m', '%Y%m%d']
+
+# Khóa suy ra từ ngày, lưu dạng số nguyên để sắp xếp / gom nhóm trực tiếp
+DATE_KEYS = {
+    'day': 'Day',  # YYYYMMDD
+    'week': 'Week',  # YYYYWW (tuần ISO)
+    'month': 'MonthYear',  # YYYYMM
+    'quarter': 'Quarter',  # YYYYQ
+    'year': 'Year',  # YYYY
+    'hour': 'Hour',  # YYYYMMDDHH
+}
+
+_TIMEZONE = r'(?<=\d\d:\d\d)(:\d\d(?:\.\d*)?)?(?:Z|[+-]\d\d:?\d\d)$'
+
+
+def _to_datetime(texts, fmt):
+    if fmt == 'ISO8601':
+        # Bỏ múi giờ để lấy giờ địa phương ghi trong chuỗi (giống datetime.fromisoformat)
+        texts = texts.str.replace(_TIMEZONE, r'\1', regex=True)
+    try:
+        return pd.to_datetime(texts, format=fmt, errors='coerce')
+    except (ValueError, TypeError):
+        return pd.Series(pd.NaT, index=texts.index, dtype='datetime64[ns]')
+
+
+def detect_format(texts, sample_size=200):
+    # Chọn định dạng đọc được nhiều giá trị mẫu nhất (hòa thì lấy định dạng đứng trước)
+    texts = pd.Series(texts, dtype=object)
+    texts = texts[texts.str.strip().fillna('') != '']
+    if not len(texts):
+        return None
+    sample = texts.sample(min(sample_size, len(texts)), random_state=0) if len(texts) > sample_size else texts
+    best, best_count = None, 0
+    for fmt in DATE_FORMATS:
+        count = int(_to_datetime(sample, fmt).notna().sum())
+        if count > best_count:
+            best, best_count = fmt, count
+            if count == len(sample):
+                break
+    return best
+
+
+def parse_dates(texts):
+    # Mỗi chuỗi khác nhau chỉ được đọc một lần (bảng ghi nhớ theo factorize), định dạng dò một lần từ mẫu;
+    # giá trị không khớp định dạng chính được thử lần lượt với các định dạng còn lại, mỗi lần cả lô.
+    codes, uniques = pd.factorize(np.asarray(texts, dtype=object))
+    uniques = pd.Series(uniques, dtype=object).str.strip()
+    fmt = detect_format(uniques)
+    if fmt is None:
+        return np.full(len(codes), np.datetime64('NaT'), dtype='datetime64[ns]'), None
+
+    parsed = _to_datetime(uniques, fmt)
+    for other in DATE_FORMATS:
+        missing = parsed.isna() & (uniques.fillna('') != '')
+        if not missing.any():
+            break
+        if other != fmt:
+            parsed[missing] = _to_datetime(uniques[missing], other)
+
+    values = parsed.to_numpy(dtype='datetime64[ns]')
+    out = np.full(len(codes), np.datetime64('NaT'), dtype='datetime64[ns]')
+    valid = codes >= 0
+    out[valid] = values[codes[valid]]
+    return out, fmt
+
+
+def date_key(dates, key):
+    # dates: datetime64 (NaT = không đọc được). Kết quả int64, hoặc float64 với NaN nếu có ngày không đọc được.
+    index = pd.DatetimeIndex(dates)
+    if key == 'day':
+        values = index.year * 10000 + index.month * 100 + index.day
+    elif key == 'week':
+        iso = index.isocalendar()
+        values = iso['year'].astype('float64') * 100 + iso['week'].astype('float64')
+    elif key == 'month':
+        values = index.year * 100 + index.month
+    elif key == 'quarter':
+        values = index.year * 10 + index.quarter
+    elif key == 'year':
+        values = index.year
+    elif key == 'hour':
+        values = ((index.year * 100 + index.month) * 100 + index.day) * 100 + index.hour
+    else:
+        raise ValueError(f"Unknown date key '{key}'.")
+    values = np.asarray(values, dtype=np.float64)
+    if np.isnan(values).any():
+        return values
+    return values.astype(np.int64)
@@ -0,0 +1,29 @@
+import numpy as np
+
+# Rút gọn chuỗi điểm (x tăng dần) trước khi vẽ: mỗi pixel theo trục X chỉ cần điểm thấp nhất và cao nhất
+# để hình vẽ giống hệt khi vẽ toàn bộ (kể cả các đỉnh nhọn), nên một đường hàng triệu điểm còn vài nghìn điểm.
+
+
+def minmax_indices(x, y, pixels):
+    # Chỉ số các điểm giữ lại (tăng dần): điểm đầu, điểm cuối và điểm min / max của y trong từng khoảng
+    # rộng một pixel theo giá trị x. y không có NaN.
+    n = len(x)
+    if n <= 4 * pixels or x[0] == x[-1]:
+        return np.arange(n)
+    edges = np.searchsorted(x, np.linspace(x[0], x[-1], pixels + 1)[:-1])
+    starts = np.unique(edges)
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    keep = [np.array([0, n - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(y, starts)
+        rows = np.flatnonzero(y == extreme[segment])
+        _, first = np.unique(segment[rows], return_index=True)  # điểm đầu tiên đạt min / max trong mỗi khoảng
+        keep.append(rows[first])
+    return np.unique(np.concatenate(keep))
+
+
+def visible_range(x, low, high):
+    # [start, stop) của các điểm nằm trong khoảng nhìn thấy, thêm một điểm mỗi bên để đường nối ra tới mép
+    start = max(int(np.searchsorted(x, low, 'left')) - 1, 0)
+    stop = min(int(np.searchsorted(x, high, 'right')) + 1, len(x))
+    return start, stop
@@ -0,0 +1,291 @@
+import re
+
+import numpy as np
+
+# Ngôn ngữ lọc, ví dụ:
+#   Sales > 100 AND Region = 'North'
+#   NOT (Product IN ('A', 'B') OR Note IS NULL)
+#   [Order Date] BETWEEN '2024-01-01' AND '2024-03-31'
+#   Name CONTAINS 'an' OR Zip STARTSWITH '07'
+# Tên cột có khoảng trắng đặt trong [..] hoặc `..` (viết ]] hoặc `` cho ký tự đóng nằm trong tên);
+# chuỗi đặt trong '..' hoặc "..".
+# Số không có ngoặc được so sánh theo giá trị số, chuỗi theo chuỗi hiển thị của ô.
+# Ô rỗng theo logic ba trị như SQL: mọi phép so sánh trên ô rỗng là "không biết" (kể cả khi phủ định bằng
+# !=, NOT, NOT IN), chỉ IS NULL / IS NOT NULL xét được ô rỗng.
+
+KEYWORDS = {'AND', 'OR', 'NOT', 'IN', 'BETWEEN', 'CONTAINS', 'STARTSWITH', 'IS', 'NULL'}
+COMPARISONS = {'=', '==', '!=', '<>', '<', '<=', '>', '>='}
+
+TOKEN = re.compile(r"""\s*(?:
+    (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+   |(?P<column>`(?:[^`]|``)*`|\[(?:[^\]]|\]\])*\])
+   |(?P<op><=|>=|!=|<>|==|=|<|>|\(|\)|,)
+   |(?P<word>[^\s()=<>!,'"`\[]+)
+)""", re.VERBOSE)
+
+
+class FilterError(ValueError):
+    pass
+
+
+class Literal:
+    def __init__(self, text, quoted):
+        self.text = text
+        self.number = None
+        if not quoted:
+            try:
+                self.number = float(text)
+            except ValueError:
+                pass
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise FilterError(f"Unexpected character at position {pos + 1}: {text[pos:pos + 10]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'string':
+            value = re.sub(r"\\(.)", r"\1", value[1:-1])
+        elif kind == 'column':
+            close = value[-1]
+            value = value[1:-1].replace(close * 2, close)
+        elif kind == 'word' and value.upper() in KEYWORDS:
+            kind, value = 'keyword', value.upper()
+        tokens.append((kind, value))
+    return tokens
+
+
+class Node:
+    def mask(self, table):
+        # Các dòng thỏa biểu thức (đúng chắc chắn; dòng "không biết" bị loại như WHERE của SQL)
+        return self.evaluate(table)[0]
+
+    def evaluate(self, table):
+        # Trả về (đúng, không biết) theo logic ba trị
+        raise NotImplementedError
+
+    def columns(self):
+        return set()
+
+
+class And(Node):
+    def __init__(self, parts):
+        self.parts = parts
+
+    def evaluate(self, table):
+        # Sai nếu có một vế sai; còn lại đúng nếu mọi vế đúng, không thì "không biết"
+        true, unknown = self.parts[0].evaluate(table)
+        for part in self.parts[1:]:
+            part_true, part_unknown = part.evaluate(table)
+            false = (~true & ~unknown) | (~part_true & ~part_unknown)
+            true = true & part_true
+            unknown = ~true & ~false
+        return true, unknown
+
+    def columns(self):
+        return set().union(*(part.columns() for part in self.parts))
+
+
+class Or(And):
+    def evaluate(self, table):
+        # Đúng nếu có một vế đúng; còn lại "không biết" nếu có vế "không biết"
+        true, unknown = self.parts[0].evaluate(table)
+        for part in self.parts[1:]:
+            part_true, part_unknown = part.evaluate(table)
+            true = true | part_true
+            unknown = (unknown | part_unknown) & ~true
+        return true, unknown
+
+
+class Not(Node):
+    def __init__(self, part):
+        self.part = part
+
+    def evaluate(self, table):
+        true, unknown = self.part.evaluate(table)
+        return ~true & ~unknown, unknown
+
+    def columns(self):
+        return self.part.columns()
+
+
+class Condition(Node):
+    # Một điều kiện trên một cột; dùng chỉ mục của cột (table.index) khi có thể, còn lại là phép so sánh vectorized
+    def __init__(self, column, op, values):
+        self.column = column
+        self.op = op
+        self.values = values
+
+    def columns(self):
+        return {self.column}
+
+    def evaluate(self, table):
+        if self.column not in table:
+            raise FilterError(f"Column '{self.column}' not found.")
+        if self.op == 'IS NULL':
+            return table.missing(self.column).copy(), np.zeros(table.num_rows, dtype=bool)
+        unknown = table.missing(self.column)
+        return self._compare(table) & ~unknown, unknown
+
+    def _compare(self, table):
+        name, op, values = self.column, self.op, self.values
+        numeric = all(v.number is not None for v in values)
+
+        if op == 'CONTAINS':
+            index = table.index(name, 'hash')
+            found = index.uniques.str.contains(values[0].text, case=False, regex=False)
+            return self._from_rows(table, index.lookup_many(index.uniques[np.asarray(found, dtype=bool)]))
+        if op == 'STARTSWITH':
+            return self._from_rows(table, table.index(name, 'text').prefix(values[0].text))
+        if op == 'IN':
+            if numeric:
+                return np.isin(table.numeric(name), [v.number for v in values])
+            return self._from_rows(table, table.index(name, 'hash').lookup_many([v.text for v in values]))
+        if op == 'BETWEEN':
+            low, high = values
+            if numeric:
+                return self._from_rows(table, table.index(name, 'sorted').range(low.number, high.number))
+            return self._from_rows(table, table.index(name, 'text').range(low.text, high.text))
+
+        value = values[0]
+        if op in ('=', '!='):
+            if numeric:
+                mask = self._from_rows(table, table.index(name, 'sorted').range(value.number, value.number))
+            else:
+                mask = self._from_rows(table, table.index(name, 'hash').lookup(value.text))
+            return mask if op == '=' else ~mask
+
+        index = table.index(name, 'sorted' if numeric else 'text')
+        key = value.number if numeric else value.text
+        if op == '<':
+            rows = index.range(high=key, include_high=False)
+        elif op == '<=':
+            rows = index.range(high=key)
+        elif op == '>':
+            rows = index.range(low=key, include_low=False)
+        else:
+            rows = index.range(low=key)
+        return self._from_rows(table, rows)
+
+    @staticmethod
+    def _from_rows(table, rows):
+        mask = np.zeros(table.num_rows, dtype=bool)
+        mask[rows] = True
+        return mask
+
+
+class Parser:
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise FilterError("Empty filter expression.")
+        node = self.parse_or()
+        if self.pos < len(self.tokens):
+            raise FilterError(f"Unexpected '{self.tokens[self.pos][1]}'.")
+        return node
+
+    def parse_or(self):
+        parts = [self.parse_and()]
+        while self.accept('keyword', 'OR'):
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else Or(parts)
+
+    def parse_and(self):
+        parts = [self.parse_not()]
+        while self.accept('keyword', 'AND'):
+            parts.append(self.parse_not())
+        return parts[0] if len(parts) == 1 else And(parts)
+
+    def parse_not(self):
+        if self.accept('keyword', 'NOT'):
+            return Not(self.parse_not())
+        if self.accept('op', '('):
+            node = self.parse_or()
+            self.expect('op', ')')
+            return node
+        return self.parse_condition()
+
+    def parse_condition(self):
+        kind, column = self.next("a column name")
+        if kind not in ('word', 'column'):
+            raise FilterError(f"Expected a column name, got '{column}'.")
+
+        kind, op = self.next("an operator")
+        if kind == 'op' and op in COMPARISONS:
+            op = {'==': '=', '<>': '!='}.get(op, op)
+            return Condition(column, op, [self.literal()])
+        if (kind, op) == ('keyword', 'IS'):
+            negate = self.accept('keyword', 'NOT')
+            self.expect('keyword', 'NULL')
+            node = Condition(column, 'IS NULL', [])
+            return Not(node) if negate else node
+        if (kind, op) == ('keyword', 'NOT'):
+            return Not(self.parse_membership(column, self.next("IN, BETWEEN or CONTAINS")))
+        return self.parse_membership(column, (kind, op))
+
+    def parse_membership(self, column, token):
+        kind, op = token
+        if (kind, op) == ('keyword', 'IN'):
+            self.expect('op', '(')
+            values = [self.literal()]
+            while self.accept('op', ','):
+                values.append(self.literal())
+            self.expect('op', ')')
+            return Condition(column, 'IN', values)
+        if (kind, op) == ('keyword', 'BETWEEN'):
+            low = self.literal()
+            self.expect('keyword', 'AND')
+            return Condition(column, 'BETWEEN', [low, self.literal()])
+        if kind == 'keyword' and op in ('CONTAINS', 'STARTSWITH'):
+            return Condition(column, op, [self.literal()])
+        raise FilterError(f"Unknown operator '{op}' after column '{column}'.")
+
+    def literal(self):
+        kind, value = self.next("a value")
+        if kind not in ('string', 'word'):
+            raise FilterError(f"Expected a value, got '{value}'.")
+        return Literal(value, quoted=kind == 'string')
+
+    def next(self, expected):
+        if self.pos >= len(self.tokens):
+            raise FilterError(f"Expected {expected} at the end of the expression.")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def accept(self, kind, value):
+        if self.pos < len(self.tokens) and self.tokens[self.pos] == (kind, value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, kind, value):
+        if not self.accept(kind, value):
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of expression"
+            raise FilterError(f"Expected '{value}', got '{found}'.")
+
+
+def compile_filter(text):
+    return Parser(text).parse()
+
+
+def filter_rows(table, text):
+    # Vector id dòng (tăng dần) của bảng gốc thỏa biểu thức
+    return np.flatnonzero(compile_filter(text).mask(table))
+
+
+def quote_column(name):
+    return "[" + str(name).replace("]", "]]") + "]"
+
+
+def quote_value(value):
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
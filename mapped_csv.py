@@ -0,0 +1,170 @@
+import bisect
+import csv
+import io
+import itertools
+import mmap
+
+import numpy as np
+import pandas as pd
+
+from data_io import (DecodedStream, FileLoader, LoadCancelled, RowGuard, detect_compression, input_kind,
+                     quote_toggles, sniff_csv)
+from data_table import infer_column, unique_names
+from table_stats import ColumnSummary
+
+ROW_BLOCK = 64  # chỉ lưu vị trí byte của mỗi dòng thứ 64 để chỉ mục gọn
+
+
+class MapReader(io.RawIOBase):
+    # Đọc tuần tự một vùng mmap với vị trí riêng (nhiều luồng đọc không ảnh hưởng nhau), dừng ở `stop` nếu có
+    def __init__(self, data, start=0, stop=None):
+        super().__init__()
+        self.data = data
+        self.pos = start
+        self.stop = len(data) if stop is None else stop
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.data[self.pos:min(self.pos + len(buffer), self.stop)]
+        buffer[:len(chunk)] = chunk
+        self.pos += len(chunk)
+        return len(chunk)
+
+
+class MappedCSV:
+    # Xem file CSV lớn hơn RAM: file được ánh xạ bộ nhớ (mmap), chỉ mục dòng được dựng
+    # trong nền, lưới chỉ giải mã những dòng đang hiển thị, phép tính đọc file theo khối.
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = fmt or sniff_csv(path)
+        self._file = open(path, 'rb')
+        self.map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self.map)
+        self._blocks = []  # mỗi phần tử: mảng vị trí byte đầu dòng của một khối quét
+        self._block_ends = []  # tổng số vị trí đã lưu tính đến hết từng khối quét
+        self._rows = 0
+        self.indexed = False
+
+        reader = csv.reader(self._text_from(0), delimiter=self.fmt['delimiter'])
+        self.columns = unique_names(next(reader, []))
+
+    def __len__(self):
+        return self._rows
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    @property
+    def num_rows(self):
+        return self._rows
+
+    def close(self):
+        self._blocks = []
+        self._block_ends = []
+        self.map.close()
+        self._file.close()
+
+    def build_index(self, chunk_bytes=1 << 26, cancel_event=None, progress=None):
+        # Quét ký tự xuống dòng bằng numpy; dấu xuống dòng nằm trong trường ngoặc kép (quote_toggles) bị bỏ qua
+        pos = 0
+        inside = False
+        before = 10
+        delimiter = ord(self.fmt['delimiter'])
+        newlines = 0
+        while pos < self.size:
+            if cancel_event is not None and cancel_event.is_set():
+                raise LoadCancelled()
+            end = min(pos + chunk_bytes, self.size)
+            buf = np.frombuffer(self.map, dtype=np.uint8, count=end - pos, offset=pos)
+            breaks = np.flatnonzero(buf == 10)
+            toggles = quote_toggles(buf, delimiter, inside, before)
+            if len(toggles) or inside:
+                breaks = breaks[(np.searchsorted(toggles, breaks) + inside) % 2 == 0]
+            inside = bool((len(toggles) + inside) % 2)
+            before = int(buf[-1])
+            if before == 34 and not (len(toggles) and toggles[-1] == len(buf) - 1):
+                before = 0  # dấu " thường ở cuối khối
+            del buf
+
+            # Dấu xuống dòng thứ g (tính cả dòng tiêu đề) là điểm bắt đầu của dòng dữ liệu g
+            row_ids = newlines + np.arange(len(breaks))
+            self._blocks.append(breaks[row_ids % ROW_BLOCK == 0].astype(np.int64) + pos + 1)
+            self._block_ends.append((self._block_ends[-1] if self._block_ends else 0) + len(self._blocks[-1]))
+            newlines += len(breaks)
+            self._rows = max(newlines - 1, 0)
+            pos = end
+            if progress is not None:
+                progress(self._rows, pos, self.size)
+
+        if newlines and self.map[self.size - 1:self.size] != b'\n':
+            self._rows = newlines  # dòng cuối không có ký tự xuống dòng
+        self.indexed = True
+
+    def rows(self, start=0, stop=None, names=None):
+        names = self.columns if names is None else names
+        stop = self._rows if stop is None else min(stop, self._rows)
+        if start >= stop:
+            return []
+        block = start // ROW_BLOCK
+        reader = csv.reader(self._text_from(self._row_offset(block)), delimiter=self.fmt['delimiter'])
+        positions = [self.columns.index(name) for name in names]
+        result = []
+        for row in itertools.islice(reader, start - block * ROW_BLOCK, stop - block * ROW_BLOCK):
+            result.append([row[i] if i < len(row) else "" for i in positions])
+        return result
+
+    def column_chunks(self, names, chunk_rows=500000):
+        # Đọc tuần tự một vài cột trên vùng nhớ ánh xạ, mỗi lần một khối DataFrame dạng chuỗi
+        raw = io.BufferedReader(MapReader(self.map), 1 << 20)
+        stream = DecodedStream(RowGuard(raw, self.fmt['delimiter']), self.fmt['encoding'])
+        reader = pd.read_csv(stream, sep=self.fmt['delimiter'], usecols=list(names), dtype=object, na_filter=False,
+                             chunksize=chunk_rows, engine='c')
+        with reader:
+            for frame in reader:
+                yield frame
+
+    def summarize(self, name):
+        # Mọi thống kê của một cột (table_stats) trong một lượt đọc theo khối, bộ nhớ không phụ thuộc kích thước file
+        summary = ColumnSummary()
+        for frame in self.column_chunks([name]):
+            values = frame[name].to_numpy()
+            summary.update(infer_column(values, values == ""))
+        return summary.result()
+
+    def stripes(self, parts):
+        # Chia phần dữ liệu (sau dòng tiêu đề) thành tối đa `parts` đoạn byte, mỗi đoạn bắt đầu ở đầu một dòng
+        # (theo chỉ mục dòng nên dấu xuống dòng trong ngoặc kép không bị cắt); dùng để đọc song song
+        blocks = -(-self._rows // ROW_BLOCK)
+        starts = sorted({self._row_offset(blocks * i // parts) for i in range(parts)}) if blocks else []
+        return list(zip(starts, starts[1:] + [self.size]))
+
+    def _row_offset(self, block):
+        chunk = bisect.bisect_right(self._block_ends, block)
+        first = self._block_ends[chunk - 1] if chunk else 0
+        return int(self._blocks[chunk][block - first])
+
+    def _text_from(self, offset):
+        raw = io.BufferedReader(MapReader(self.map, offset), 1 << 16)
+        return io.TextIOWrapper(raw, encoding=self.fmt['encoding'], errors='replace', newline='')
+
+
+class MappedLoader(FileLoader):
+    # Giống FileLoader nhưng chỉ dựng chỉ mục dòng, kết quả 'done' là một MappedCSV
+    def run(self):
+        mapped = None
+        try:
+            if input_kind(self.path) != 'csv' or detect_compression(self.path):
+                raise ValueError("Memory-mapped mode supports uncompressed CSV files only.")
+            mapped = MappedCSV(self.path)
+            mapped.build_index(cancel_event=self.cancel_event,
+                               progress=lambda rows, pos, size: self.messages.put(('progress', mapped, rows, pos, size)))
+            self.messages.put(('done', mapped))
+        except LoadCancelled:
+            mapped.close()
+            self.messages.put(('cancelled',))
+        except Exception as e:
+            if mapped is not None:
+                mapped.close()  # không giữ file mở (và bị khóa trên Windows) khi dựng chỉ mục lỗi
+            self.messages.put(('error', e))
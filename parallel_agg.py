@@ -0,0 +1,269 @@
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from data_io import DecodedStream, RowGuard, detect_compression, input_kind, read_csv_chunks, sniff_csv
+from data_table import TableBuilder, missing_mask, numeric_values
+from mapped_csv import MapReader, MappedCSV
+from table_groupby import GroupBy, group_by
+from table_stats import ColumnSummary
+
+# Tính toán / gom nhóm song song trên nhiều tiến trình (tránh GIL). Bảng được chia thành các đoạn dòng liên tiếp,
+# file CSV lớn được chia thành các đoạn byte (mỗi đoạn bắt đầu ở đầu một dòng). Mỗi tiến trình tính kết quả từng
+# phần (ColumnSummary, GroupBy, trạng thái Pipeline); tiến trình chính gộp (merge) các phần theo đúng thứ tự đoạn
+# nên kết quả giống như khi tính tuần tự. Mảng số được chia sẻ qua shared memory thay vì sao chép sang từng tiến trình.
+
+PARALLEL_MIN_ROWS = 1000000  # bảng nhỏ hơn: tính tại chỗ nhanh hơn chi phí gửi dữ liệu sang tiến trình khác
+STRIPE_MIN_BYTES = 32 << 20  # file CSV nhỏ hơn không được chia thành nhiều đoạn byte
+
+_pool = None
+_pool_workers = 0
+
+
+def worker_count(workers=None):
+    # None / 0 = số lõi CPU
+    return max(1, int(workers) if workers else os.cpu_count() or 1)
+
+
+def get_pool(workers):
+    # Giữ lại pool giữa các lần gọi để không phải khởi động tiến trình mỗi lần tính
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def stripes(num_rows, parts):
+    # Các đoạn dòng [start, stop) gần bằng nhau
+    bounds = np.linspace(0, num_rows, parts + 1).astype(np.int64).tolist()
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if start < stop]
+
+
+class SharedArrays:
+    # Đưa các mảng số / bool vào shared memory; tiến trình con mở lại theo tên, không sao chép.
+    # Mảng object (chuỗi) không chia sẻ được: mỗi tiến trình chỉ nhận lát cắt của đoạn mình tính.
+    def __init__(self, arrays):
+        self.blocks = []
+        self.specs = []
+        shared = {}
+        for values in arrays:
+            if values is None or values.dtype.kind not in 'biuf':
+                self.specs.append(('array', values))
+                continue
+            if id(values) not in shared:  # cột số: values và numbers thường là cùng một mảng
+                block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+                self.blocks.append(block)
+                shared[id(values)] = ('shared', block.name, values.dtype.str, len(values))
+            self.specs.append(shared[id(values)])
+
+    def stripe(self, start, stop):
+        return [spec if spec[0] == 'shared' or spec[1] is None else ('array', spec[1][start:stop])
+                for spec in self.specs]
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(specs, start, stop, blocks):
+    arrays = []
+    for spec in specs:
+        if spec[0] == 'array':
+            arrays.append(spec[1])
+            continue
+        _, name, dtype, length = spec
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays.append(np.ndarray(length, np.dtype(dtype), buffer=block.buf)[start:stop])
+    return arrays
+
+
+def _detach(blocks):
+    for block in blocks:
+        block.close()
+
+
+def _summary_part(specs, start, stop):
+    blocks = []
+    try:
+        values, numbers, missing = _attach(specs, start, stop, blocks)
+        summary = ColumnSummary().update(values, numbers, missing)
+        del values, numbers, missing  # bỏ các view vào shared memory trước khi đóng
+        return summary
+    finally:
+        _detach(blocks)
+
+
+def _group_part(specs, start, stop, keep_values):
+    blocks = []
+    try:
+        codes, values, valid = _attach(specs, start, stop, blocks)
+        groups = GroupBy(keep_values).update(codes, values, valid)
+        del codes, values, valid
+        return groups
+    finally:
+        _detach(blocks)
+
+
+def _run(workers, task, shared, num_rows, *args):
+    # Chạy task trên từng đoạn dòng, trả về các kết quả từng phần theo thứ tự đoạn
+    pool = get_pool(workers)
+    try:
+        futures = [pool.submit(task, shared.stripe(start, stop), start, stop, *args)
+                   for start, stop in stripes(num_rows, workers)]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        shutdown()  # tiến trình con bị dừng đột ngột: lần sau tạo pool mới
+        raise
+
+
+def parallel_summary(values, numbers=None, missing=None, workers=None):
+    # Như table_stats.summarize_column, chia cột cho nhiều tiến trình khi cột đủ lớn
+    workers = worker_count(workers)
+    numbers = numeric_values(values) if numbers is None else numbers
+    missing = missing_mask(values) if missing is None else missing
+    summary = ColumnSummary()
+    if workers == 1 or len(values) < PARALLEL_MIN_ROWS:
+        return summary.update(values, numbers, missing).result()
+    with SharedArrays([values, numbers, missing]) as shared:
+        for part in _run(workers, _summary_part, shared, len(values)):
+            summary.merge(part)
+    return summary.result()
+
+
+def parallel_group_by(keys, values, how='sum', valid=None, workers=None):
+    # Như table_groupby.group_by. Nhãn được mã hóa thành số nguyên một lần ở tiến trình chính để cả ba mảng
+    # (mã nhóm, giá trị, mặt nạ) đều chia sẻ được; các tiến trình gom theo mã, nhãn được trả lại sau khi gộp.
+    workers = worker_count(workers)
+    if workers == 1 or len(keys) < PARALLEL_MIN_ROWS:
+        return group_by(keys, values, how, valid)
+    codes, uniques = pd.factorize(keys)
+    valid = codes >= 0 if valid is None else valid & (codes >= 0)
+    groups = GroupBy(keep_values=how == 'median')
+    with SharedArrays([codes, values, valid]) as shared:
+        for part in _run(workers, _group_part, shared, len(keys), how == 'median'):
+            groups.merge(part)
+    labels, out = groups.result(how)
+    return np.asarray(uniques)[np.asarray(labels, dtype=np.intp)].tolist(), out
+
+
+def _csv_stripe_chunks(path, fmt, names, start, stop, chunk_rows, columns):
+    # Các khối DataTable của đoạn byte [start, stop) (không có dòng tiêu đề: tên cột được truyền vào)
+    usecols = None if columns is None else [name for name in names if name in columns]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        raw = io.BufferedReader(MapReader(data, start, stop), 1 << 20)
+        stream = DecodedStream(RowGuard(raw, fmt['delimiter'], width=len(names)), fmt['encoding'])
+        reader = pd.read_csv(stream, sep=fmt['delimiter'], header=None, names=names, usecols=usecols, dtype=object,
+                             na_filter=False, chunksize=chunk_rows, engine='c')
+        with reader:
+            for frame in reader:
+                builder = TableBuilder(list(frame.columns))
+                builder.append_frame(frame)
+                yield builder.build()
+
+
+def _pipeline_part(pipeline, path, stripe):
+    # Trạng thái từng phần của Pipeline cho một file (stripe=None) hoặc một đoạn byte của file
+    pipeline.timings = dict.fromkeys(pipeline.timings, 0.0)
+    state = pipeline.start()
+    if stripe is None:
+        pipeline.feed(state, path)
+    else:
+        fmt, names, start, stop = stripe
+        chunks = _csv_stripe_chunks(path, fmt, names, start, stop, pipeline.chunk_rows, pipeline.scan_columns())
+        pipeline.feed_chunks(state, chunks, path)
+    return state, pipeline.timings
+
+
+def file_stripes(path, parts):
+    # (định dạng, tên cột, start, stop) cho từng đoạn byte của một file CSV lớn; None = đọc cả file một lượt
+    if parts <= 1 or os.path.getsize(path) < STRIPE_MIN_BYTES:
+        return None
+    if input_kind(path) != 'csv' or detect_compression(path):
+        return None  # file nén chỉ đọc tuần tự được
+    fmt = sniff_csv(path)
+    first = next(read_csv_chunks(path, 1, 1, fmt), None)
+    if first is None:
+        return None
+    names = list(first[0].columns)  # tên cột do pandas đặt (kể cả cột trùng tên), giống khi đọc tuần tự
+    mapped = MappedCSV(path, fmt)
+    try:
+        mapped.build_index()
+        return [(fmt, names, start, stop) for start, stop in mapped.stripes(parts)]
+    finally:
+        mapped.close()
+
+
+def pipeline_states(pipeline, paths, workers=None):
+    # Chạy pipeline trên các file bằng nhiều tiến trình: mỗi file (hoặc mỗi đoạn byte của file lớn) là một việc.
+    # Trả về lần lượt (file, trạng thái đã gộp) hoặc (file, lỗi) theo thứ tự file.
+    workers = worker_count(workers)
+    pool = get_pool(workers)
+    tasks = []
+    for path in paths:
+        try:
+            # Chỉ chia file thành đoạn byte khi có ít file hơn số tiến trình và kết quả từng phần nhỏ (có tính toán);
+            # file đã có trong cache dạng cột được đọc từ cache như khi chạy tuần tự
+            split = pipeline.aggregations and pipeline.cache is None and len(paths) < workers
+            parts = file_stripes(path, workers) if split else None
+            tasks.append((path, [pool.submit(_pipeline_part, pipeline, path, stripe) for stripe in parts or [None]]))
+        except BrokenProcessPool:
+            shutdown()
+            raise
+        except Exception as e:
+            tasks.append((path, e))
+    for path, futures in tasks:
+        if isinstance(futures, Exception):
+            yield path, futures
+            continue
+        try:
+            state = pipeline.start()
+            for future in futures:
+                part, timings = future.result()
+                pipeline.merge(state, part)
+                for stage, spent in timings.items():
+                    pipeline.timings[stage] += spent  # tổng thời gian của các tiến trình (không phải thời gian thực)
+        except BrokenProcessPool as e:
+            shutdown()
+            yield path, e
+            continue
+        except Exception as e:
+            yield path, e
+            continue
+        yield path, state
+
+
+def serial_states(pipeline, paths, cancel_event=None):
+    # Như pipeline_states nhưng chạy tuần tự trong tiến trình hiện tại
+    for path in paths:
+        state = pipeline.start()
+        try:
+            pipeline.feed(state, path, cancel_event)
+        except Exception as e:
+            yield path, e
+            continue
+        yield path, state
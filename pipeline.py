@@ -0,0 +1,379 @@
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+from data_io import LoadCancelled, expand_inputs, input_kind, iter_table_chunks, save_table
+from data_table import DataTable, concat_tables, make_column
+from filter_expr import FilterError, compile_filter
+from parallel_agg import pipeline_states, serial_states, worker_count
+from table_groupby import AGGREGATIONS, GroupBy, sorted_groups
+from table_stats import STATISTICS, ColumnSummary
+from table_store import TableCache
+
+# Chạy các thao tác của DataViewerApp (lọc -> tính toán / gom nhóm -> sắp xếp -> lưu) không cần giao diện, ví dụ:
+#   python pipeline.py data/*.csv --filter "Region = 'North'" --group-by Product --agg Sales:sum \
+#       --sort Sales_sum:desc --top 20 --output out/{stem}_top.csv
+# Mỗi file được đọc theo khối; lọc và gom nhóm chạy ngay trên từng khối nên không phải giữ cả file trong bộ nhớ.
+
+STAGES = ['load', 'filter', 'aggregate', 'sort', 'save']
+
+
+class PipelineError(ValueError):
+    pass
+
+
+def parse_aggregation(text):
+    # "Sales:sum" -> ('Sales', 'sum')
+    name, sep, how = text.rpartition(':')
+    if not sep or not name:
+        raise PipelineError(f"Aggregation '{text}' must look like COLUMN:FUNCTION, e.g. Sales:sum.")
+    return name, how.strip().lower()
+
+
+def parse_sort_key(text):
+    # "Sales" / "Sales:asc" / "Sales:desc" -> ('Sales', tăng dần)
+    name, sep, direction = text.rpartition(':')
+    if sep and direction.strip().lower() in ('asc', 'desc'):
+        return name, direction.strip().lower() == 'asc'
+    return text, True
+
+
+class Pipeline:
+    # Các bước dùng chung engine với giao diện (filter_expr, GroupBy, ColumnSummary, sắp xếp theo hạng / top_k).
+    # Thứ tự cố định: lọc -> gom nhóm / tính toán -> lọc kết quả (having) -> chọn cột -> sắp xếp -> N dòng đầu.
+    # Lọc và tính toán chạy chung một lượt đọc; trình đọc chỉ dựng các cột cần tới (khi có chọn cột / tính toán).
+    # start() / feed() / finish() tách riêng để nhiều file có thể dồn vào cùng một kết quả (--combine).
+    def __init__(self, filters=(), columns=None, group_by=None, aggregations=(), sort_keys=(), top=None,
+                 having=(), chunk_rows=100000, cache=None):
+        self.filter = compile_filter(" AND ".join(f"({text})" for text in filters)) if filters else None
+        self.having = compile_filter(" AND ".join(f"({text})" for text in having)) if having else None
+        self.columns = list(columns) if columns else None
+        self.group_by = group_by
+        self.aggregations = list(aggregations)
+        self.sort_keys = list(sort_keys)
+        self.top = top
+        self.chunk_rows = chunk_rows
+        self.cache = cache  # TableCache (tùy chọn): file đã mở trong giao diện được đọc từ cache dạng cột
+        self.timings = dict.fromkeys(STAGES, 0.0)
+
+        valid = AGGREGATIONS if group_by else STATISTICS
+        for name, how in self.aggregations:
+            if how not in valid:
+                raise PipelineError(f"Unknown aggregation '{how}' for '{name}'. Use one of: {', '.join(valid)}.")
+        if self.having is not None and not self.aggregations:
+            raise PipelineError("A filter on aggregated results needs an aggregation.")
+        if group_by and not self.aggregations:
+            raise PipelineError("--group-by needs at least one --agg.")
+        if top is not None and top <= 0:
+            raise PipelineError("--top must be a positive number.")
+
+    def needed(self):
+        # Các cột mà lọc / tính toán đọc tới
+        names = self.filter.columns() if self.filter is not None else set()
+        names.update(name for name, _ in self.aggregations)
+        if self.group_by:
+            names.add(self.group_by)
+        if self.columns and not self.aggregations:
+            names.update(self.columns)
+        return names
+
+    def scan_columns(self):
+        # None = đọc mọi cột (kết quả là chính các dòng của file)
+        if not self.aggregations and not self.columns:
+            return None
+        return self.needed()
+
+    def start(self):
+        return {'rows': 0, 'parts': [], 'seen': set(), 'groups': {}, 'summaries': {}}
+
+    def merge(self, state, other):
+        # Gộp kết quả từng phần của hai trạng thái (vd. từng file khi --combine)
+        state['rows'] += other['rows']
+        state['parts'].extend(other['parts'])
+        state['seen'].update(other['seen'])
+        for name, groups in other['groups'].items():
+            if name in state['groups']:
+                state['groups'][name].merge(groups)
+            else:
+                state['groups'][name] = groups
+        for name, summary in other['summaries'].items():
+            if name in state['summaries']:
+                state['summaries'][name].merge(summary)
+            else:
+                state['summaries'][name] = summary
+        return state
+
+    def feed(self, state, path, cancel_event=None):
+        self.feed_chunks(state, iter_table_chunks(path, self.chunk_rows, self.scan_columns(), self.cache), path,
+                         cancel_event)
+
+    def feed_chunks(self, state, chunks, path, cancel_event=None):
+        # chunks: các khối DataTable của file `path` (cả file, hoặc một đoạn byte khi đọc song song)
+        # cancel_event: threading.Event của giao diện, kiểm tra trước mỗi khối
+        needed = self.needed()
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise LoadCancelled()
+            started = time.perf_counter()
+            chunk = next(chunks, None)
+            self._add('load', started)
+            if chunk is None:
+                break
+            state['rows'] += len(chunk)
+            state['seen'].update(chunk.columns)
+            missing = needed.difference(chunk.columns)
+            if missing:
+                if input_kind(path) != 'json':
+                    raise PipelineError(f"Column(s) not found in {path}: {', '.join(sorted(missing))}.")
+                for name in missing:  # bản ghi JSON có thể thiếu khóa trong cả một khối
+                    chunk.add_column(name, np.full(len(chunk), np.nan))
+
+            started = time.perf_counter()
+            keep = None if self.filter is None else self.filter.mask(chunk)
+            if not self.aggregations:
+                if keep is not None:
+                    chunk = chunk.take(np.flatnonzero(keep))
+                if self.columns:
+                    chunk = DataTable({name: chunk.column(name) for name in self.columns})
+                state['parts'].append(chunk)
+            self._add('filter', started)
+
+            if self.aggregations:
+                started = time.perf_counter()
+                self._update(state, chunk, keep)
+                self._add('aggregate', started)
+
+    def finish(self, state):
+        missing = self.needed().difference(state['seen'])
+        if missing and state['rows']:
+            raise PipelineError(f"Column(s) not found: {', '.join(sorted(missing))}.")
+
+        started = time.perf_counter()
+        if self.aggregations:
+            table = self._result(state)
+            if self.having is not None:
+                table = table.take(np.flatnonzero(self.having.mask(table)))
+            if self.columns:
+                missing = [name for name in self.columns if name not in table]
+                if missing:
+                    raise PipelineError(f"Column(s) not in the aggregated result: {', '.join(missing)}.")
+                table = DataTable({name: table.column(name) for name in self.columns})
+        else:
+            table = concat_tables(state['parts'])
+        self._add('aggregate', started)
+
+        started = time.perf_counter()
+        table = self._sort(table)
+        self._add('sort', started)
+        return table
+
+    def run(self, path):
+        state = self.start()
+        self.feed(state, path)
+        return state['rows'], self.finish(state)
+
+    def save(self, table, path):
+        started = time.perf_counter()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        save_table(table, path)
+        self._add('save', started)
+
+    def explain(self):
+        # Mô tả kế hoạch thực thi (sau khi tối ưu), mỗi dòng một bước
+        scan = self.scan_columns()
+        lines = ["scan: " + ("all columns" if scan is None else "columns " + ", ".join(sorted(scan)))
+                 + (", cached columns when available" if self.cache is not None else "")]
+        if self.filter is not None:
+            lines.append("  filter (same pass as the scan): " + ", ".join(sorted(self.filter.columns())))
+        if self.aggregations:
+            aggs = ", ".join(f"{name}:{how}" for name, how in self.aggregations)
+            lines.append(f"  aggregate (same pass, mergeable partials): {aggs}"
+                         + (f" by {self.group_by}" if self.group_by else ""))
+        if self.having is not None:
+            lines.append("  filter aggregated rows: " + ", ".join(sorted(self.having.columns())))
+        if self.columns:
+            lines.append("  select: " + ", ".join(self.columns))
+        keys = ", ".join(f"{name}{'' if ascending else ' desc'}" for name, ascending in self.sort_keys)
+        if self.sort_keys and self.top is not None and len(self.sort_keys) == 1:
+            lines.append(f"  top {self.top} by {keys} (partial selection, no full sort)")
+        elif self.sort_keys:
+            lines.append(f"  sort by {keys}" + (f", keep {self.top}" if self.top is not None else ""))
+        elif self.top is not None:
+            lines.append(f"  keep the first {self.top} rows")
+        return "\n".join(lines)
+
+    def _update(self, state, chunk, keep):
+        names = list(dict.fromkeys(name for name, _ in self.aggregations))
+        if self.group_by:
+            # Nhãn nhóm theo chuỗi hiển thị để các khối có kiểu khác nhau (5 / "5") vẫn vào cùng nhóm
+            keys = chunk.formatted(self.group_by)
+            valid = ~chunk.missing(self.group_by)
+            if keep is not None:
+                valid &= keep
+            for name in names:
+                groups = state['groups'].get(name)
+                if groups is None:
+                    median = (name, 'median') in self.aggregations
+                    groups = state['groups'][name] = GroupBy(keep_values=median)
+                groups.update(keys, chunk.numeric(name), valid)
+            return
+        for name in names:
+            values = chunk.column(name) if keep is None else chunk.column(name)[keep]
+            state['summaries'].setdefault(name, ColumnSummary()).update(values)
+
+    def _result(self, state):
+        if not self.group_by:
+            results = {name: summary.result() for name, summary in state['summaries'].items()}
+            return DataTable({f"{name}_{how}": [results[name][how] if name in results else np.nan]
+                              for name, how in self.aggregations})
+
+        columns = []
+        labels = {}
+        for name, how in self.aggregations:
+            groups = state['groups'].get(name)
+            keys, values = groups.result(how) if groups is not None else ([], np.empty(0))
+            columns.append((f"{name}_{how}", dict(zip(keys, values.tolist()))))
+            labels.update(dict.fromkeys(keys))
+        labels, _ = sorted_groups(list(labels), np.arange(len(labels)))
+        table = {self.group_by: make_column(list(labels))}
+        for out_name, values in columns:
+            table[out_name] = np.array([values.get(label, np.nan) for label in labels], dtype=np.float64)
+        return DataTable(table)
+
+    def _sort(self, table):
+        if not self.sort_keys and self.top is None:
+            return table
+        missing = [name for name, _ in self.sort_keys if name not in table]
+        if missing:
+            raise PipelineError(f"Cannot sort by missing column(s): {', '.join(missing)}.")
+        if not self.sort_keys:
+            rows = np.arange(min(self.top, len(table)))
+        elif self.top is not None and len(self.sort_keys) == 1:
+            name, ascending = self.sort_keys[0]
+            rows = table.top_k(name, self.top, largest=not ascending)
+        else:
+            rows = table.order_by(self.sort_keys)[:self.top]
+        return table.take(rows)
+
+    def _add(self, stage, started):
+        self.timings[stage] += time.perf_counter() - started
+
+
+def output_path(template, path):
+    name = os.path.basename(path)
+    return template.format(stem=os.path.splitext(name)[0], name=name, dir=os.path.dirname(path) or '.')
+
+
+def format_timings(timings):
+    return "  ".join(f"{stage} {timings[stage]:.3f}s" for stage in STAGES)
+
+
+def print_table(table, limit):
+    writer = csv.writer(sys.stdout)
+    writer.writerow(table.columns)
+    writer.writerows(table.rows(0, limit))
+    if len(table) > limit:
+        print(f"... {len(table) - limit:,} more rows")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run load -> filter -> aggregate -> sort -> save over files "
+                                                 "without the GUI.")
+    parser.add_argument('inputs', nargs='+', help="CSV / JSON files, directories or glob patterns")
+    parser.add_argument('--filter', action='append', default=[],
+                        help="filter expression, e.g. \"Sales > 100 AND Region = 'North'\" (repeat to AND)")
+    parser.add_argument('--columns', help="comma-separated output columns (only these are read from the file)")
+    parser.add_argument('--group-by', help="column to group by")
+    parser.add_argument('--agg', action='append', default=[], metavar='COLUMN:FUNCTION',
+                        help=f"aggregation, e.g. Sales:sum. With --group-by: {', '.join(AGGREGATIONS)}; "
+                             f"without: {', '.join(STATISTICS)}")
+    parser.add_argument('--having', action='append', default=[],
+                        help="filter on the aggregated rows, e.g. \"Sales_sum > 1000\"")
+    parser.add_argument('--sort', action='append', default=[], metavar='COLUMN[:desc]',
+                        help="sort key (repeat for several keys, the first is the primary one)")
+    parser.add_argument('--top', type=int, help="keep only the first N rows (with --sort: the N largest/smallest)")
+    parser.add_argument('--output', help="output file (.csv / .json); may use {stem}, {name} and {dir}")
+    parser.add_argument('--combine', action='store_true', help="process all inputs as one table")
+    parser.add_argument('--chunk-rows', type=int, default=100000)
+    parser.add_argument('--head', type=int, default=10, help="rows to print when there is no --output")
+    parser.add_argument('--use-cache', action='store_true',
+                        help="read files already opened in the viewer from its column cache")
+    parser.add_argument('--explain', action='store_true', help="print the execution plan and exit")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes (0 = one per CPU core); files and large CSV byte ranges are "
+                             "processed in parallel and their partial results merged")
+    args = parser.parse_args(argv)
+
+    try:
+        pipeline = Pipeline(filters=args.filter,
+                            columns=[name.strip() for name in args.columns.split(',')] if args.columns else None,
+                            group_by=args.group_by, aggregations=[parse_aggregation(text) for text in args.agg],
+                            sort_keys=[parse_sort_key(text) for text in args.sort], top=args.top,
+                            having=args.having, chunk_rows=args.chunk_rows,
+                            cache=TableCache() if args.use_cache else None)
+    except (PipelineError, FilterError) as e:
+        parser.error(str(e))
+    if args.explain:
+        print(pipeline.explain())
+        return 0
+
+    paths = expand_inputs(args.inputs)
+    if args.output and len(paths) > 1 and not args.combine and '{' not in args.output:
+        parser.error("--output needs {stem} or {name} when several files are processed separately.")
+
+    failed = []
+    started = time.perf_counter()
+    workers = worker_count(args.workers)
+    # Mỗi file tính riêng thành một trạng thái (file lỗi giữa chừng không để lại kết quả dở dang)
+    states = pipeline_states(pipeline, paths, workers) if workers > 1 else serial_states(pipeline, paths)
+    if args.combine:
+        state = pipeline.start()
+        for path, part in states:
+            if isinstance(part, Exception):
+                failed.append(path)
+                print(f"{path}: FAILED: {part}", file=sys.stderr)
+                continue
+            pipeline.merge(state, part)
+        try:
+            table = pipeline.finish(state)
+            if args.output:
+                pipeline.save(table, args.output)
+            print(f"{len(paths) - len(failed)} file(s): {state['rows']:,} rows -> {len(table):,} rows  "
+                  f"{format_timings(pipeline.timings)}")
+            if not args.output:
+                print_table(table, args.head)
+        except Exception as e:
+            failed.append('combined result')
+            print(f"FAILED: {e}", file=sys.stderr)
+    else:
+        before = dict(pipeline.timings)
+        for path, state in states:
+            try:
+                if isinstance(state, Exception):
+                    raise state
+                rows, table = state['rows'], pipeline.finish(state)
+                if args.output:
+                    pipeline.save(table, output_path(args.output, path))
+            except Exception as e:
+                failed.append(path)
+                print(f"{path}: FAILED: {e}", file=sys.stderr)
+                continue
+            spent = {stage: pipeline.timings[stage] - before[stage] for stage in STAGES}
+            before = dict(pipeline.timings)
+            print(f"{path}: {rows:,} rows -> {len(table):,} rows  {format_timings(spent)}")
+            if not args.output:
+                print_table(table, args.head)
+
+    print(f"Total: {len(paths)} file(s), {len(failed)} failed, {time.perf_counter() - started:.3f}s  "
+          f"{format_timings(pipeline.timings)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
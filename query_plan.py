@@ -0,0 +1,165 @@
+import queue
+import threading
+
+from data_io import LoadCancelled, SaveCancelled, save_table
+from filter_expr import compile_filter
+from parallel_agg import pipeline_states, serial_states, worker_count
+from pipeline import Pipeline, PipelineError, expand_inputs, parse_sort_key
+
+# Truy vấn "lười": mỗi thao tác chỉ thêm một bước vào kế hoạch, không đọc dữ liệu.
+#   query = Query('sales/*.csv').filter("Region = 'North'").aggregate('Product', ('Sales', 'sum')) \
+#                .sort('Sales_sum:desc').limit(20)
+#   print(query.explain()); table = query.collect()
+# Trước khi chạy, kế hoạch được tối ưu thành một Pipeline:
+#   - các bộ lọc trước bước gom nhóm được gộp làm một và chạy ngay trong lượt đọc file (predicate pushdown),
+#   - trình đọc chỉ dựng các cột mà các bước sau cần tới (projection pushdown; cache dạng cột chỉ đọc các cột đó),
+#   - lọc + gom nhóm chung một lượt, sắp xếp + giới hạn thành chọn top-k, sắp xếp trước gom nhóm bị bỏ (thừa).
+# Giao diện dùng QueryLoader cho "Open with Filter / Columns" và "Export Filtered File": bộ lọc và danh sách cột
+# được đưa xuống trình đọc thay vì nạp cả file rồi mới lọc.
+
+
+class PlanError(PipelineError):
+    pass
+
+
+class Query:
+    def __init__(self, inputs, steps=(), chunk_rows=100000, cache=None):
+        self.inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+        self.steps = list(steps)
+        self.chunk_rows = chunk_rows
+        self.cache = cache
+
+    def _then(self, *step):
+        return Query(self.inputs, self.steps + [step], self.chunk_rows, self.cache)
+
+    def filter(self, text):
+        compile_filter(text)  # báo lỗi cú pháp ngay khi dựng truy vấn
+        return self._then('filter', text)
+
+    def select(self, *columns):
+        return self._then('select', list(columns))
+
+    def aggregate(self, group_by=None, *aggregations):
+        # aggregations: ('Sales', 'sum'), ... (gom theo group_by, hoặc cả bảng nếu group_by=None)
+        return self._then('aggregate', group_by, [tuple(agg) for agg in aggregations])
+
+    def sort(self, *keys):
+        # keys: "Sales", "Sales:desc" hoặc ('Sales', False); khóa đầu là khóa chính
+        return self._then('sort', [parse_sort_key(key) if isinstance(key, str) else tuple(key) for key in keys])
+
+    def limit(self, count):
+        return self._then('limit', count)
+
+    def optimize(self):
+        # Chuẩn hóa các bước về thứ tự lọc -> gom nhóm -> lọc kết quả -> chọn cột -> sắp xếp -> giới hạn,
+        # chỉ đổi chỗ khi kết quả không đổi; trường hợp không đổi chỗ được thì báo PlanError.
+        where, having = [], []
+        scan_select = select = None
+        group_by, aggregations = None, []
+        aggregated = False
+        outputs = None  # các cột của kết quả gom nhóm
+        sort_keys, top = [], None
+
+        def check(used, step):
+            # Cột mà bước này dùng phải còn ở bước đó; trước khi gom nhóm và chưa chọn cột thì chưa biết
+            # (mọi cột của file), sau khi gom nhóm thì chỉ còn các cột kết quả
+            selected = select if aggregated else scan_select
+            visible = selected if selected is not None else outputs
+            missing = set(used) - set(visible) if visible is not None else set()
+            if missing:
+                source = "select()" if selected is not None else "aggregate()"
+                raise PlanError(f"{step} uses column(s) not available after {source}: {', '.join(sorted(missing))}. "
+                                f"Available: {', '.join(visible)}.")
+
+        for kind, *args in self.steps:
+            if kind == 'filter':
+                text = args[0]
+                if top is not None:
+                    raise PlanError("A filter after limit() changes which rows are kept; filter first.")
+                check(compile_filter(text).columns(), "Filter")
+                # Lọc giữ nguyên thứ tự tương đối của các dòng nên đổi chỗ với sort() được
+                (having if aggregated else where).append(text)
+            elif kind == 'select':
+                columns = args[0]
+                check(columns, "select()")
+                if aggregated:
+                    select = columns
+                else:
+                    scan_select = columns
+            elif kind == 'aggregate':
+                if aggregated:
+                    raise PlanError("Only one aggregate() per query.")
+                if top is not None:
+                    raise PlanError("limit() before aggregate() is not supported.")
+                group_by, aggregations = args
+                check({name for name, _ in aggregations} | ({group_by} if group_by else set()), "aggregate()")
+                sort_keys = []  # sắp xếp trước khi gom nhóm không ảnh hưởng kết quả: bỏ lượt thừa
+                aggregated = True
+                outputs = ([group_by] if group_by else []) + [f"{name}_{how}" for name, how in aggregations]
+            elif kind == 'sort':
+                if top is not None:
+                    raise PlanError("sort() after limit() is not supported; sort first.")
+                keys = args[0]
+                check([name for name, _ in keys], "sort()")
+                # Sắp ổn định nhiều lần liên tiếp = một lần sắp theo khóa mới rồi tới các khóa cũ
+                sort_keys = keys + [key for key in sort_keys if key[0] not in {name for name, _ in keys}]
+            elif kind == 'limit':
+                top = args[0] if top is None else min(top, args[0])
+        check([name for name, _ in sort_keys], "sort()")  # sắp xếp chạy sau bước chọn cột cuối cùng
+
+        return Pipeline(filters=where, columns=select if aggregated else scan_select, group_by=group_by,
+                        aggregations=aggregations, sort_keys=sort_keys, top=top, having=having,
+                        chunk_rows=self.chunk_rows, cache=self.cache)
+
+    def explain(self):
+        return self.optimize().explain()
+
+    def collect(self, workers=1, cancel_event=None):
+        # Chạy kế hoạch trên mọi file đầu vào; mỗi file cho một kết quả từng phần rồi được gộp lại (như --combine).
+        # workers > 1: các file / đoạn byte của file lớn được tính trên nhiều tiến trình (0 = mỗi lõi CPU một tiến trình)
+        # cancel_event: dừng (LoadCancelled) trước khối tiếp theo, hoặc trước file tiếp theo khi chạy song song
+        pipeline = self.optimize()
+        paths = expand_inputs(self.inputs)
+        workers = worker_count(workers)
+        state = pipeline.start()
+        if workers > 1:
+            states = pipeline_states(pipeline, paths, workers)
+        else:
+            states = serial_states(pipeline, paths, cancel_event)
+        for _, part in states:
+            if isinstance(part, Exception):
+                raise part
+            if cancel_event is not None and cancel_event.is_set():
+                raise LoadCancelled()
+            pipeline.merge(state, part)
+        return pipeline.finish(state)
+
+
+class QueryLoader(threading.Thread):
+    # Chạy một Query trong luồng nền cho giao diện, giao tiếp như FileLoader / FileSaver qua self.messages:
+    #   ('done', table) / ('error', exception) / ('cancelled',)
+    # output: ghi kết quả ra file này thay vì đưa lên lưới (bảng kết quả vẫn được gửi kèm 'done')
+    def __init__(self, query, output=None, workers=1):
+        super().__init__(daemon=True)
+        self.query = query
+        self.output = output
+        self.path = output if output else ", ".join(query.inputs)
+        self.workers = workers
+        self.cached = False
+        self.malformed = []
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            table = self.query.collect(self.workers, self.cancel_event)
+            if self.output:
+                save_table(table, self.output, cancel_event=self.cancel_event)
+            self.messages.put(('done', table))
+        except (LoadCancelled, SaveCancelled):
+            self.messages.put(('cancelled',))
+        except Exception as e:
+            self.messages.put(('error', e))
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+AGGREGATIONS = ['sum', 'mean', 'count', 'min', 'max', 'median']
+
+
+class GroupBy:
+    # Gom nhóm dùng chung cho các biểu đồ. Mỗi nhóm chỉ giữ bộ tích lũy count / sum / min / max
+    # nên bộ nhớ theo số nhóm chứ không theo số dòng; mỗi khối được gom bằng numpy (bincount, ufunc.at).
+    # Hai GroupBy có thể gộp (merge) nên đọc theo khối hay tính song song đều dùng được.
+    # Riêng median cần toàn bộ giá trị nên chỉ giữ lại khi keep_values=True.
+    def __init__(self, keep_values=False):
+        self.labels = []
+        self._slot_of = {}
+        self.count = np.zeros(0, dtype=np.int64)
+        self.total = np.zeros(0)
+        self.low = np.zeros(0)
+        self.high = np.zeros(0)
+        self.values = [] if keep_values else None
+
+    def update(self, keys, values, valid=None):
+        # keys: mảng nhãn nhóm (có kiểu), values: float64 (NaN bị bỏ qua), valid: mặt nạ dòng được dùng (tùy chọn)
+        codes, uniques = pd.factorize(keys)
+        mask = (codes >= 0) & ~np.isnan(values)
+        if valid is not None:
+            mask &= valid
+        codes, values = codes[mask], values[mask]
+
+        n = len(uniques)
+        low = np.full(n, np.inf)
+        high = np.full(n, -np.inf)
+        np.minimum.at(low, codes, values)
+        np.maximum.at(high, codes, values)
+        slots = self._slots(uniques.tolist())
+        self._combine(slots, np.bincount(codes, minlength=n), np.bincount(codes, weights=values, minlength=n),
+                      low, high)
+        if self.values is not None:
+            self.values.append((slots[codes], values))
+        return self
+
+    def merge(self, other):
+        slots = self._slots(other.labels)
+        self._combine(slots, other.count, other.total, other.low, other.high)
+        if self.values is not None and other.values is not None:
+            self.values.extend((slots[part_slots], values) for part_slots, values in other.values)
+        return self
+
+    def result(self, how='sum'):
+        # Trả về (danh sách nhãn, mảng kết quả) cho các nhóm có ít nhất một giá trị
+        present = self.count > 0
+        labels = [label for label, keep in zip(self.labels, present) if keep]
+        if how == 'sum':
+            out = self.total
+        elif how == 'mean':
+            out = self.total / np.maximum(self.count, 1)
+        elif how == 'count':
+            out = self.count
+        elif how == 'min':
+            out = self.low
+        elif how == 'max':
+            out = self.high
+        elif how == 'median':
+            out = self._median()
+        else:
+            raise ValueError(f"Unknown aggregation '{how}'.")
+        return labels, out[present]
+
+    def _slots(self, labels):
+        # Vị trí toàn cục của từng nhãn (vòng lặp theo số nhóm, không theo số dòng)
+        slots = np.empty(len(labels), dtype=np.int64)
+        for i, label in enumerate(labels):
+            slot = self._slot_of.get(label)
+            if slot is None:
+                slot = self._slot_of[label] = len(self.labels)
+                self.labels.append(label)
+            slots[i] = slot
+        grow = len(self.labels) - len(self.count)
+        if grow:
+            self.count = np.concatenate((self.count, np.zeros(grow, dtype=np.int64)))
+            self.total = np.concatenate((self.total, np.zeros(grow)))
+            self.low = np.concatenate((self.low, np.full(grow, np.inf)))
+            self.high = np.concatenate((self.high, np.full(grow, -np.inf)))
+        return slots
+
+    def _combine(self, slots, count, total, low, high):
+        self.count[slots] += count
+        self.total[slots] += total
+        self.low[slots] = np.minimum(self.low[slots], low)
+        self.high[slots] = np.maximum(self.high[slots], high)
+
+    def _median(self):
+        if self.values is None:
+            raise ValueError("Median needs GroupBy(keep_values=True).")
+        out = np.full(len(self.labels), np.nan)
+        if self.values:
+            slots = np.concatenate([part_slots for part_slots, _ in self.values])
+            values = np.concatenate([values for _, values in self.values])
+            medians = pd.Series(values).groupby(slots).median()
+            out[medians.index.to_numpy()] = medians.to_numpy()
+        return out
+
+
+def group_by(keys, values, how='sum', valid=None):
+    return GroupBy(keep_values=how == 'median').update(keys, values, valid).result(how)
+
+
+def sorted_groups(labels, values):
+    # Nhãn số sắp theo giá trị số, còn lại theo thứ tự chữ (như trục X của biểu đồ cột)
+    try:
+        keys = [float(label) for label in labels]
+    except (TypeError, ValueError):
+        keys = [str(label) for label in labels]
+    order = sorted(range(len(labels)), key=keys.__getitem__)
+    return [labels[i] for i in order], values[order]
@@ -0,0 +1,90 @@
+from collections import deque
+
+
+def array_bytes(values):
+    # Ước lượng bộ nhớ của một cột; cột object tính thêm kích thước trung bình của phần tử
+    if values is None:
+        return 0
+    size = values.nbytes
+    if values.dtype == object and len(values):
+        sample = values[:: max(len(values) // 50, 1)]
+        size += int(len(values) * sum(len(str(v)) + 49 for v in sample) / len(sample))
+    return size
+
+
+class TableHistory:
+    # Lịch sử undo/redo lưu theo từng thao tác (delta), không chụp lại toàn bộ bảng.
+    # Cột chỉ được thay thế chứ không sửa tại chỗ, nên delta giữ tham chiếu tới mảng cũ (copy-on-write).
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.undo_stack = deque()
+        self.redo_stack = deque()
+        self.size_bytes = 0
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size_bytes = 0
+
+    def add_column(self, table, name, values, index=None):
+        before = table.column(name) if name in table else None
+        old_index = table.columns.index(name) if name in table else None
+        table.add_column(name, values, index)
+        self._push({'op': 'set_column', 'label': f"add column '{name}'", 'name': name,
+                    'index': old_index if old_index is not None else table.columns.index(name),
+                    'before': before, 'after': table.column(name)})
+
+    def drop_column(self, table, name):
+        index, values = table.drop_column(name)
+        self._push({'op': 'set_column', 'label': f"remove column '{name}'", 'name': name,
+                    'index': index, 'before': values, 'after': None})
+
+    def rename_column(self, table, old, new):
+        table.rename_column(old, new)
+        self._push({'op': 'rename', 'label': f"rename '{old}' to '{new}'", 'old': old, 'new': new})
+
+    def set_view(self, view, before, after, label="filter"):
+        # Trạng thái hiển thị (các bộ lọc) cũng được undo / redo như thao tác trên bảng, không lưu dữ liệu dòng nào
+        view.restore(after)
+        self._push({'op': 'view', 'label': label, 'view': view, 'old_state': before, 'new_state': after})
+
+    def undo(self, table):
+        if not self.undo_stack:
+            return None
+        delta = self.undo_stack.pop()
+        self._apply(table, delta, reverse=True)
+        self.redo_stack.append(delta)
+        return delta
+
+    def redo(self, table):
+        if not self.redo_stack:
+            return None
+        delta = self.redo_stack.pop()
+        self._apply(table, delta, reverse=False)
+        self.undo_stack.append(delta)
+        return delta
+
+    def _push(self, delta):
+        delta['bytes'] = array_bytes(delta.get('before')) + array_bytes(delta.get('after'))
+        for old in self.redo_stack:
+            self.size_bytes -= old['bytes']
+        self.redo_stack.clear()
+        self.undo_stack.append(delta)
+        self.size_bytes += delta['bytes']
+        # Vượt giới hạn bộ nhớ thì bỏ các bước cũ nhất (luôn giữ lại bước mới nhất)
+        while self.size_bytes > self.max_bytes and len(self.undo_stack) > 1:
+            self.size_bytes -= self.undo_stack.popleft()['bytes']
+
+    def _apply(self, table, delta, reverse):
+        op = delta['op']
+        if op == 'set_column':
+            values = delta['before'] if reverse else delta['after']
+            if values is None:
+                table.drop_column(delta['name'])
+            else:
+                table.add_column(delta['name'], values, delta['index'])
+        elif op == 'rename':
+            old, new = (delta['new'], delta['old']) if reverse else (delta['old'], delta['new'])
+            table.rename_column(old, new)
+        elif op == 'view':
+            delta['view'].restore(delta['old_state'] if reverse else delta['new_state'])
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+
+def sorted_rows(rows, num_rows):
+    # Trả các dòng theo thứ tự tăng dần; kết quả lớn dùng mặt nạ (O(n)) thay vì sắp xếp
+    if len(rows) * 16 < num_rows:
+        return np.sort(rows)
+    mask = np.zeros(num_rows, dtype=bool)
+    mask[rows] = True
+    return np.flatnonzero(mask)
+
+
+def group_order(codes):
+    # argsort ổn định cho mã nhóm 0..n: sắp theo cơ số 16 bit (radix sort của numpy) thay vì timsort
+    if len(codes) == 0 or codes.max() < 1 << 16:
+        return np.argsort(codes.astype(np.uint16), kind='stable')
+    order = np.argsort((codes & 0xFFFF).astype(np.uint16), kind='stable')
+    return order[np.argsort((codes[order] >> 16).astype(np.uint16), kind='stable')]
+
+
+class HashIndex:
+    # Chỉ mục băm theo chuỗi hiển thị: giá trị -> các dòng chứa giá trị đó.
+    # Các dòng được gom theo giá trị (dạng CSR) nên mỗi lần tra chỉ là một lát cắt mảng.
+    def __init__(self, keys):
+        codes, uniques = pd.factorize(keys)
+        self.num_rows = len(keys)
+        self.uniques = pd.Index(uniques)
+        self.rows = group_order(codes)
+        self.starts = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(uniques)))))
+
+    def lookup(self, value):
+        return self.lookup_many([value])
+
+    def lookup_many(self, values):
+        codes = self.uniques.get_indexer(pd.Index(list(values), dtype=object))
+        codes = np.unique(codes[codes >= 0])
+        parts = [self.rows[self.starts[c]:self.starts[c + 1]] for c in codes]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+        return sorted_rows(np.concatenate(parts), self.num_rows)
+
+    def counts(self):
+        return dict(zip(self.uniques, np.diff(self.starts).tolist()))
+
+
+class SortedIndex:
+    # Chỉ mục sắp xếp cho truy vấn khoảng (a <= x < b) và tiền tố (chuỗi bắt đầu bằng ...).
+    # Cột số: các giá trị được sắp thẳng. Cột chuỗi: chỉ các giá trị khác nhau được so sánh trong Python,
+    # các dòng được gom theo thứ hạng của giá trị.
+    def __init__(self, keys):
+        self.num_rows = len(keys)
+        if keys.dtype.kind in 'iuf':
+            order = np.argsort(keys)  # thứ tự giữa các giá trị bằng nhau không quan trọng: kết quả được sắp lại theo dòng
+            if keys.dtype.kind == 'f':
+                order = order[:len(order) - int(np.isnan(keys).sum())]  # NaN nằm cuối
+            self.keys = keys[order]
+            self.rows = order
+            self.starts = None
+            return
+
+        valid = np.flatnonzero(keys != "")  # chuỗi rỗng = ô trống, không thuộc khoảng nào
+        codes, uniques = pd.factorize(keys[valid])
+        ranked = np.argsort(uniques, kind='stable')
+        rank = np.empty(len(uniques), dtype=np.int64)
+        rank[ranked] = np.arange(len(uniques))
+
+        self.keys = uniques[ranked]  # các giá trị khác nhau theo thứ tự tăng dần
+        ranks = rank[codes]
+        self.rows = valid[group_order(ranks)]
+        self.starts = np.concatenate(([0], np.cumsum(np.bincount(ranks, minlength=len(uniques)))))
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        first = 0 if low is None else np.searchsorted(self.keys, low, 'left' if include_low else 'right')
+        last = len(self.keys) if high is None else np.searchsorted(self.keys, high,
+                                                                   'right' if include_high else 'left')
+        if first >= last:
+            return np.empty(0, dtype=np.int64)
+        if self.starts is not None:
+            first, last = self.starts[first], self.starts[last]
+        return sorted_rows(self.rows[first:last], self.num_rows)
+
+    def prefix(self, text):
+        return self.range(text, text + '\U0010ffff', include_high=False)
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from data_table import format_number, missing_mask, numeric_values
+
+STATISTICS = ['count', 'nulls', 'numeric', 'sum', 'mean', 'min', 'max', 'variance', 'std', 'distinct']
+
+
+class ColumnSummary:
+    # Tích lũy mọi thống kê của một cột trong một lượt quét. Có thể cập nhật theo từng khối
+    # và gộp (merge) hai bản tóm tắt, nên dùng chung cho bảng trong RAM, file đọc theo khối
+    # và tính song song. Phương sai gộp theo công thức Chan; số giá trị khác nhau ước lượng
+    # bằng phác thảo KMV (giữ K giá trị băm nhỏ nhất).
+    K = 1024
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.numeric = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.low = np.inf
+        self.high = -np.inf
+        self.sketch = np.empty(0, dtype=np.uint64)
+
+    def update(self, values, numbers=None, missing=None):
+        # numbers / missing: mảng số và mặt nạ rỗng đã có sẵn (nếu có) để không phải tính lại
+        missing = missing_mask(values) if missing is None else missing
+        present = values[~missing] if missing.any() else values
+        self.nulls += int(missing.sum())
+        self.count += len(present)
+        self._add_hashes(self._hash(present))
+
+        numbers = numeric_values(values) if numbers is None else numbers
+        numbers = numbers[~np.isnan(numbers)]
+        if len(numbers):
+            mean = numbers.mean()
+            self._add_moments(len(numbers), numbers.sum(), mean, ((numbers - mean) ** 2).sum(),
+                              numbers.min(), numbers.max())
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.nulls += other.nulls
+        self._add_hashes(other.sketch)
+        if other.numeric:
+            self._add_moments(other.numeric, other.total, other.mean, other.m2, other.low, other.high)
+        return self
+
+    def distinct(self):
+        if len(self.sketch) < self.K:
+            return len(self.sketch)  # ít hơn K giá trị khác nhau: phác thảo chứa tất cả, kết quả chính xác
+        return int(round((self.K - 1) / (float(self.sketch[-1]) / 2.0 ** 64)))
+
+    def result(self):
+        has_numbers = self.numeric > 0
+        return {
+            'count': self.count,
+            'nulls': self.nulls,
+            'numeric': self.numeric,
+            'sum': self.total if has_numbers else np.nan,
+            'mean': self.mean if has_numbers else np.nan,
+            'min': self.low if has_numbers else np.nan,
+            'max': self.high if has_numbers else np.nan,
+            'variance': self.m2 / (self.numeric - 1) if self.numeric > 1 else np.nan,
+            'std': np.sqrt(self.m2 / (self.numeric - 1)) if self.numeric > 1 else np.nan,
+            'distinct': self.distinct(),
+        }
+
+    def _add_moments(self, count, total, mean, m2, low, high):
+        n = self.numeric + count
+        delta = mean - self.mean
+        self.mean += delta * count / n
+        self.m2 += m2 + delta * delta * self.numeric * count / n
+        self.numeric = n
+        self.total += total
+        self.low = min(self.low, low)
+        self.high = max(self.high, high)
+
+    def _add_hashes(self, hashes):
+        if not len(hashes):
+            return
+        if len(self.sketch) == self.K:
+            hashes = hashes[hashes < self.sketch[-1]]  # chỉ giá trị nhỏ hơn phần tử lớn nhất mới có thể vào phác thảo
+        hashes = pd.unique(hashes)
+        if len(hashes) > self.K:
+            hashes = np.partition(hashes, self.K - 1)[:self.K]
+        self.sketch = np.unique(np.concatenate((self.sketch, hashes)))[:self.K]
+
+    def _hash(self, values):
+        # Băm không phụ thuộc kiểu của từng khối (khối có ô trống thành float64, khối có chữ thành object...):
+        # số băm dạng float64 (-0.0 và 0.0 cùng một giá trị), giá trị khác băm dạng chuỗi
+        if values.dtype.kind in 'biuf':
+            return pd.util.hash_array(values.astype(np.float64) + 0.0)
+        try:
+            return pd.util.hash_array(values.astype(object, copy=False))
+        except TypeError:
+            texts = np.empty(len(values), dtype=object)
+            texts[:] = [str(v) for v in values]  # vd. list / dict từ JSON
+            return pd.util.hash_array(texts)
+
+
+def summarize_column(values, numbers=None, missing=None):
+    return ColumnSummary().update(values, numbers, missing).result()
+
+
+def format_summary(summary):
+    lines = []
+    for name in STATISTICS:
+        value = summary[name]
+        if isinstance(value, (int, np.integer)):
+            text = f"{value:,}"
+        elif value != value:
+            text = "-"
+        else:
+            text = str(format_number(value))
+        lines.append(f"{name:<10} {text}")
+    return "\n".join(lines)
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from data_table import DataTable
+
+MAGIC = b"DLTABLE1"
+ALIGN = 64  # các vùng dữ liệu căn lề 64 byte để np.frombuffer đọc thẳng từ mmap
+
+
+def _encode_texts(texts):
+    # Nối các chuỗi bằng ký tự \0 (tách lại bằng str.split, nhanh); nếu dữ liệu có \0 thì lưu thêm độ dài từng chuỗi
+    text = "\0".join(texts)
+    if text.count("\0") == max(len(texts) - 1, 0):
+        return [np.empty(0, dtype=np.int64), text.encode('utf-8')]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    return [lengths, "".join(texts).encode('utf-8')]
+
+
+def _decode_texts(lengths, blob, count):
+    text = blob.decode('utf-8')
+    if len(lengths) != count:
+        return text.split("\0") if count else []
+    bounds = np.concatenate(([0], np.cumsum(lengths))).tolist()
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def _encode_objects(values):
+    # Cột chuỗi ít giá trị khác nhau lưu dạng mã + danh sách giá trị (đọc lại chỉ cần một phép take),
+    # cột chuỗi khác lưu nguyên khối utf-8, cột object còn lại (list, dict, None...) lưu từng giá trị dạng JSON.
+    if not all(type(v) is str for v in values):
+        return 'json', _encode_texts([json.dumps(v, ensure_ascii=False) for v in values])
+    codes, uniques = pd.factorize(values)
+    if len(uniques) <= len(values) // 2:
+        return 'cat', [codes.astype(np.int32)] + _encode_texts(list(uniques))
+    return 'str', _encode_texts(list(values))
+
+
+def _objects(items):
+    out = np.empty(len(items), dtype=object)
+    out[:] = items
+    return out
+
+
+def write_table(table, path, rows=None, chunk_rows=1 << 20):
+    # Bố cục file: MAGIC | độ dài header (8 byte) | header JSON | các vùng dữ liệu.
+    # rows: vector id dòng cần ghi theo thứ tự (None = cả bảng). Cột số được ghi qua rows theo từng khối
+    # chunk_rows dòng, cột chuỗi được hoán vị từng cột một khi mã hóa: không tạo bản sao của cả bảng.
+    # Ghi ra file tạm rồi đổi tên để không bao giờ để lại file ghi dở.
+    columns = []
+    buffers = []
+    offset = 0
+    for name in table.columns:
+        values = table.column(name)
+        if values.dtype.kind in 'iuf':
+            kind, parts = values.dtype.str, [values]
+        else:
+            kind, parts = _encode_objects(values if rows is None else values[rows])
+        info = {'name': name, 'kind': kind}
+        if kind == 'cat':
+            info['uniques'] = int(parts[0].max(initial=-1)) + 1
+        spans = []
+        for part in parts:
+            order = rows if part is values else None  # chỉ cột số gốc mới cần đọc qua rows
+            if order is not None:
+                size = len(order) * part.itemsize
+            else:
+                size = part.nbytes if isinstance(part, np.ndarray) else len(part)
+            spans.append([offset, size])
+            buffers.append((offset, part, order))
+            offset += -(-size // ALIGN) * ALIGN
+        info['spans'] = spans
+        columns.append(info)
+
+    num_rows = table.num_rows if rows is None else len(rows)
+    header = json.dumps({'num_rows': num_rows, 'columns': columns}).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+            for start, part, order in buffers:
+                f.seek(data_start + start)
+                if order is not None:
+                    for first in range(0, len(order), chunk_rows):
+                        f.write(part[order[first:first + chunk_rows]].data)
+                else:
+                    f.write(np.ascontiguousarray(part).data if isinstance(part, np.ndarray) else part)
+            f.truncate(data_start + offset)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_table(path, names=None):
+    # Cột số được ánh xạ thẳng từ file (không sao chép, chỉ đọc); cột chuỗi được giải mã một lần.
+    # names: chỉ đọc các cột này (cột khác không được giải mã, vùng dữ liệu của chúng không bị đọc tới)
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a table file.")
+    header_len = struct.unpack('<Q', data[len(MAGIC):len(MAGIC) + 8])[0]
+    header = json.loads(data[len(MAGIC) + 8:len(MAGIC) + 8 + header_len])
+    data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+
+    rows = header['num_rows']
+    columns = {}
+    for col in header['columns']:
+        if names is not None and col['name'] not in names:
+            continue
+        spans = [(data_start + start, size) for start, size in col['spans']]
+        kind = col['kind']
+        if kind in ('str', 'json', 'cat'):
+            if kind == 'cat':
+                (codes_start, _), *spans = spans
+                codes = np.frombuffer(data, dtype=np.int32, count=rows, offset=codes_start)
+                count = col['uniques']
+            else:
+                count = rows
+            (len_start, len_size), (blob_start, blob_size) = spans
+            lengths = np.frombuffer(data, dtype=np.int64, count=len_size // 8, offset=len_start)
+            texts = _decode_texts(lengths, data[blob_start:blob_start + blob_size], count)
+            if kind == 'json':
+                texts = [json.loads(t) for t in texts]
+            values = _objects(texts)
+            columns[col['name']] = values.take(codes) if kind == 'cat' else values
+        else:
+            columns[col['name']] = np.frombuffer(data, dtype=np.dtype(kind), count=rows, offset=spans[0][0])
+    return DataTable(columns)
+
+
+class TableCache:
+    # Cache trên đĩa của các bảng đã phân tích, khóa theo đường dẫn + kích thước + mtime của file gốc.
+    # Mở lại file chưa đổi thì đọc cache thay vì phân tích lại; vượt giới hạn thì xóa mục ít dùng nhất (LRU).
+    FORMAT = 2  # tăng khi cách đọc file thay đổi để bỏ qua cache cũ
+
+    def __init__(self, directory=None, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory or os.path.join(os.path.expanduser('~'), '.cache', 'dlteamwork')
+        self.max_bytes = max_bytes
+
+    def load(self, path, columns=None, key=None):
+        entry = key or self.key(path)
+        if not os.path.exists(entry):
+            return None
+        try:
+            table = read_table(entry, columns)
+        except (OSError, ValueError, KeyError):
+            self._remove(entry)  # file cache hỏng: bỏ đi và đọc lại từ file gốc
+            return None
+        os.utime(entry)  # mtime của mục cache = lần dùng gần nhất
+        return table
+
+    def store(self, path, table, key=None):
+        # key: khóa lấy bằng key() trước khi đọc file; file bị sửa trong lúc đọc thì cache không khớp bản mới
+        if not table.columns or self.max_bytes <= 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entry = key or self.key(path)
+        prefix = os.path.basename(entry).split('-')[0]
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith('.dlt') and name != os.path.basename(entry):
+                self._remove(os.path.join(self.directory, name))  # bản cache của phiên bản file cũ
+        write_table(table, entry)
+        self._evict(keep=entry)
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.dlt'):
+                    self._remove(os.path.join(self.directory, name))
+
+    def key(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        name = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        version = hashlib.sha1(f"{self.FORMAT}|{st.st_size}|{st.st_mtime_ns}".encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{name}-{version}.dlt")
+
+    def _evict(self, keep):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.dlt'):
+                full = os.path.join(self.directory, name)
+                st = os.stat(full)
+                entries.append((st.st_mtime, st.st_size, full))
+        total = sum(size for _, size, _ in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if full != keep and self._remove(full):
+                total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False  # vd. Windows không cho xóa file đang được ánh xạ bộ nhớ
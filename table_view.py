@@ -0,0 +1,147 @@
+import numpy as np
+
+from data_table import format_column
+from filter_expr import FilterError, compile_filter
+
+
+class TableSelection:
+    # Nguồn dữ liệu cho lưới: bảng gốc nhìn qua một vector id dòng, chỉ các dòng đang hiển thị được đọc ra
+    def __init__(self, table, row_ids):
+        self.table = table
+        self.row_ids = row_ids
+
+    @property
+    def columns(self):
+        return self.table.columns
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def __bool__(self):
+        return bool(self.table.columns)
+
+    def rows(self, start=0, stop=None, names=None):
+        names = self.table.columns if names is None else names
+        ids = self.row_ids[start:stop]
+        cols = [format_column(self.table.column(name)[ids]) for name in names]
+        return [list(values) for values in zip(*cols)]
+
+
+class TableView:
+    # Các bộ lọc xếp chồng trên bảng gốc (mỗi bộ lọc có thể bật / tắt) và thứ tự sắp xếp.
+    # Kết quả là vector id dòng của bảng gốc (không sao chép, không đổi chỗ dữ liệu), chỉ được tính lại khi bộ lọc /
+    # sắp xếp đổi hoặc khi cột mà chúng dùng đổi phiên bản (state_key); mặt nạ của từng bộ lọc được nhớ nên bật / tắt
+    # một bộ lọc hay sửa cột khác không phải tính lại.
+    def __init__(self):
+        self.filters = []  # mỗi phần tử: (biểu thức, đang bật)
+        self.sort_keys = []  # [(tên cột, tăng dần), ...], cột đầu là khóa chính
+        self.limit = None  # chỉ hiển thị N dòng đầu theo thứ tự sắp xếp (Top N)
+        self._masks = {}  # biểu thức -> (khóa theo phiên bản cột, mặt nạ)
+        self._filter_columns = {}
+        self._order = None
+        self._order_key = None
+        self._rows = None
+        self._key = None
+        self.skipped = []  # bộ lọc không áp dụng được (vd. cột đã bị xóa)
+
+    def state(self):
+        return list(self.filters), list(self.sort_keys), self.limit
+
+    def restore(self, state):
+        filters, sort_keys, self.limit = state
+        self.filters = list(filters)
+        self.sort_keys = list(sort_keys)
+
+    def add_filter(self, text):
+        compile_filter(text)  # báo lỗi cú pháp ngay
+        self.filters.append((text, True))
+
+    def toggle(self, position):
+        text, enabled = self.filters[position]
+        self.filters[position] = (text, not enabled)
+
+    def clear(self):
+        self.filters = []
+
+    def set_sort(self, keys, limit=None):
+        self.sort_keys = list(keys)
+        self.limit = limit
+
+    def reset(self):
+        self.filters = []
+        self.sort_keys = []
+        self.limit = None
+
+    def active(self):
+        return [text for text, enabled in self.filters if enabled]
+
+    def state_key(self, table):
+        # Đổi khi và chỉ khi kết quả row_ids có thể đổi: bộ lọc đang bật, sắp xếp, Top N, số dòng
+        # và phiên bản của các cột mà chúng dùng
+        active = self.active()
+        names = {name for name, _ in self.sort_keys}.union(*(self.columns(text) for text in active))
+        return (id(table), table.num_rows, tuple(active), tuple(self.sort_keys), self.limit,
+                self._versions(table, names))
+
+    def columns(self, text):
+        if text not in self._filter_columns:
+            self._filter_columns[text] = compile_filter(text).columns()
+        return self._filter_columns[text]
+
+    @staticmethod
+    def _versions(table, names):
+        return tuple((name, table.column_version(name) if name in table else None) for name in sorted(names))
+
+    def row_ids(self, table):
+        # None = không lọc, không sắp xếp (hiển thị cả bảng theo thứ tự gốc)
+        active = self.active()
+        if not active and not self.sort_keys:
+            return None
+        key = self.state_key(table)
+        if key != self._key:
+            self.skipped = []
+            mask = None
+            for text in active:
+                try:
+                    part = self.mask(table, text)
+                except FilterError:
+                    self.skipped.append(text)
+                    continue
+                mask = part if mask is None else mask & part
+            self.skipped.extend(f"sort by '{name}'" for name, _ in self.sort_keys if name not in table)
+            keys = [(name, ascending) for name, ascending in self.sort_keys if name in table]
+            if self.limit is not None and len(keys) == 1:
+                # Top N theo một cột: chọn từng phần thay vì sắp xếp cả cột (ô trống không được tính)
+                name, ascending = keys[0]
+                rows = table.top_k(name, self.limit, largest=not ascending, exclude=None if mask is None else ~mask)
+            else:
+                order = self.order(table)
+                if order is None:
+                    rows = None if mask is None else np.flatnonzero(mask)
+                else:
+                    rows = order if mask is None else order[mask[order]]
+                if self.limit is not None and rows is not None:
+                    rows = rows[:self.limit]
+            self._rows = rows
+            self._key = key
+        return self._rows
+
+    def order(self, table):
+        # Hoán vị dòng theo các khóa sắp xếp (None = thứ tự gốc); nhớ theo phiên bản của các cột khóa
+        keys = [(name, ascending) for name, ascending in self.sort_keys if name in table]
+        if not keys:
+            return None
+        key = (id(table), tuple((name, ascending, table.column_version(name)) for name, ascending in keys))
+        if key != self._order_key:
+            self._order = table.order_by(keys)
+            self._order_key = key
+        return self._order
+
+    def mask(self, table, text):
+        key = (id(table), table.num_rows, self._versions(table, self.columns(text)))
+        known = {expr for expr, _ in self.filters}
+        self._masks = {name: entry for name, entry in self._masks.items() if name in known}
+        entry = self._masks.get(text)
+        if entry is None or entry[0] != key:
+            entry = self._masks[text] = (key, compile_filter(text).mask(table))
+        return entry[1]
@@ -0,0 +1,59 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+
+from data_io import FileLoader, RowGuard, quote_toggles
+
+
+def guard(data, read_size=7, **kwargs):
+    g = RowGuard(io.BytesIO(data), ',', **kwargs)
+    out = b''
+    while True:
+        part = g.read(read_size)
+        if not part:
+            return out
+        out += part
+
+
+def load(path, **kwargs):
+    loader = FileLoader(str(path), **kwargs)
+    loader.run()
+    while True:
+        message = loader.messages.get()
+        if message[0] != 'progress':
+            return message, loader
+
+
+def test_quote_toggles_follow_csv_grammar():
+    codes = np.frombuffer(b'12" pizza,"a,""b",x"y\n"c\nd"', dtype=np.uint8)
+    assert quote_toggles(codes, ord(',')).tolist() == [10, 13, 14, 16, 22, 26]
+
+
+def test_stray_quote_does_not_swallow_the_rest_of_the_file():
+    data = b'a,b\n1,12" pizza\n2,"x,\ny"\n3,z,extra\n4,w\n'
+    malformed = []
+    out = guard(data, malformed=malformed)
+    assert list(csv.reader(io.StringIO(out.decode(), newline=''))) == [
+        ['a', 'b'], ['1', '12" pizza'], ['2', 'x,\ny'], ['3', 'z'], ['4', 'w']]
+    assert malformed == [5]
+
+
+def test_unclosed_quote_stops_at_max_carry():
+    with pytest.raises(ValueError, match="unclosed quote"):
+        guard(b'a,b\n1,"open\n' + b'x,y\n' * 1000, read_size=64, max_carry=1024)
+
+
+def test_loader_keeps_stray_quotes_and_falls_back_on_long_rows(tmp_path, monkeypatch):
+    path = tmp_path / 'stray.csv'
+    path.write_text('item,qty\n' + '12" pizza,1\n' + ''.join(f'item{i},{i}\n' for i in range(2000)))
+    (status, table), _ = load(path, chunk_rows=300)
+    assert status == 'done' and len(table) == 2001
+    assert table.rows(0, 2) == [['12" pizza', '1'], ['item0', '0']]
+
+    monkeypatch.setattr(RowGuard.__init__, '__defaults__', (None, None, 256))
+    path.write_text('a,b\n1,"' + 'x' * 1000 + '\nmore"\n2,3\n')
+    (status, table), _ = load(path)
+    assert status == 'done' and len(table) == 2
+    assert table.rows(1, 2) == [['2', '3']]
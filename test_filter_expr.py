@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from data_table import DataTable
+from filter_expr import FilterError, compile_filter, filter_rows, quote_column, quote_value
+
+
+@pytest.fixture
+def table():
+    return DataTable.from_rows(
+        ["Region", "Sales", "Price [USD]", "Note"],
+        [["North", "150", "10", "a"],
+         ["South", "50", "", ""],
+         ["North", "", "30", "b"],
+         ["East", "200", "40", ""],
+         ["", "120", "5", "c"]])
+
+
+def rows(table, text):
+    return filter_rows(table, text).tolist()
+
+
+def test_and_binds_tighter_than_or(table):
+    assert rows(table, "Region = 'East' OR Region = 'North' AND Sales > 100") == [0, 3]
+    assert rows(table, "(Region = 'East' OR Region = 'North') AND Sales > 100") == [0, 3]
+    assert rows(table, "Region = 'South' OR Region = 'North' AND Sales > 100") == [0, 1]
+
+
+def test_not_applies_to_the_next_condition_only(table):
+    assert rows(table, "NOT Region = 'North' AND Sales > 100") == [3]
+    assert rows(table, "NOT (Region = 'North' AND Sales > 100)") == [1, 3]
+
+
+def test_quoted_column_names(table):
+    assert rows(table, "[Price [USD]]] >= 30") == [2, 3]
+    assert rows(table, "`Price [USD]` >= 30") == [2, 3]
+    expression = f"{quote_column('Price [USD]')} = {quote_value('10')}"
+    assert rows(table, expression) == [0]
+
+
+def test_quote_value_escapes_quotes():
+    table = DataTable.from_rows(["Name"], [["O'Brien"], ["Smith"]])
+    assert rows(table, f"Name = {quote_value(chr(39) + 'Brien')}") == []
+    assert rows(table, f"Name = {quote_value('O' + chr(39) + 'Brien')}") == [0]
+
+
+def test_empty_cells_only_match_is_null(table):
+    assert rows(table, "Sales IS NULL") == [2]
+    assert rows(table, "Sales IS NOT NULL") == [0, 1, 3, 4]
+    # Ô rỗng không thỏa phép so sánh nào, kể cả khi phủ định
+    for text in ("Sales != 50", "NOT (Sales = 50)", "Sales NOT IN (50, 150)", "NOT Sales IN (50, 150)"):
+        assert 2 not in rows(table, text), text
+    assert rows(table, "Sales != 50") == rows(table, "NOT (Sales = 50)") == [0, 3, 4]
+    assert rows(table, "Note NOT IN ('a', 'b')") == [4]
+    assert rows(table, "Region != 'North'") == [1, 3]
+
+
+def test_unknown_combines_like_sql(table):
+    # Sai AND không biết = sai; đúng OR không biết = đúng
+    assert rows(table, "NOT (Sales > 100 AND Region = 'North')") == [1, 3]
+    assert rows(table, "NOT (Sales < 100 AND Region = 'North')") == [0, 1, 3, 4]
+    assert rows(table, "NOT (Sales > 100 OR Region = 'North')") == [1]
+    assert rows(table, "NOT (Sales > 100 OR Note = 'b')") == []
+    assert rows(table, "Sales > 100 OR Sales IS NULL") == [0, 2, 3, 4]
+
+
+def test_unknown_column_raises(table):
+    with pytest.raises(FilterError, match="Missing"):
+        compile_filter("Missing = 1").mask(table)
+    with pytest.raises(FilterError, match="Price"):
+        compile_filter("[Price] > 1").mask(table)
+
+
+@pytest.mark.parametrize("text", ["", "Sales >", "Sales = 1 AND", "(Sales = 1", "Sales LIKE 'a'", "[Price = 1"])
+def test_syntax_errors(text):
+    with pytest.raises(FilterError):
+        compile_filter(text)
+
+
+def test_mask_is_boolean_per_row(table):
+    mask = compile_filter("Sales BETWEEN 100 AND 200").mask(table)
+    assert mask.dtype == bool
+    assert np.flatnonzero(mask).tolist() == [0, 3, 4]
@@ -0,0 +1,32 @@
+import numpy as np
+
+from mapped_csv import MappedCSV
+
+
+def test_stray_quote_keeps_the_row_index(tmp_path):
+    path = tmp_path / 'stray.csv'
+    rows = [f'item{i},{i}' for i in range(1001)]
+    rows[500] = '12" pizza,500'
+    path.write_text('name,qty\n' + '\n'.join(rows) + '\n')
+    mapped = MappedCSV(str(path))
+    try:
+        mapped.build_index(chunk_bytes=4096)
+        assert len(mapped) == 1001
+        assert mapped.rows(499, 502) == [['item499', '499'], ['12" pizza', '500'], ['item501', '501']]
+        assert mapped.summarize('qty')['sum'] == sum(range(1001))
+    finally:
+        mapped.close()
+
+
+def test_quoted_newlines_across_scan_chunks(tmp_path):
+    path = tmp_path / 'quoted.csv'
+    rows = [f'"line {i}\nnext ""{i}""",{i}' for i in range(300)]
+    path.write_text('note,n\n' + '\n'.join(rows) + '\n')
+    mapped = MappedCSV(str(path))
+    try:
+        mapped.build_index(chunk_bytes=7)
+        assert len(mapped) == 300
+        assert mapped.rows(299, 300) == [['line 299\nnext "299"', '299']]
+        assert np.array_equal(np.diff([start for start, _ in mapped.stripes(4)]) > 0, [True] * 3)
+    finally:
+        mapped.close()
@@ -0,0 +1,41 @@
+import numpy as np
+
+from data_table import infer_column
+from table_stats import ColumnSummary, summarize_column
+
+
+def test_distinct_does_not_depend_on_chunk_dtype():
+    ints = np.arange(150000) % 10
+    floats = np.where(np.arange(1000) == 0, np.nan, np.arange(1000) % 10)
+    summary = ColumnSummary().update(ints).update(floats)
+    assert summary.distinct() == 10
+
+    parts = [ColumnSummary().update(ints), ColumnSummary().update(floats.astype(np.float32)),
+             ColumnSummary().update(np.array([-0.0, 0.0, 9.0]))]
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+    assert merged.result()['distinct'] == 10
+    assert merged.result()['nulls'] == 1
+
+
+def test_distinct_of_text_chunks():
+    text = infer_column(np.array(["a", "b", "", "c"], dtype=object))
+    summary = ColumnSummary().update(text).update(np.array(["a", "d"]))
+    assert summary.distinct() == 4
+    assert summarize_column(np.array([[1], "x", [1]], dtype=object))['distinct'] == 2
+
+
+def test_summary_matches_whole_column():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 5000, 200000).astype(np.float64)
+    values[rng.random(200000) < 0.01] = np.nan
+    whole = summarize_column(values)
+    chunks = ColumnSummary()
+    for start in range(0, len(values), 30000):
+        part = values[start:start + 30000]
+        if not np.isnan(part).any():
+            part = part.astype(np.int64)
+        chunks.update(part)
+    result = chunks.result()
+    for name in ('count', 'nulls', 'distinct', 'sum', 'min', 'max'):
+        assert result[name] == whole[name], name
+    assert np.isclose(result['variance'], whole['variance'])